@@ -0,0 +1,246 @@
+"""Local HTTP/JSON front end over dalandangan_services.
+
+    python dalandangan_api.py --port 8080
+
+POST /login returns a token; send it as `Authorization: Bearer <token>`.
+
+    GET  /menu                          any role
+    POST /orders                        customer  {items: [{product_id, qty}], address, contact, method,
+                                                   expected_total?}  409 if prices changed
+    GET  /orders?status=&from=&to=&after=&limit=&stores=all
+                                        customers see their own orders, cashiers see this
+                                        store's (or every branch's with stores=all)
+    GET  /kitchen                       staff
+    POST /orders/<id>/status            staff     {status}
+    POST /orders/<id>/dispatch          cashier   {delivery_person}
+    POST /orders/<id>/delivered         cashier
+    POST /orders/<id>/paid              cashier
+    POST /orders/<id>/receipt           cashier   -> {path}
+    GET  /dispatch                      cashier   suggested runs of ready orders, riders on shift
+    POST /dispatch/runs                 cashier   {rider_id, order_ids}  409 if an order already left
+    GET  /riders                        cashier
+    POST /riders                        cashier   {name, phone?}
+    POST /riders/<id>/active            cashier   {active}
+"""
+import argparse
+import json
+import logging
+import re
+import secrets
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import mysql.connector
+
+from dalandangan_db import read_session
+from dalandangan_services import AuthService, DispatchService, MenuService, OrderService, ServiceError
+
+log = logging.getLogger("dalandangan.api")
+
+auth = AuthService()
+menu = MenuService()
+orders = OrderService(menu)
+dispatch = DispatchService()
+
+_sessions = {}  # token -> user dict
+_sessions_lock = threading.Lock()
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def _encode_cursor(cursor):
+    return None if cursor is None else f"{cursor[0].isoformat()}|{cursor[1]}"
+
+def _decode_cursor(raw):
+    created_at, oid = raw.split("|")
+    return datetime.fromisoformat(created_at), int(oid)
+
+
+# --------- Routes ----------
+# (method, pattern, roles allowed or None for anyone logged in, handler)
+ROUTES = []
+
+def route(method, pattern, roles=None):
+    def register(fn):
+        ROUTES.append((method, re.compile(f"^{pattern}$"), roles, fn))
+        return fn
+    return register
+
+@route("GET", "/menu")
+def get_menu(user, body, query):
+    return menu.products()
+
+@route("POST", "/orders", roles=("customer",))
+def post_order(user, body, query):
+    cart = orders.build_cart(body.get('items') or [])
+    expected = Decimal(str(body['expected_total'])) if body.get('expected_total') is not None else None
+    return orders.place(user['id'], cart, body.get('address'), body.get('contact'), body.get('method', "Cash"),
+                        expected_total=expected)
+
+@route("GET", "/orders", roles=("customer", "cashier"))
+def get_orders(user, body, query):
+    q = {k: v[0] for k, v in query.items()}
+    filters = {'status': q.get('status'),
+               'date_from': date.fromisoformat(q['from']) if q.get('from') else None,
+               'date_to': date.fromisoformat(q['to']) if q.get('to') else None}
+    if user['role'] == 'customer':
+        filters['user_id'] = user['id']
+    limit = int(q.get('limit', 50))
+    if limit < 1:
+        raise ServiceError("limit must be at least 1")
+    page = orders.page(after=_decode_cursor(q['after']) if q.get('after') else None,
+                       limit=min(limit, 200),
+                       all_stores=user['role'] == 'cashier' and q.get('stores') == 'all', **filters)
+    page['next'] = _encode_cursor(page['next'])
+    return page
+
+@route("GET", "/kitchen", roles=("staff",))
+def get_kitchen(user, body, query):
+    return orders.kitchen()
+
+@route("POST", r"/orders/(\d+)/status", roles=("staff",))
+def post_status(user, body, query, oid):
+    orders.set_status(oid, body.get('status'))
+    return {'ok': True}
+
+@route("POST", r"/orders/(\d+)/dispatch", roles=("cashier",))
+def post_dispatch(user, body, query, oid):
+    orders.dispatch(oid, body.get('delivery_person'))
+    return {'ok': True}
+
+@route("POST", r"/orders/(\d+)/delivered", roles=("cashier",))
+def post_delivered(user, body, query, oid):
+    orders.delivered(oid)
+    return {'ok': True}
+
+@route("POST", r"/orders/(\d+)/paid", roles=("cashier",))
+def post_paid(user, body, query, oid):
+    orders.pay(oid)
+    return {'ok': True}
+
+@route("POST", r"/orders/(\d+)/receipt", roles=("cashier",))
+def post_receipt(user, body, query, oid):
+    return {'path': orders.receipt(oid)}
+
+@route("GET", "/dispatch", roles=("cashier",))
+def get_dispatch(user, body, query):
+    return dispatch.board()
+
+@route("POST", "/dispatch/runs", roles=("cashier",))
+def post_dispatch_run(user, body, query):
+    return dispatch.dispatch_run(body.get('rider_id'), body.get('order_ids'))
+
+@route("GET", "/riders", roles=("cashier",))
+def get_riders(user, body, query):
+    return dispatch.riders()
+
+@route("POST", "/riders", roles=("cashier",))
+def post_rider(user, body, query):
+    return {'rider_id': dispatch.add_rider(body.get('name'), body.get('phone'))}
+
+@route("POST", r"/riders/(\d+)/active", roles=("cashier",))
+def post_rider_active(user, body, query, rider_id):
+    dispatch.set_rider_active(rider_id, bool(body.get('active')))
+    return {'ok': True}
+
+
+# --------- Server ----------
+class ApiHandler(BaseHTTPRequestHandler):
+    server_version = "DalandanganAPI/1.0"
+
+    def _send(self, status, payload):
+        data = json.dumps(payload, default=_json_default).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        body = json.loads(self.rfile.read(length))
+        if not isinstance(body, dict):
+            raise ServiceError("The request body must be a JSON object")
+        return body
+
+    def _user(self):
+        header = self.headers.get("Authorization", "")
+        token = header[7:] if header.startswith("Bearer ") else None
+        with _sessions_lock:
+            return _sessions.get(token)
+
+    def _dispatch(self, method):
+        url = urlparse(self.path)
+        try:
+            body = self._body() if method == "POST" else {}
+            if method == "POST" and url.path == "/login":
+                user = auth.login(body.get('username', ""), body.get('password', ""))
+                token = secrets.token_urlsafe(24)
+                with _sessions_lock:
+                    _sessions[token] = user
+                return self._send(200, {'token': token, 'user': user})
+            if method == "POST" and url.path == "/register":
+                auth.register(body.get('username'), body.get('password'), body.get('full_name', ""), body.get('email', ""))
+                return self._send(201, {'ok': True})
+            for r_method, pattern, roles, handler in ROUTES:
+                m = pattern.match(url.path)
+                if r_method != method or not m:
+                    continue
+                user = self._user()
+                if user is None:
+                    return self._send(401, {'error': "Login required"})
+                if roles and user.get('role') not in roles:
+                    return self._send(403, {'error': "Not allowed for this role"})
+                args = [int(g) for g in m.groups()]
+                with read_session(user['id']):  # read-your-writes per user, not per server process
+                    result = handler(user, body, parse_qs(url.query), *args)
+                return self._send(200, result)
+            self._send(404, {'error': "Not found"})
+        except ServiceError as e:
+            self._send(e.status, {'error': str(e), **({'detail': e.detail} if e.detail else {})})
+        except (ValueError, KeyError, ArithmeticError) as e:  # ArithmeticError: a bad Decimal
+            self._send(400, {'error': f"Bad request: {e}"})
+        except LookupError as e:  # e.g. a receipt for an order that doesn't exist
+            self._send(404, {'error': str(e)})
+        except mysql.connector.Error as e:
+            self._send(503, {'error': f"Database error: {e}"})
+        except Exception:
+            log.exception("unhandled error on %s %s", method, url.path)
+            self._send(500, {'error': "Internal server error"})
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def log_message(self, fmt, *args):
+        pass  # keep the console quiet under load
+
+
+def serve(host="127.0.0.1", port=8080):
+    server = ThreadingHTTPServer((host, port), ApiHandler)
+    server.daemon_threads = True
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dalandangan ordering API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+    server = serve(args.host, args.port)
+    print(f"Listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
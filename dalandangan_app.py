@@ -1,51 +1,24 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
+from tkinter import ttk, messagebox
 import mysql.connector
-import hashlib
 from datetime import date
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
 import ttkbootstrap as tb
-from PIL import Image, ImageTk
 import os
 import re
 
-# --------- DB CONFIG ----------
-DB_CONFIG = {
-    'host': '127.0.0.1',
-    'user': 'root',
-    'password': '',
-    'database': 'dalandangan_db'
-}
-
-def db_connect():
-    return mysql.connector.connect(**DB_CONFIG)
-
-def hash_password(pw: str):
-    return hashlib.sha256(pw.encode()).hexdigest()
-
-# --------- DB Helpers ----------
-def fetch_one(query, params=()):
-    conn = db_connect(); cur = conn.cursor(dictionary=True)
-    cur.execute(query, params)
-    res = cur.fetchone()
-    cur.close(); conn.close()
-    return res
-
-def fetch_all(query, params=()):
-    conn = db_connect(); cur = conn.cursor(dictionary=True)
-    cur.execute(query, params)
-    res = cur.fetchall()
-    cur.close(); conn.close()
-    return res
-
-def execute(query, params=()):
-    conn = db_connect(); cur = conn.cursor()
-    cur.execute(query, params)
-    conn.commit()
-    lastid = cur.lastrowid
-    cur.close(); conn.close()
-    return lastid
+from dalandangan_orders import ORDER_STATUSES, order_page, db_clock, changes_since
+from dalandangan_services import AuthService, DispatchService, OrderService, ServiceError
+from dalandangan_worker import DbWorker
+from dalandangan_widgets import PagedTree, OrderFilterBar, ChangePoller, VirtualGrid, ScreenManager, patch_tree, order_tree
+from dalandangan_events import OutboxNotifier, TkEventPump
+from dalandangan_images import ThumbnailCache
+from dalandangan_menu import catalog
+from dalandangan_receipts import RECEIPTS_DIR, render_day
+from dalandangan_metrics import measure, metrics, timed, start_periodic_dump
+from dalandangan_offline import OfflineStore, OfflineReplayer, is_connection_error, new_op_key
+from dalandangan_kitchen import KitchenScheduler, kitchen_tickets, kitchen_changes
+from dalandangan_db import pool_stats, routing_stats
+from dalandangan_cart import Cart
 
 # --------- Main Application ----------
 class DalandanganApp(tb.Window):
@@ -54,8 +27,8 @@ class DalandanganApp(tb.Window):
         self.title("🍕 Dalandangan Pizza Restaurant")
         self.state('zoomed')
         self.current_user = None
-        # cart mapping product_id -> {'product': dict, 'qty': int}
-        self.cart = {}
+        # product_id -> {'product': dict, 'qty': int} with a running total
+        self.cart = Cart()
 
         style = ttk.Style()
         style.configure("card.TFrame", background="#f15d22", relief="solid", borderwidth=2)
@@ -68,26 +41,124 @@ class DalandanganApp(tb.Window):
         # optional default image path (if you add default_pizza.jpg)
         self.default_image = os.path.join(self.images_dir, "default_pizza.jpg") if os.path.exists(os.path.join(self.images_dir, "default_pizza.jpg")) else None
 
-        self._product_photos = {}  # cache images to avoid GC
+        self._image_paths = {}  # product id -> resolved image path (None = no image)
+        # resized images live on disk and in memory across logins
+        self.thumbs = ThumbnailCache()
+
+        # DB reads run here so slow queries never freeze the main loop
+        self.db = DbWorker(self)
+
+        # order events from every terminal arrive here and nudge the open board
+        self.notifier = OutboxNotifier(); self.notifier.start()
+        self.events = TkEventPump(self)
+
+        # hidden diagnostics panel with query/callback timings
+        self.bind_all("<Control-D>", lambda e: self._show_diagnostics())
+        start_periodic_dump()
+
+        # a database outage doesn't stop sales: writes queue locally and replay later,
+        # and the menu falls back to the last snapshot
+        self.offline = OfflineStore(); catalog.snapshot = self.offline
+        self.replayer = OfflineReplayer(self.offline); self.replayer.start()
+
+        # business rules live in the headless service layer
+        self.auth = AuthService()
+        self.orders = OrderService()
+        self.dispatch = DispatchService()
+
+        # every screen is built once and kept; a login only rebinds per-user state
+        self.screens = ScreenManager(self, on_switch=self._leave_screen)
+        self.screens.register("login", self._build_login_screen)
+        self.screens.register("register", self._build_register_screen)
+        self.screens.register("customer", self._build_customer_dashboard)
+        self.screens.register("staff", self._build_staff_dashboard)
+        self.screens.register("cashier", self._build_cashier_dashboard)
 
         self._show_login_screen()
 
-    def _clear(self):
+    def _write_or_queue(self, call, kind, on_done=None, on_queued=None, on_error=None, then=None, **payload):
+        """Run an order write as call(op_key) on the DbWorker; if the database is unreachable, queue it instead.
+
+        The idempotency key is made before the first attempt and the queued
+        copy reuses it, so a write that committed just as the link dropped is
+        not applied twice. The attempt and the queueing both happen off the Tk
+        thread; back on it exactly one of on_done(result), on_queued() or
+        on_error(exc) runs, then then(). Without on_queued/on_error the offline
+        notice and the refusal (a conflict, an invalid step, a missing order)
+        are shown as dialogs. Only the write itself is timed (ui.write.<kind>).
+        """
+        op_key = new_op_key()
+
+        def attempt():
+            try:
+                with measure("ui", f"ui.write.{kind}"):
+                    return True, call(op_key)
+            except mysql.connector.Error as e:
+                if not is_connection_error(e):
+                    raise
+            self.offline.enqueue(kind, payload, op_key); self.replayer.nudge()
+            return False, None
+
+        def settled(outcome):
+            ran, result = outcome
+            if not ran:
+                (on_queued or self._queued_notice)()
+            elif on_done is not None:
+                on_done(result)
+            if then is not None:
+                then()
+
+        def failed(exc):
+            (on_error or self._write_refused)(exc)
+            if then is not None:
+                then()
+
+        self.db.submit(attempt, on_done=settled, on_error=failed)
+
+    def _queued_notice(self):
+        messagebox.showwarning("Offline", "The database is unreachable. The change was saved on this "
+                                          "terminal and will be sent automatically when it is back.")
+
+    def _write_refused(self, exc):
+        if isinstance(exc, ServiceError) and exc.status == 409:
+            # another terminal got there first; the board refresh will show its change
+            messagebox.showinfo("Order Changed", str(exc))
+        elif isinstance(exc, ServiceError):
+            messagebox.showerror("Error", str(exc))
+        else:
+            messagebox.showerror("Database Error", str(exc))
+
+    def _leave_screen(self):
+        self.db.cancel_all()  # drop results meant for the screen we're leaving
         for w in self.winfo_children():
-            w.destroy()
+            if isinstance(w, tk.Toplevel):
+                w.destroy()  # dialogs the previous user left open
 
-    # ---------- LOGIN ----------
     def _show_login_screen(self):
-        self._clear()
-        container = ttk.Frame(self, padding=20)
+        self.screens.show("login")
+
+    def _show_register_screen(self):
+        self.screens.show("register")
+
+    def _show_customer_dashboard(self):
+        self.screens.show("customer")
+
+    def _show_staff_dashboard(self):
+        self.screens.show("staff")
+
+    def _show_cashier_dashboard(self):
+        self.screens.show("cashier")
+
+    # ---------- LOGIN ----------
+    def _build_login_screen(self, screen):
+        container = ttk.Frame(screen, padding=20)
         container.pack(fill="both", expand=True)
 
         logo_frame = ttk.Frame(container)
         logo_frame.pack(pady=(40, 10))
 
         try:
-            img = Image.open("logo.png").resize((350, 300))
-            logo = ImageTk.PhotoImage(img)
+            logo = self.thumbs.photo("logo.png", (350, 300))
             lbl_logo = ttk.Label(logo_frame, image=logo, background="#ffffff")
             lbl_logo.image = logo
             lbl_logo.pack()
@@ -105,33 +176,47 @@ class DalandanganApp(tb.Window):
         pw_entry = ttk.Entry(form_frame, width=25, show="*", bootstyle="info", font=("Helvetica", 16))
         pw_entry.grid(row=1, column=1, padx=10, pady=10)
 
-        def do_login():
-            uname, pw = user_entry.get().strip(), pw_entry.get().strip()
-            user = fetch_one("SELECT * FROM users WHERE username=%s", (uname,))
-            if user and user['password_hash'] == hash_password(pw):
-                self.current_user = user
-                role = user.get('role', 'customer')
-                self.cart = {}  # reset cart on login
-                if role == 'customer':
-                    self._show_customer_dashboard()
-                elif role == 'cashier':
-                    self._show_cashier_dashboard()
-                elif role == 'staff':
-                    self._show_staff_dashboard()
-                else:
-                    messagebox.showerror("Role Error", "Unknown user role.")
+        def logged_in(user):
+            self.current_user = user
+            role = user.get('role', 'customer')
+            self.cart.clear()  # reset cart on login
+            if role == 'customer':
+                self._show_customer_dashboard()
+            elif role == 'cashier':
+                self._show_cashier_dashboard()
+            elif role == 'staff':
+                self._show_staff_dashboard()
             else:
+                messagebox.showerror("Role Error", "Unknown user role.")
+
+        def login_failed(exc):
+            login_btn.config(state="normal")
+            if isinstance(exc, ServiceError):
                 messagebox.showerror("Login Failed", "Invalid credentials")
+            else:
+                messagebox.showerror("Database Error", str(exc))
+
+        def do_login():
+            uname, pw = user_entry.get().strip(), pw_entry.get().strip()
+            # password hashing is deliberately slow; keep it off the Tk thread
+            login_btn.config(state="disabled")
+            self.db.submit(self.auth.login, uname, pw, on_done=logged_in, on_error=login_failed)
 
         btn_frame = ttk.Frame(container)
         btn_frame.pack(pady=20)
-        ttk.Button(btn_frame, text="Login", bootstyle="danger", width=22, command=do_login).pack(pady=8)
+        login_btn = ttk.Button(btn_frame, text="Login", bootstyle="danger", width=22, command=do_login)
+        login_btn.pack(pady=8)
         ttk.Button(btn_frame, text="Register", bootstyle="warning", width=22, command=self._show_register_screen).pack(pady=5)
 
+        def on_show():
+            user_entry.delete(0, "end"); pw_entry.delete(0, "end")
+            login_btn.config(state="normal")
+            user_entry.focus_set()
+        return on_show, None
+
     # ---------- REGISTER ----------
-    def _show_register_screen(self):
-        self._clear()
-        frame = ttk.Frame(self, padding=30, style="card.TFrame")
+    def _build_register_screen(self, screen):
+        frame = ttk.Frame(screen, padding=30, style="card.TFrame")
         frame.place(relx=0.5, rely=0.5, anchor="center")
         ttk.Label(frame, text="📝 Customer Registration", font=("Helvetica", 26, "bold"), foreground="darkorange").pack(pady=15)
         fields = ["Username", "Password", "Full Name", "Email"]
@@ -142,46 +227,47 @@ class DalandanganApp(tb.Window):
             e.pack(pady=4)
             entries[f.lower().replace(" ", "_")] = e
 
+        def registered(_):
+            messagebox.showinfo("OK", "Registered! Please login.")
+            self._show_login_screen()
+
+        def register_failed(exc):
+            create_btn.config(state="normal")
+            messagebox.showerror("Error" if isinstance(exc, ServiceError) else "Database Error", str(exc))
+
         def register():
             username, pw = entries['username'].get(), entries['password'].get()
-            if not username or not pw:
-                return messagebox.showerror("Error", "Fill required fields")
-            try:
-                execute(
-                    "INSERT INTO users (username,password_hash,full_name,email,role) VALUES (%s,%s,%s,%s,'customer')",
-                    (username, hash_password(pw), entries['full_name'].get(), entries['email'].get())
-                )
-                messagebox.showinfo("OK", "Registered! Please login.")
-                self._show_login_screen()
-            except mysql.connector.IntegrityError:
-                messagebox.showerror("Error", "Username already exists.")
-
-        ttk.Button(frame, text="Create Account", bootstyle="success", width=25, command=register).pack(pady=12)
+            # hashing the new password is as slow as a login; keep it off the Tk thread
+            create_btn.config(state="disabled")
+            self.db.submit(self.auth.register, username, pw, entries['full_name'].get(), entries['email'].get(),
+                           on_done=registered, on_error=register_failed)
+
+        create_btn = ttk.Button(frame, text="Create Account", bootstyle="success", width=25, command=register)
+        create_btn.pack(pady=12)
         ttk.Button(frame, text="Back", bootstyle="secondary", width=25, command=self._show_login_screen).pack(pady=6)
 
+        def on_show():
+            for e in entries.values():
+                e.delete(0, "end")
+            create_btn.config(state="normal")
+        return on_show, None
+
     # ---------- CUSTOMER DASHBOARD ----------
-    def _show_customer_dashboard(self):
-        self._clear()
-        self.cart = {}  # reset cart
-        nb = ttk.Notebook(self)
+    def _build_customer_dashboard(self, screen):
+        nb = ttk.Notebook(screen)
         nb.pack(fill="both", expand=True, padx=20, pady=20)
 
         # --- Browse Menu ---
         browse_frame = ttk.Frame(nb, padding=10, style="card.TFrame")
         nb.add(browse_frame, text="Browse Menu")
-        ttk.Label(browse_frame, text=f"🍴 Welcome {self.current_user['username']}", font=("Helvetica", 22, "bold"), foreground="darkred").pack(pady=15)
+        welcome = ttk.Label(browse_frame, font=("Helvetica", 22, "bold"), foreground="darkred")
+        welcome.pack(pady=15)
 
         canvas = tk.Canvas(browse_frame)
-        scroll_y = ttk.Scrollbar(browse_frame, orient="vertical", command=canvas.yview)
-        scroll_frame = ttk.Frame(canvas)
-        canvas.create_window((0, 0), window=scroll_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scroll_y.set)
+        scroll_y = ttk.Scrollbar(browse_frame, orient="vertical")
         canvas.pack(side="left", fill="both", expand=True)
         scroll_y.pack(side="right", fill="y")
 
-        # cache product photos so garbage collector doesn't remove them
-        self._product_photos = {}
-
         # ---------- IMAGE RESOLUTION FIX ----------
         def find_image_for_product(p):
             """
@@ -204,10 +290,9 @@ class DalandanganApp(tb.Window):
             if name:
                 # create safe filename: pepperoni classic -> pepperoni_classic
                 safe = re.sub(r'[^a-z0-9]+', '_', name.strip().lower()).strip('_')
-                for ext in (".jpg", ".jpeg", ".png"):
-                    candidate = os.path.join(self.images_dir, safe + ext)
-                    if os.path.exists(candidate):
-                        return candidate
+                candidate = self.thumbs.find(self.images_dir, safe)
+                if candidate:
+                    return candidate
 
             # 3) default image if available
             if self.default_image and os.path.exists(self.default_image):
@@ -217,13 +302,9 @@ class DalandanganApp(tb.Window):
         # ---------- END IMAGE RESOLUTION FIX ----------
 
         def add_to_cart(product, qty):
-            pid = product['id']
-            if pid in self.cart:
-                self.cart[pid]['qty'] += qty
-            else:
-                self.cart[pid] = {'product': product, 'qty': qty}
+            self.cart.add(product, qty)
             messagebox.showinfo("Cart", f"Added {qty} x {product['name']} to cart.")
-            refresh_cart_tree()
+            show_cart_line(product['id'])
 
         def open_qty_modal(product):
             win = tb.Toplevel(self); win.title("Add to Cart")
@@ -241,50 +322,60 @@ class DalandanganApp(tb.Window):
             ttk.Button(win, text="Add to Cart", bootstyle="success", command=on_add).pack(pady=10)
 
         def populate_menu():
-            products = fetch_all("SELECT * FROM products WHERE available=1")
-            # dedupe by name to avoid duplicate product entries in UI
-            seen_names = set()
-            col = 0; row = 0
-            for p in products:
-                name = (p.get('name') or "").strip()
-                if not name:
-                    continue
-                if name in seen_names:
-                    continue
-                seen_names.add(name)
-
-                card = ttk.Frame(scroll_frame, padding=12, style="card.TFrame")
-                card.grid(row=row, column=col, padx=14, pady=14)
-
-                # Use find_image_for_product to decide which image to show
-                img_shown = False
-                img_path = find_image_for_product(p)
-                if img_path:
-                    try:
-                        img = Image.open(img_path).resize((160,160))
-                        photo = ImageTk.PhotoImage(img)
-                        self._product_photos[p['id']] = photo
-                        lbl = ttk.Label(card, image=photo)
-                        lbl.image = photo
-                        lbl.pack()
-                        img_shown = True
-                    except Exception:
-                        img_shown = False
-
-                if not img_shown:
-                    # fallback large emoji if no image
-                    ttk.Label(card, text="🍕", font=("Helvetica", 48)).pack(pady=6)
-
-                ttk.Label(card, text=p['name'], font=("Helvetica", 16, "bold"), foreground="darkorange").pack(pady=6)
-                ttk.Label(card, text=f"₱{p['price']:.2f}", font=("Helvetica", 14), foreground="red").pack()
-                ttk.Button(card, text="➕ Add to Cart", bootstyle="success", width=20,
-                           command=lambda prod=p: open_qty_modal(prod)).pack(pady=8)
-                col += 1
-                if col >= 3:
-                    col = 0; row += 1
-
-        scroll_frame.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
-        populate_menu()
+            # the catalog is shared by every session on this terminal; a cold
+            # load is timed from the click until the cards are drawn
+            cached = catalog.peek()
+            if cached is not None:
+                render_menu(cached)
+            else:
+                self.db.submit(catalog.products, on_done=render_menu, timing="ui.populate_menu")
+
+        THUMB = (160, 160)
+
+        def load_card_image(p):
+            # worker thread: path lookup and decode/resize, no widgets
+            path = find_image_for_product(p)
+            return path, (self.thumbs.load(path, THUMB) if path else None)
+
+        def make_card(parent):
+            card = ttk.Frame(parent, padding=12, style="card.TFrame")
+            card.img_label = ttk.Label(card, font=("Helvetica", 48)); card.img_label.pack(pady=6)
+            card.name_label = ttk.Label(card, font=("Helvetica", 16, "bold"), foreground="darkorange"); card.name_label.pack(pady=6)
+            card.price_label = ttk.Label(card, font=("Helvetica", 14), foreground="red"); card.price_label.pack()
+            card.add_btn = ttk.Button(card, text="➕ Add to Cart", bootstyle="success", width=20); card.add_btn.pack(pady=8)
+            return card
+
+        def show_card_image(card, photo):
+            card.img_label.configure(image=photo, text="")
+            card.img_label.image = photo  # keep a reference so Tk doesn't drop it
+
+        def bind_card(card, p):
+            card.product_id = p['id']
+            card.name_label.configure(text=p['name'])
+            card.price_label.configure(text=f"₱{p['price']:.2f}")
+            card.add_btn.configure(command=lambda prod=p: open_qty_modal(prod))
+            path = self._image_paths.get(p['id'])
+            photo = self.thumbs.peek(path, THUMB) if path else None
+            if photo is not None:
+                return show_card_image(card, photo)
+            # fallback large emoji until (or unless) the image arrives
+            card.img_label.configure(image="", text="🍕"); card.img_label.image = None
+            if p['id'] in self._image_paths and path is None:
+                return  # already know there is no image
+            def arrived(result, pid=p['id']):
+                path, img = result
+                self._image_paths[pid] = path
+                if img is not None and card.winfo_exists() and card.product_id == pid:
+                    show_card_image(card, self.thumbs.photo(path, THUMB, image=img))
+            self.db.submit(load_card_image, p, on_done=arrived, on_error=lambda exc: None)
+
+        # only cards in view exist; they are rebound to other products on scroll
+        menu_grid = VirtualGrid(canvas, scroll_y, make_card, bind_card, columns=3)
+
+        @timed("ui.render_menu")
+        def render_menu(products):
+            # already one entry per product name (deduped in SQL)
+            menu_grid.set_items(products)
 
         # --- My Cart Tab ---
         cart_frame = ttk.Frame(nb, padding=10)
@@ -296,23 +387,37 @@ class DalandanganApp(tb.Window):
             cart_tree.column(col, anchor="center", width=w)
         cart_tree.pack(fill="x", padx=20, pady=10)
 
+        def cart_values(pid):
+            prod = self.cart[pid]['product']
+            return (prod['name'], self.cart[pid]['qty'], f"₱{prod['price']:.2f}", f"₱{self.cart.subtotal(pid):.2f}")
+
         def refresh_cart_tree():
             cart_tree.delete(*cart_tree.get_children())
-            for pid, data in self.cart.items():
-                prod = data['product']; qty = data['qty']; subtotal = prod['price'] * qty
-                cart_tree.insert("", "end", iid=str(pid), values=(prod['name'], qty, f"₱{prod['price']:.2f}", f"₱{subtotal:.2f}"))
+            for pid in self.cart:
+                cart_tree.insert("", "end", iid=str(pid), values=cart_values(pid))
+            update_cart_totals()
+
+        def show_cart_line(pid):
+            # one row changes; the cart already knows its new total
+            iid = str(pid)
+            if pid not in self.cart:
+                if cart_tree.exists(iid):
+                    cart_tree.delete(iid)
+            elif cart_tree.exists(iid):
+                cart_tree.item(iid, values=cart_values(pid))
+            else:
+                cart_tree.insert("", "end", iid=iid, values=cart_values(pid))
             update_cart_totals()
 
         def update_cart_totals():
-            total = sum(d['product']['price'] * d['qty'] for d in self.cart.values())
-            lbl_total.config(text=f"Total: ₱{total:.2f}")
+            lbl_total.config(text=f"Total: ₱{self.cart.total:.2f}")
 
         def remove_selected():
             sel = cart_tree.focus()
             if not sel: return
             pid = int(sel)
-            if pid in self.cart: del self.cart[pid]
-            refresh_cart_tree()
+            self.cart.remove(pid)
+            show_cart_line(pid)
 
         def change_qty():
             sel = cart_tree.focus()
@@ -329,7 +434,7 @@ class DalandanganApp(tb.Window):
                     if q <= 0: raise ValueError
                 except:
                     messagebox.showerror("Invalid", "Quantity must be a positive integer."); return
-                self.cart[pid]['qty'] = q; refresh_cart_tree(); win.destroy()
+                self.cart.set_qty(pid, q); show_cart_line(pid); win.destroy()
             ttk.Button(win, text="Apply", bootstyle="success", command=apply_qty).pack(pady=8)
 
         def checkout():
@@ -344,28 +449,46 @@ class DalandanganApp(tb.Window):
 
             summary = tk.Text(win, height=8, width=60, state="normal")
             summary.insert("end", "Items:\n")
-            total_amt = 0
-            for d in self.cart.values():
-                name = d['product']['name']; q = d['qty']; sub = d['product']['price']*q
-                summary.insert("end", f"{name} x{q} — ₱{sub:.2f}\n"); total_amt += sub
-            summary.insert("end", f"\nTotal: ₱{total_amt:.2f}")
+            for pid, d in self.cart.items():
+                summary.insert("end", f"{d['product']['name']} x{d['qty']} — ₱{self.cart.subtotal(pid):.2f}\n")
+            summary.insert("end", f"\nTotal: ₱{self.cart.total:.2f}")
             summary.config(state="disabled"); summary.pack(pady=8)
 
+            def placed(order):
+                messagebox.showinfo("Order Placed", f"Order #{order['order_id']} placed successfully.\nTotal: ₱{order['total']:.2f}")
+                finished()
+
+            def queued():
+                self._queued_notice(); finished()
+
+            def finished():
+                self.cart.clear(); refresh_cart_tree(); win.destroy()
+
+            def refused(e):
+                if confirm_btn.winfo_exists():
+                    confirm_btn.config(state="normal")
+                if isinstance(e, ServiceError) and e.detail and 'prices' in e.detail:
+                    self.cart.update_prices(e.detail['prices']); refresh_cart_tree(); win.destroy()
+                    messagebox.showwarning("Prices Changed", str(e))
+                elif isinstance(e, ServiceError):
+                    messagebox.showerror("Order Failed", str(e))
+                else:
+                    messagebox.showerror("Order Failed", f"Could not place order, nothing was saved.\n{e}")
+
             def do_confirm():
                 if not addr.get().strip() or not phone.get().strip():
                     messagebox.showerror("Missing", "Please fill address and contact number."); return
-                oid = execute("INSERT INTO orders (user_id,total,delivery_address,contact_number,payment_method,status) VALUES (%s,%s,%s,%s,%s,'Pending')",
-                              (self.current_user['id'], total_amt, addr.get(), phone.get(), method.get()))
-                for d in self.cart.values():
-                    execute("INSERT INTO order_items (order_id,product_id,qty,unit_price) VALUES (%s,%s,%s,%s)",
-                            (oid, d['product']['id'], d['qty'], d['product']['price']))
-                payment_status = "Paid" if method.get() == "Cash" else "Pending"
-                execute("INSERT INTO payments (order_id,amount,method,status,paid_at) VALUES (%s,%s,%s,%s,NOW())",
-                        (oid, total_amt, method.get(), payment_status))
-                messagebox.showinfo("Order Placed", f"Order #{oid} placed successfully.\nTotal: ₱{total_amt:.2f}")
-                self.cart = {}; refresh_cart_tree(); win.destroy()
-
-            ttk.Button(win, text="Confirm Order", bootstyle="success", command=do_confirm).pack(pady=6)
+                # the worker gets its own copies; widgets and the live cart stay on the Tk thread
+                user_id, cart, address, contact, pay = self.current_user['id'], self.cart.copy(), addr.get(), phone.get(), method.get()
+                confirm_btn.config(state="disabled")  # one click, one order
+                # priced again on the server; refused if the total the customer saw is stale
+                self._write_or_queue(
+                    lambda key: self.orders.place(user_id, cart, address, contact, pay, expected_total=cart.total, op_key=key),
+                    'place_order', on_done=placed, on_queued=queued, on_error=refused,
+                    user_id=user_id, cart=cart, address=address, contact=contact, method=pay)
+
+            confirm_btn = ttk.Button(win, text="Confirm Order", bootstyle="success", command=do_confirm)
+            confirm_btn.pack(pady=6)
 
         controls = ttk.Frame(cart_frame); controls.pack(pady=6)
         ttk.Button(controls, text="Change Qty", bootstyle="warning", command=change_qty).pack(side="left", padx=6)
@@ -378,32 +501,44 @@ class DalandanganApp(tb.Window):
         nb.add(track_frame, text="Track Orders")
         ttk.Label(track_frame, text="📦 Your Orders", font=("Helvetica", 18, "bold"), foreground="darkorange").pack(pady=10)
 
-        tree2 = ttk.Treeview(track_frame, columns=("status","delivery_status","delivery_person","total","date"),
+        track_filters = OrderFilterBar(track_frame, ORDER_STATUSES, on_apply=lambda **f: track_pages.reload(**f))
+        track_filters.pack(pady=4)
+
+        track_table = ttk.Frame(track_frame); track_table.pack(fill="x", padx=40, pady=20)
+        scroll2 = ttk.Scrollbar(track_table); scroll2.pack(side="right", fill="y")
+        tree2 = ttk.Treeview(track_table, columns=("status","delivery_status","delivery_person","total","date"),
                              show="headings", height=10)
         for col in ("status","delivery_status","delivery_person","total","date"):
             tree2.heading(col, text=col.replace("_", " ").title()); tree2.column(col, anchor="center", width=180)
-        tree2.pack(fill="x", expand=False, padx=40, pady=20)
+        tree2.pack(side="left", fill="x", expand=True)
+
+        def customer_row(r):
+            delivery = r['delivery_status'] or "Not yet dispatched"
+            person = r['delivery_person'] or "N/A"
+            return (r['status'], delivery, person, f"₱{r['total']}", r['created_at'])
+
+        # pages are fetched by (created_at, id) as the customer scrolls back in history
+        track_pages = PagedTree(self.db, tree2, scroll2,
+                                lambda **kw: order_page(user_id=self.current_user['id'], **kw), customer_row, page_size=25,
+                                timing="ui.customer_orders_page")
 
         def load_orders_customer():
-            tree2.delete(*tree2.get_children())
-            rows = fetch_all("""
-                SELECT o.*,
-                       (SELECT d.status FROM deliveries d WHERE d.order_id=o.id LIMIT 1) AS delivery_status,
-                       (SELECT d.delivery_person FROM deliveries d WHERE d.order_id=o.id LIMIT 1) AS delivery_person
-                FROM orders o WHERE o.user_id=%s ORDER BY o.created_at DESC
-            """, (self.current_user['id'],))
-            for r in rows:
-                delivery = r['delivery_status'] or "Not yet dispatched"
-                person = r['delivery_person'] or "N/A"
-                tree2.insert("", "end", iid=r['id'], values=(r['status'], delivery, person, f"₱{r['total']}", r['created_at']))
-        load_orders_customer()
-
-        ttk.Button(self, text="Logout", bootstyle="danger", width=20, command=self._logout).pack(side="right", padx=20, pady=20, anchor="se")
+            track_pages.reload()
+
+        ttk.Button(screen, text="Logout", bootstyle="danger", width=20, command=self._logout).pack(side="right", padx=20, pady=20, anchor="se")
+
+        def on_show():
+            welcome.config(text=f"🍴 Welcome {self.current_user['username']}")
+            nb.select(0)
+            refresh_cart_tree()  # the cart was reset on login
+            populate_menu()
+            track_filters.reset(); track_pages.filters = {}
+            load_orders_customer()
+        return on_show, None
 
     # ---------- STAFF DASHBOARD ----------
-    def _show_staff_dashboard(self):
-        self._clear()
-        ttk.Label(self, text="👨‍🍳 Staff Panel", font=("Helvetica", 22, "bold"), foreground="darkorange").pack(pady=15)
+    def _build_staff_dashboard(self, screen):
+        ttk.Label(screen, text="👨‍🍳 Staff Panel", font=("Helvetica", 22, "bold"), foreground="darkorange").pack(pady=15)
 
         # ----- Unique Table Styling for Staff -----
         style = ttk.Style()
@@ -416,58 +551,103 @@ class DalandanganApp(tb.Window):
                         anchor="center")
 
         # ----- Table Frame -----
-        frame = ttk.Frame(self, padding=20, style="card.TFrame")
+        frame = ttk.Frame(screen, padding=20, style="card.TFrame")
         frame.pack(pady=10)
 
         # ----- Treeview -----
         tree = ttk.Treeview(
             frame,
             style="Staff.Treeview",
-            columns=("customer", "status", "total"),
+            columns=("queue", "customer", "status", "items", "eta", "due"),
             show="headings",
-            height=15
+            height=12
         )
 
         # Headings
+        tree.heading("queue", text="#")
         tree.heading("customer", text="Customer")
         tree.heading("status", text="Status")
-        tree.heading("total", text="Total")
+        tree.heading("items", text="Items")
+        tree.heading("eta", text="Ready")
+        tree.heading("due", text="Due")
 
         # Center text and set widths
-        tree.column("customer", anchor="center", width=250)
-        tree.column("status", anchor="center", width=250)
-        tree.column("total", anchor="center", width=250)
+        tree.column("queue", anchor="center", width=60)
+        tree.column("customer", anchor="center", width=200)
+        tree.column("status", anchor="center", width=150)
+        tree.column("items", anchor="w", width=360)
+        tree.column("eta", anchor="center", width=90)
+        tree.column("due", anchor="center", width=90)
+        tree.tag_configure("late", foreground="red")
 
         tree.pack(fill="x", expand=False, padx=40, pady=20)
 
+        # next oven loads: identical pizzas from several orders share a tray
+        ttk.Label(frame, text="🔥 Next to cook", font=("Helvetica", 16, "bold")).pack()
+        loads_tree = ttk.Treeview(frame, style="Staff.Treeview", columns=("oven", "start", "ready", "pizzas"),
+                                  show="headings", height=4)
+        for col, w in (("oven", 80), ("start", 100), ("ready", 100), ("pizzas", 670)):
+            loads_tree.heading(col, text=col.title()); loads_tree.column(col, anchor="w" if col == "pizzas" else "center", width=w)
+        loads_tree.pack(fill="x", expand=False, padx=40, pady=(0, 20))
+
+        def staff_row(r, plan):
+            cname = r['full_name'] or "Unknown"
+            items = ", ".join(f"{i['qty']}× {i['name']}" for i in r['items'])
+            return ("▶" if r['status'] == 'Preparing' else plan['seq'] or "", cname, r['status'], items,
+                    f"{plan['eta']:%H:%M}", f"{plan['due']:%H:%M}")
+
+        # the queue is recomputed from the scheduler's tickets on every change
+        # and once a minute so ready times move with the clock
+        scheduler = KitchenScheduler()
+
+        @timed("ui.staff_show_orders")
+        def show_orders():
+            # rows are patched and moved into cooking order, never rebuilt, so
+            # the selection and scroll position survive every change and tick
+            queue, loads = scheduler.queue()
+            plans = {r['id']: plan for r, plan in queue}
+            rows = [r for r, _ in queue]
+            patch_tree(tree, rows, lambda r: staff_row(r, plans[r['id']]), keep=lambda r: True,
+                       tags=lambda r: ("late",) if plans[r['id']]['late'] else ())
+            order_tree(tree, rows)
+            # a handful of oven loads with no identity of their own; these are redrawn
+            loads_tree.delete(*loads_tree.get_children())
+            for ld in loads:
+                pizzas = "; ".join(f"{ln['qty']}× {ln['name']} ({', '.join(f'#{o}' for o in ln['orders'])})" for ln in ld['lines'])
+                loads_tree.insert("", "end", values=(ld['oven'], f"{ld['start']:%H:%M}", f"{ld['ready']:%H:%M}", pizzas))
+
+        tick_job = None
+
+        def tick():
+            nonlocal tick_job
+            show_orders(); tick_job = tree.after(60000, tick)
+
+        # after the first full load only orders changed since the last poll are fetched
+        # order events trigger the diff fetch; the slow timer is only a safety net
+        poller = ChangePoller(tree, self.db, db_clock, kitchen_changes,
+                              lambda rows: (scheduler.apply(rows), show_orders()),
+                              interval_ms=30000)
+        self.events.subscribe(lambda events: poller.poll_now(), owner=tree)
+
         def load_orders():
-            tree.delete(*tree.get_children())
-            rows = fetch_all("""
-                SELECT o.*, u.full_name 
-                FROM orders o 
-                JOIN users u ON o.user_id=u.id 
-                WHERE status IN ('Pending','Preparing')
-            """)
-            for r in rows:
-                cname = r['full_name'] or "Unknown"
-                tree.insert("", "end", iid=r['id'],
-                            values=(cname, r['status'], f"₱{r['total']}"))
+            poller.restart(then=lambda: self.db.submit(kitchen_tickets, on_done=lambda rows: (scheduler.load(rows), show_orders()),
+                                                       timing="ui.staff_load_orders"))
 
         def mark_preparing():
             oid = tree.focus()
             if not oid:
                 return
-            execute("UPDATE orders SET status='Preparing' WHERE id=%s", (oid,))
-            load_orders()
+            self._write_or_queue(lambda key: self.orders.start_preparing(oid, key), 'set_status', then=poller.poll_now,
+                                 oid=int(oid), status='Preparing')
 
         def mark_ready():
             oid = tree.focus()
             if not oid:
                 return
-            execute("UPDATE orders SET status='Ready for Delivery' WHERE id=%s", (oid,))
-            load_orders()
+            self._write_or_queue(lambda key: self.orders.mark_ready(oid, key), 'set_status', then=poller.poll_now,
+                                 oid=int(oid), status='Ready for Delivery')
 
-        btn_frame = ttk.Frame(self)
+        btn_frame = ttk.Frame(screen)
         btn_frame.pack(pady=20)
 
         ttk.Button(btn_frame, text="➡ Preparing", bootstyle="warning", width=20,
@@ -475,24 +655,34 @@ class DalandanganApp(tb.Window):
         ttk.Button(btn_frame, text="✅ Ready", bootstyle="success", width=20,
                    command=mark_ready).pack(side="left", padx=10)
         ttk.Button(btn_frame, text="🔄 Refresh", bootstyle="secondary", width=20,
-                   command=load_orders).pack(side="left", padx=10)
+                   command=poller.poll_now).pack(side="left", padx=10)
 
-        ttk.Button(self, text="Logout", bootstyle="danger", width=20,
+        ttk.Button(screen, text="Logout", bootstyle="danger", width=20,
                    command=self._logout).pack(side="right", padx=20, pady=20, anchor="se")
 
-        load_orders()
+        def on_show():
+            nonlocal tick_job
+            scheduler.load([]); show_orders()  # nothing from the last shift while the first load runs
+            load_orders()
+            tick_job = tree.after(60000, tick)
+
+        def on_hide():
+            nonlocal tick_job
+            poller.stop()
+            if tick_job is not None:
+                tree.after_cancel(tick_job); tick_job = None
+        return on_show, on_hide
 
     # ---------- CASHIER DASHBOARD ----------
-    def _show_cashier_dashboard(self):
-        self._clear()
+    def _build_cashier_dashboard(self, screen):
         ttk.Label(
-            self,
+            screen,
             text="💰 Cashier/Admin Panel",
             font=("Helvetica", 22, "bold"),
             foreground="red"
         ).pack(pady=15)
 
-        frame = ttk.Frame(self, padding=20)
+        frame = ttk.Frame(screen, padding=20)
         frame.pack(fill="both", expand=True)
 
         center_frame = ttk.Frame(frame)
@@ -508,10 +698,8 @@ class DalandanganApp(tb.Window):
             table_frame,
             columns=("status", "delivery_person", "total", "payment_method", "payment_status"),
             show="headings",
-            height=20,
-            yscrollcommand=scrollbar.set
+            height=20
         )
-        scrollbar.config(command=tree.yview)
 
         tree.heading("status", text="Status")
         tree.heading("delivery_person", text="Delivery Person")
@@ -531,113 +719,224 @@ class DalandanganApp(tb.Window):
 
         tree.pack()
 
+        def cashier_row(r):
+            status = f"{r['status']} ({r['delivery_status']})" if r['delivery_status'] else r['status']
+            person = r['delivery_person'] or "N/A"
+            method = r['payment_method'] or "N/A"
+            pay_status = r['payment_status'] or "Pending"
+            return (status, person, f"₱{r['total']}", method, pay_status)
+
+        # only the newest page is loaded; older orders stream in as the list is scrolled
+        pages = PagedTree(self.db, tree, scrollbar, order_page, cashier_row, timing="ui.cashier_orders_page")
+        filters = OrderFilterBar(center_frame, ORDER_STATUSES, on_apply=lambda **f: pages.reload(**f))
+        filters.pack(before=table_frame, pady=8)
+
+        poller = ChangePoller(tree, self.db, db_clock, changes_since, pages.patch, interval_ms=30000)
+        self.events.subscribe(lambda events: poller.poll_now(), owner=tree)
+
         def load_orders():
-            tree.delete(*tree.get_children())
-            rows = fetch_all("""
-                SELECT o.*, 
-                       (SELECT d.status FROM deliveries d WHERE d.order_id=o.id LIMIT 1) AS delivery_status,
-                       (SELECT d.delivery_person FROM deliveries d WHERE d.order_id=o.id LIMIT 1) AS delivery_person,
-                       (SELECT p.method FROM payments p WHERE p.order_id=o.id LIMIT 1) AS payment_method,
-                       (SELECT p.status FROM payments p WHERE p.order_id=o.id LIMIT 1) AS payment_status
-                FROM orders o ORDER BY o.created_at DESC
-            """)
-            for r in rows:
-                status = f"{r['status']} ({r['delivery_status']})" if r['delivery_status'] else r['status']
-                person = r['delivery_person'] or "N/A"
-                method = r['payment_method'] or "N/A"
-                pay_status = r['payment_status'] or "Pending"
-                iid = r['id']
-                tree.insert("", "end", iid=iid, values=(status, person, f"₱{r['total']}", method, pay_status))
-
-        load_orders()
-
-        def dispatch_order():
-            oid = tree.focus()
-            if not oid: return
-            delivery_person = simpledialog.askstring("Delivery Person", "Enter delivery person name:")
-            if not delivery_person: return
-            execute("""INSERT INTO deliveries (order_id, delivery_person, pickup_time, status) 
-                       VALUES (%s,%s,NOW(),'Picked Up')""", (oid, delivery_person))
-            execute("UPDATE orders SET status='Out for Delivery' WHERE id=%s", (oid,))
-            messagebox.showinfo("Dispatched", f"Order #{oid} assigned to {delivery_person}")
-            load_orders()
+            poller.restart(then=pages.reload)
+
+        def dispatch_orders():
+            # every ready order at once, grouped into runs with a rider suggested for each
+            self._open_dispatch(on_dispatched=poller.poll_now)
 
         def mark_delivered():
             oid = tree.focus()
             if not oid: return
-            execute("UPDATE deliveries SET delivered_at=NOW(), status='Delivered' WHERE order_id=%s", (oid,))
-            execute("UPDATE orders SET status='Completed' WHERE id=%s", (oid,))
-            messagebox.showinfo("Delivered", f"Order #{oid} marked as Delivered")
-            load_orders()
+            self._write_or_queue(lambda key: self.orders.delivered(oid, key), 'mark_delivered', then=poller.poll_now,
+                                 on_done=lambda _: messagebox.showinfo("Delivered", f"Order #{oid} marked as Delivered"),
+                                 oid=int(oid))
 
         def mark_as_paid():
             oid = tree.focus()
             if not oid:
                 messagebox.showwarning("Select Order", "Please select an order first."); return
-            payment = fetch_one("SELECT * FROM payments WHERE order_id=%s", (oid,))
-            if not payment:
-                messagebox.showerror("Error", "No payment record found for this order."); return
-            if payment['status'] == "Paid":
-                messagebox.showinfo("Info", "Already marked as Paid."); return
-            execute("UPDATE payments SET status='Paid', paid_at=NOW() WHERE order_id=%s", (oid,))
-            messagebox.showinfo("Success", f"Order #{oid} marked as Paid."); load_orders()
+            self._write_or_queue(lambda key: self.orders.pay(oid, key), 'mark_paid', then=poller.poll_now,
+                                 on_done=lambda _: messagebox.showinfo("Success", f"Order #{oid} marked as Paid."),
+                                 on_error=lambda e: messagebox.showerror("Error", str(e)), oid=int(oid))
 
         def generate_receipt():
             oid = tree.focus()
             if not oid: return
-            o = fetch_one("""SELECT o.*, u.full_name,
-                                    (SELECT d.delivery_person FROM deliveries d WHERE d.order_id=o.id LIMIT 1) AS delivery_person
-                             FROM orders o JOIN users u ON o.user_id=u.id 
-                             WHERE o.id=%s""", (oid,))
-            items = fetch_all("""SELECT oi.*, p.name 
-                                 FROM order_items oi 
-                                 JOIN products p ON oi.product_id=p.id 
-                                 WHERE oi.order_id=%s""", (oid,))
-            fname = f"receipt_order_{oid}.pdf"
-            c = canvas.Canvas(fname, pagesize=A4)
-            width, height = A4
-            y = height - 50
-            c.setFont("Helvetica-Bold", 16)
-            c.drawString(180, y, "🍕 Dalandangan Pizza Receipt")
-            y -= 40
-            c.setFont("Helvetica", 12)
-            c.drawString(50, y, f"Order ID: {o['id']}")
-            y -= 20
-            c.drawString(50, y, f"Customer: {o['full_name']}")
-            y -= 20
-            c.drawString(50, y, f"Address: {o['delivery_address']}")
-            y -= 20
-            c.drawString(50, y, f"Payment: {o['payment_method']}")
-            y -= 20
-            c.drawString(50, y, f"Delivery Person: {o['delivery_person'] or 'N/A'}")
-            y -= 30
-            c.drawString(50, y, "Items:")
-            y -= 20
-            for it in items:
-                c.drawString(60, y, f"{it['name']} x{it['qty']} - ₱{it['unit_price']*it['qty']}")
-                y -= 20
-            y -= 10
-            c.drawString(50, y, f"Total: ₱{o['total']:.2f}")
-            y -= 40
-            c.drawString(200, y, "Thank you for your order!")
-            c.showPage()
-            c.save()
-            messagebox.showinfo("Receipt", f"Saved receipt as {fname}")
-
-        btn_frame = ttk.Frame(self)
+            self.db.submit(self.orders.receipt, oid, timing="ui.generate_receipt",
+                           on_done=lambda fname: messagebox.showinfo("Receipt", f"Saved receipt as {fname}"))
+
+        def generate_day_receipts():
+            # today's completed orders, rendered in a process pool off the UI thread
+            self.db.submit(render_day, date.today(),
+                           on_done=lambda paths: messagebox.showinfo(
+                               "Receipts", f"Saved {len(paths)} receipt(s) under {RECEIPTS_DIR}"))
+
+        btn_frame = ttk.Frame(screen)
         btn_frame.pack(pady=12)
-        ttk.Button(btn_frame, text="🚚 Dispatch", bootstyle="warning", width=18, command=dispatch_order).pack(side="left", padx=8)
+        ttk.Button(btn_frame, text="🚚 Dispatch", bootstyle="warning", width=18, command=dispatch_orders).pack(side="left", padx=8)
         ttk.Button(btn_frame, text="✅ Delivered", bootstyle="success", width=18, command=mark_delivered).pack(side="left", padx=8)
         ttk.Button(btn_frame, text="💵 Mark as Paid", bootstyle="success", width=18, command=mark_as_paid).pack(side="left", padx=8)
         ttk.Button(btn_frame, text="🧾 Receipt", bootstyle="info", width=18, command=generate_receipt).pack(side="left", padx=8)
-        ttk.Button(btn_frame, text="🔄 Refresh", bootstyle="secondary", width=18, command=load_orders).pack(side="left", padx=8)
+        ttk.Button(btn_frame, text="🗂 Day Receipts", bootstyle="info", width=18, command=generate_day_receipts).pack(side="left", padx=8)
+        ttk.Button(btn_frame, text="🔄 Refresh", bootstyle="secondary", width=18, command=poller.poll_now).pack(side="left", padx=8)
+
+        ttk.Button(screen, text="Logout", bootstyle="danger", width=20, command=self._logout).pack(side="right", padx=20, pady=20, anchor="se")
+
+        def on_show():
+            filters.reset(); pages.filters = {}
+            tree.delete(*tree.get_children())  # the last cashier's rows, until the reload lands
+            load_orders()
+        return on_show, poller.stop
+
+    # ---------- DISPATCH ----------
+    def _open_dispatch(self, on_dispatched):
+        win = tb.Toplevel(self); win.title("Dispatch Runs")
+        ttk.Label(win, text="🚚 Delivery Runs", font=("Helvetica", 16, "bold")).pack(pady=8)
+        cols = ("area", "orders", "rider", "leaves", "back")
+        runs_tree = ttk.Treeview(win, columns=cols, show="headings", height=10)
+        for col, w in zip(cols, (160, 360, 160, 80, 80)):
+            runs_tree.heading(col, text=col.title()); runs_tree.column(col, width=w, anchor="w" if col == "orders" else "center")
+        runs_tree.pack(fill="both", expand=True, padx=10, pady=6)
+
+        rider_row = ttk.Frame(win); rider_row.pack(pady=4)
+        ttk.Label(rider_row, text="Rider for selected run").pack(side="left", padx=6)
+        rider_var = tk.StringVar()
+        rider_box = ttk.Combobox(rider_row, textvariable=rider_var, state="readonly", width=30)
+        rider_box.pack(side="left", padx=6)
+
+        board = {'runs': [], 'riders': []}
+
+        def rider_label(r):
+            return f"{r['name']} (out, {r['open_drops']} drop(s))" if r['open_drops'] else r['name']
+
+        def run_row(run):
+            orders = ", ".join(f"#{o['id']} {o['full_name'] or ''}".strip() for o in run['orders'])
+            rider = run['rider']
+            return (run['area'], orders, rider['name'] if rider else "— waiting —",
+                    f"{run['leaves']:%H:%M}" if run['leaves'] else "", f"{run['back']:%H:%M}" if run['back'] else "")
+
+        def show(data):
+            if not win.winfo_exists():
+                return
+            board.update(data)
+            runs_tree.delete(*runs_tree.get_children())
+            for k, run in enumerate(board['runs']):
+                runs_tree.insert("", "end", iid=str(k), values=run_row(run))
+            rider_box['values'] = [rider_label(r) for r in board['riders']]
+            if not board['runs']:
+                runs_tree.insert("", "end", values=("", "No orders are ready for delivery", "", "", ""))
+
+        def load():
+            self.db.submit(self.dispatch.board, on_done=show)
+
+        def selected_run():
+            k = runs_tree.focus()
+            return board['runs'][int(k)] if k.isdigit() and int(k) < len(board['runs']) else None
+
+        def on_select(_event):
+            run = selected_run()
+            rider_var.set(rider_label(run['rider']) if run and run['rider'] else "")
+
+        def on_rider(_event):
+            run = selected_run()
+            if run is None:
+                return
+            run['rider'] = board['riders'][rider_box.current()]
+            run['leaves'] = run['back'] = None  # the suggestion's timing no longer applies
+            runs_tree.item(runs_tree.focus(), values=run_row(run))
+
+        runs_tree.bind("<<TreeviewSelect>>", on_select)
+        rider_box.bind("<<ComboboxSelected>>", on_rider)
+
+        def commit(runs):
+            """Write each run on the worker; one summary once every run has settled."""
+            left, sent, queued, refused = len(runs), [], [], []
+
+            def settled(bucket, run):
+                nonlocal left
+                bucket.append(run); left -= 1
+                if left:
+                    return
+                lines = [f"{r['rider']['name']}: " + ", ".join(f"#{o['id']}" for o in r['orders']) for r in sent]
+                if queued:
+                    lines.append(f"{len(queued)} run(s) saved on this terminal; they are sent when the database is back.")
+                lines += [f"{r['area']} run not sent: {e}" for r, e in refused]
+                if lines:
+                    (messagebox.showinfo if not refused else messagebox.showwarning)("Dispatch", "\n".join(lines))
+                if win.winfo_exists():
+                    load()
+                on_dispatched()
+
+            for run in runs:
+                rider, ids = run['rider'], [o['id'] for o in run['orders']]
+                self._write_or_queue(lambda key, rider=rider, ids=ids: self.dispatch.dispatch_run(rider['id'], ids, key),
+                                     'dispatch_run', rider_id=rider['id'], order_ids=ids,
+                                     on_done=lambda _, run=run: settled(sent, run),
+                                     on_queued=lambda run=run: settled(queued, run),
+                                     on_error=lambda e, run=run: settled(refused, (run, e)))
+
+        def dispatch_selected():
+            run = selected_run()
+            if run is None:
+                messagebox.showwarning("Select Run", "Please select a run first."); return
+            if run['rider'] is None:
+                messagebox.showwarning("No Rider", "Pick a rider for this run first."); return
+            commit([run])
+
+        def dispatch_all():
+            ready = [run for run in board['runs'] if run['rider'] is not None]
+            if not ready:
+                messagebox.showwarning("No Rider", "No run has a rider available."); return
+            commit(ready)
+
+        def new_rider():
+            name = name_var.get().strip()
+            try:
+                self.dispatch.add_rider(name)
+            except ServiceError as e:
+                messagebox.showerror("Rider", str(e)); return
+            name_var.set(""); load()
+
+        btns = ttk.Frame(win); btns.pack(pady=6)
+        ttk.Button(btns, text="🚚 Dispatch Run", bootstyle="warning", command=dispatch_selected).pack(side="left", padx=6)
+        ttk.Button(btns, text="🚚 Dispatch All", bootstyle="success", command=dispatch_all).pack(side="left", padx=6)
+        ttk.Button(btns, text="🔄 Refresh", bootstyle="secondary", command=load).pack(side="left", padx=6)
+        ttk.Button(btns, text="Close", bootstyle="danger", command=win.destroy).pack(side="left", padx=6)
+
+        add_row = ttk.Frame(win); add_row.pack(pady=(4, 10))
+        name_var = tk.StringVar()
+        ttk.Label(add_row, text="New rider").pack(side="left", padx=6)
+        ttk.Entry(add_row, textvariable=name_var, width=24).pack(side="left", padx=6)
+        ttk.Button(add_row, text="Add", bootstyle="info", command=new_rider).pack(side="left", padx=6)
+
+        load()
+
+    # ---------- DIAGNOSTICS ----------
+    def _show_diagnostics(self):
+        win = tb.Toplevel(self); win.title("Diagnostics")
+        cols = ("kind", "name", "count", "errors", "p50_ms", "p95_ms", "max_ms", "avg_rows")
+        tree = ttk.Treeview(win, columns=cols, show="headings", height=20)
+        for col, w in zip(cols, (60, 520, 70, 60, 80, 80, 80, 80)):
+            tree.heading(col, text=col.replace("_", " ").title()); tree.column(col, width=w, anchor="w" if col == "name" else "center")
+        tree.pack(fill="both", expand=True, padx=10, pady=10)
+        pool_lbl = ttk.Label(win, font=("Helvetica", 10)); pool_lbl.pack(pady=4)
+
+        def refresh():
+            if not win.winfo_exists():
+                return
+            tree.delete(*tree.get_children())
+            for r in metrics.summary():
+                tree.insert("", "end", values=tuple("" if r[c] is None else r[c] for c in cols))
+            pool_lbl.config(text="Pool: " + ", ".join(f"{k}={v}" for k, v in pool_stats().items())
+                            + "\nReads: " + ", ".join(f"{k}={v}" for k, v in routing_stats().items()))
+            win.after(2000, refresh)
 
-        ttk.Button(self, text="Logout", bootstyle="danger", width=20, command=self._logout).pack(side="right", padx=20, pady=20, anchor="se")
+        btns = ttk.Frame(win); btns.pack(pady=6)
+        ttk.Button(btns, text="Reset", bootstyle="secondary", command=metrics.reset).pack(side="left", padx=6)
+        ttk.Button(btns, text="Close", bootstyle="danger", command=win.destroy).pack(side="left", padx=6)
+        refresh()
 
     # ---------- LOGOUT ----------
     def _logout(self):
         self.current_user = None
-        self.cart = {}
+        self.cart.clear()
         self._show_login_screen()
 
 # --------- Run ----------
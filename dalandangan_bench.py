@@ -0,0 +1,227 @@
+"""Load generator and latency benchmark for the ordering hot paths.
+
+Seeds a database with synthetic users, products and orders, then drives
+login, menu, checkout and dashboard queries from many simulated terminals
+(threads) through the same service layer the app uses, and reports
+p50/p95/p99 latency and throughput per operation.
+
+    python dalandangan_bench.py --database dalandangan_bench --seed --orders 200000 \\
+        --terminals 16 --duration 60 --save bench.json
+    python dalandangan_bench.py --database dalandangan_bench --baseline bench.json
+
+Point it at a scratch database: seeding inserts rows named bench_*.
+"""
+import argparse
+import json
+import math
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+import dalandangan_db
+from dalandangan_db import HOME_SHARD, fetch_all, fetch_one, pool_stats, read_session, routing_stats, transaction
+
+BENCH_PASSWORD = "bench"
+
+# --------- Seeding ----------
+def _batched(rows, size=1000):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+def seed(users=500, products=200, orders=50000, items_per_order=3, days=365, rnd=None):
+    """Insert synthetic data; returns (user ids, product ids). Safe to run again (adds more orders)."""
+    from dalandangan_passwords import hash_password
+    rnd = rnd or random.Random(42)
+    pw = hash_password(BENCH_PASSWORD)
+    have_products = _count("SELECT COUNT(*) AS n FROM products WHERE name LIKE 'Bench Pizza %'")
+    with transaction("bench_seed") as cur:
+        cur.executemany("""INSERT IGNORE INTO users (username,password_hash,full_name,email,role)
+                           VALUES (%s,%s,%s,%s,'customer')""",
+                        [(f"bench_user_{i}", pw, f"Bench User {i}", f"bench{i}@example.com") for i in range(users)])
+        cur.executemany("INSERT INTO products (name,price,available) VALUES (%s,%s,1)",
+                        [(f"Bench Pizza {i}", round(rnd.uniform(150, 900), 2)) for i in range(have_products, products)])
+    user_ids = [r['id'] for r in fetch_all("SELECT id FROM users WHERE username LIKE 'bench_user_%'")]
+    product_rows = fetch_all("SELECT id, price FROM products WHERE name LIKE 'Bench Pizza %'")
+    now = datetime.now()
+    for chunk in _batched(range(orders), 1000):
+        with transaction("bench_seed") as cur:
+            for _ in chunk:
+                picks = rnd.sample(product_rows, min(items_per_order, len(product_rows)))
+                lines = [(p['id'], rnd.randint(1, 3), p['price']) for p in picks]
+                total = sum(q * price for _, q, price in lines)
+                created = now - timedelta(seconds=rnd.randint(0, days * 86400))
+                status = rnd.choice(["Completed"] * 8 + ["Pending", "Preparing", "Ready for Delivery", "Out for Delivery"])
+                cur.execute("""INSERT INTO orders (user_id,total,delivery_address,contact_number,payment_method,status,created_at)
+                               VALUES (%s,%s,'Bench Street','0900',%s,%s,%s)""",
+                            (rnd.choice(user_ids), total, rnd.choice(["Cash", "Online"]), status, created))
+                oid = cur.lastrowid
+                cur.executemany("INSERT INTO order_items (order_id,product_id,qty,unit_price) VALUES (%s,%s,%s,%s)",
+                                [(oid, pid, q, price) for pid, q, price in lines])
+                cur.execute("INSERT INTO payments (order_id,amount,method,status,paid_at) VALUES (%s,%s,'Cash','Paid',%s)",
+                            (oid, total, created))
+    return user_ids, [p['id'] for p in product_rows]
+
+def _count(sql):
+    return fetch_one(sql)['n']
+
+
+# --------- Scenarios ----------
+class Terminal:
+    """One simulated terminal; each op returns nothing and raises on failure."""
+
+    def __init__(self, user_ids, rnd):
+        from dalandangan_services import AuthService, MenuService, OrderService
+        self.auth, self.menu, self.orders = AuthService(), MenuService(), OrderService()
+        self.user_ids = user_ids
+        self.rnd = rnd
+
+    def login(self):
+        self.auth.login(f"bench_user_{self.rnd.randrange(len(self.user_ids))}", BENCH_PASSWORD)
+
+    def menu_cold(self):
+        from dalandangan_menu import MENU_SQL
+        fetch_all(MENU_SQL)
+
+    def menu_cached(self):
+        self.menu.products()
+
+    def checkout(self):
+        products = self.menu.products()
+        lines = [{'product_id': p['id'], 'qty': self.rnd.randint(1, 3)}
+                 for p in self.rnd.sample(products, min(len(products), self.rnd.randint(1, 12)))]
+        self.orders.place(self.rnd.choice(self.user_ids), self.orders.build_cart(lines), "Bench Street", "0900", "Cash")
+
+    def cashier_board(self):
+        self.orders.page(limit=50)
+
+    def customer_history(self):
+        self.orders.page(limit=25, user_id=self.rnd.choice(self.user_ids))
+
+    def kitchen_board(self):
+        self.orders.kitchen()
+
+DEFAULT_MIX = {'login': 1, 'menu_cold': 1, 'menu_cached': 3, 'checkout': 2,
+               'cashier_board': 4, 'customer_history': 2, 'kitchen_board': 4}
+
+
+# --------- Runner ----------
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+def run(user_ids, terminals=8, duration=30.0, mix=None, seed_value=1):
+    mix = mix or DEFAULT_MIX
+    ops, weights = list(mix), list(mix.values())
+    samples = {op: [] for op in ops}
+    errors = {op: 0 for op in ops}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker(n):
+        with read_session(f"bench-{n}"):  # each simulated terminal only sticks to its own writes
+            work(n)
+
+    def work(n):
+        rnd = random.Random(seed_value + n)
+        term = Terminal(user_ids, rnd)
+        local = {op: [] for op in ops}; failed = {op: 0 for op in ops}
+        while time.monotonic() < deadline:
+            op = rnd.choices(ops, weights)[0]
+            start = time.perf_counter()
+            try:
+                getattr(term, op)()
+            except Exception:
+                failed[op] += 1
+                continue
+            local[op].append(time.perf_counter() - start)
+        with lock:
+            for op in ops:
+                samples[op] += local[op]; errors[op] += failed[op]
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=worker, args=(n,), name=f"bench-{n}") for n in range(terminals)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - started
+
+    report = {'terminals': terminals, 'duration': round(elapsed, 2), 'ops': {}, 'pool': pool_stats(),
+              'routing': routing_stats()}
+    for op in ops:
+        lat = sorted(samples[op])
+        report['ops'][op] = {
+            'count': len(lat), 'errors': errors[op],
+            'throughput': round(len(lat) / elapsed, 2) if elapsed else 0.0,
+            'p50_ms': round(percentile(lat, 50) * 1000, 2),
+            'p95_ms': round(percentile(lat, 95) * 1000, 2),
+            'p99_ms': round(percentile(lat, 99) * 1000, 2),
+        }
+    return report
+
+def regressions(report, baseline, tolerance=0.2):
+    """Ops whose p95 got more than `tolerance` slower than in `baseline`."""
+    out = []
+    for op, stats in report['ops'].items():
+        before = baseline.get('ops', {}).get(op)
+        if before and before['p95_ms'] and stats['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            out.append(f"{op}: p95 {before['p95_ms']}ms -> {stats['p95_ms']}ms")
+    return out
+
+def print_report(report):
+    print(f"{report['terminals']} terminals, {report['duration']}s")
+    print(f"{'operation':<18}{'count':>8}{'err':>6}{'ops/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for op, s in report['ops'].items():
+        print(f"{op:<18}{s['count']:>8}{s['errors']:>6}{s['throughput']:>9}{s['p50_ms']:>9}{s['p95_ms']:>9}{s['p99_ms']:>9}")
+    print("pool:", ", ".join(f"{k}={v}" for k, v in report['pool'].items()))
+    print("reads:", ", ".join(f"{k}={v}" for k, v in report.get('routing', {}).items()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dalandangan ordering benchmark")
+    parser.add_argument("--database", help="database to use instead of DB_CONFIG's")
+    parser.add_argument("--seed", action="store_true", help="insert synthetic data first")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--orders", type=int, default=50000)
+    parser.add_argument("--terminals", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--pool-size", type=int, help="connections per process (default: one per terminal)")
+    parser.add_argument("--replica-port", type=int, action="append",
+                        help="read replica on DB_CONFIG's host at this port (repeatable)")
+    parser.add_argument("--save", help="write the JSON report here")
+    parser.add_argument("--baseline", help="compare p95s against a saved report")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    if args.database:
+        dalandangan_db.DB_CONFIG['database'] = args.database
+    if args.replica_port:
+        dalandangan_db.configure_replicas({HOME_SHARD: [{'port': port} for port in args.replica_port]})
+    dalandangan_db.configure_pool(size=args.pool_size or args.terminals)
+    if args.seed:
+        seed(args.users, args.products, args.orders)
+    user_ids = [r['id'] for r in fetch_all("SELECT id FROM users WHERE username LIKE 'bench_user_%'")]
+    if not user_ids:
+        parser.error("no bench users found; run with --seed first")
+
+    report = run(user_ids, args.terminals, args.duration)
+    print_report(report)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            slower = regressions(report, json.load(f), args.tolerance)
+        for line in slower:
+            print("REGRESSION", line)
+        return 1 if slower else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
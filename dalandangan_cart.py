@@ -0,0 +1,110 @@
+"""Shopping cart with exact money and server-side repricing.
+
+Amounts are held as integer cents and shown as Decimal, never float. The
+cart keeps its total up to date on every add/change/remove instead of
+re-summing the lines, and the prices it carries are only what the menu
+showed: place_order() re-prices every line from `products` in one
+`WHERE id IN (...)` query inside the order's transaction.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+
+CENT = Decimal("0.01")
+
+
+def to_cents(amount):
+    return int((Decimal(str(amount)) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def from_cents(cents):
+    return (Decimal(cents) / 100).quantize(CENT)
+
+
+class CartError(ValueError):
+    pass
+
+class ItemsUnavailable(CartError):
+    def __init__(self, names):
+        self.names = names
+        super().__init__(f"No longer available: {', '.join(names)}")
+
+class PriceChanged(CartError):
+    """The server total differs from what the customer saw; `prices` are the current unit prices."""
+
+    def __init__(self, prices, total):
+        self.prices, self.total = prices, total
+        super().__init__(f"Prices have changed; the new total is ₱{total:.2f}. Please review your cart.")
+
+
+# --------- Cart ----------
+class Cart(dict):
+    """product_id -> {'product': dict, 'qty': int}, the shape place_order takes.
+
+    Change it through add/set_qty/remove/clear so `total_cents` stays right.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.total_cents = 0
+
+    @property
+    def total(self):
+        return from_cents(self.total_cents)
+
+    def subtotal(self, pid):
+        line = self[pid]
+        return from_cents(to_cents(line['product']['price']) * line['qty'])
+
+    def add(self, product, qty):
+        pid = product['id']
+        line = self.get(pid)
+        if line is None:
+            line = self[pid] = {'product': product, 'qty': 0}
+        line['qty'] += qty
+        self.total_cents += to_cents(line['product']['price']) * qty
+
+    def set_qty(self, pid, qty):
+        line = self[pid]
+        self.total_cents += to_cents(line['product']['price']) * (qty - line['qty'])
+        line['qty'] = qty
+
+    def remove(self, pid):
+        line = self.pop(pid, None)
+        if line is not None:
+            self.total_cents -= to_cents(line['product']['price']) * line['qty']
+
+    def clear(self):
+        super().clear()
+        self.total_cents = 0
+
+    def copy(self):
+        other = Cart()
+        for line in self.values():
+            other.add(line['product'], line['qty'])
+        return other
+
+    def update_prices(self, prices):
+        """Apply current unit prices (product_id -> Decimal), e.g. from PriceChanged."""
+        for pid, price in prices.items():
+            line = self.get(pid)
+            if line is not None:
+                self.total_cents += (to_cents(price) - to_cents(line['product']['price'])) * line['qty']
+                line['product'] = dict(line['product'], price=Decimal(price))
+
+
+# --------- Server Pricing ----------
+PRICE_CHECK_SQL = "SELECT id, price, available FROM products WHERE id IN ({ids})"
+
+def reprice(cur, cart):
+    """Price `cart` from the products table on the caller's transaction cursor.
+
+    Returns ([(product_id, qty, unit_price)], total). Raises ItemsUnavailable
+    for products that are gone or switched off.
+    """
+    ids = list(cart)
+    cur.execute(PRICE_CHECK_SQL.format(ids=",".join(["%s"] * len(ids))), ids)
+    current = {pid: (price, available) for pid, price, available in cur.fetchall()}
+    gone = [cart[pid]['product'].get('name') or f"#{pid}" for pid in ids
+            if pid not in current or not current[pid][1]]
+    if gone:
+        raise ItemsUnavailable(gone)
+    lines = [(pid, cart[pid]['qty'], Decimal(current[pid][0])) for pid in ids]
+    return lines, from_cents(sum(to_cents(price) * qty for _, qty, price in lines))
@@ -0,0 +1,613 @@
+import atexit
+import contextvars
+import itertools
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import mysql.connector
+from mysql.connector.errors import PoolError
+
+from dalandangan_metrics import measure, statement_name
+
+log = logging.getLogger("dalandangan.db")
+
+# --------- DB CONFIG ----------
+DB_CONFIG = {
+    'host': '127.0.0.1',
+    'user': 'root',
+    'password': '',
+    'database': 'dalandangan_db'
+}
+
+# --------- POOL CONFIG ----------
+POOL_CONFIG = {
+    'size': 5,           # max open connections per terminal
+    'timeout': 10,       # seconds to wait for a free connection before giving up
+    'recycle': 1800,     # reconnect connections older than this (seconds)
+    'ping_after': 30,    # ping connections that sat idle longer than this before reuse
+    'statements': 32,    # prepared statements kept per connection (LRU)
+    'connect_timeout': 10,  # seconds to reach the server; an outage should reach the offline queue fast
+                            # (the connector also applies it to each network read, so keep it above
+                            # the slowest query's time to first row)
+}
+
+# --------- SHARD CONFIG ----------
+# Each branch's orders live on its own shard (a database, usually on its own
+# server); users and products are chain-wide, written on the home shard and
+# replicated to the branch shards. Order ids are per shard: give each shard
+# server its own auto_increment_offset if ids must not collide chain-wide.
+HOME_SHARD = 'home'
+SHARD_CONFIG = {
+    'store_id': int(os.environ.get("DALANDANGAN_STORE", "1")),  # the branch this terminal belongs to
+    'shards': {HOME_SHARD: {}},  # shard name -> DB_CONFIG overrides (host, database, ...)
+    'stores': {},                # store id -> shard name; stores not listed live on the home shard
+}
+
+def current_store():
+    return SHARD_CONFIG['store_id']
+
+def shard_for(store_id=None):
+    """Shard holding `store_id`'s orders (this terminal's store by default)."""
+    return SHARD_CONFIG['stores'].get(current_store() if store_id is None else store_id, HOME_SHARD)
+
+def shard_names():
+    return list(SHARD_CONFIG['shards'])
+
+def shard_config(shard):
+    if shard not in SHARD_CONFIG['shards']:
+        raise ValueError(f"Unknown shard {shard!r}")
+    return dict(DB_CONFIG, **SHARD_CONFIG['shards'][shard])
+
+# --------- REPLICA CONFIG ----------
+# Reads (fetch_*) go to a shard's read replicas when it has any; writes and
+# everything inside transaction() stay on the primary. After a session writes
+# to a shard its reads there stick to the primary for a while, so a customer
+# sees their own order right after checkout. For testing, a second local
+# MySQL instance is enough: {'home': [{'port': 3307}]}.
+REPLICA_CONFIG = {
+    'replicas': {},        # shard name -> list of DB_CONFIG overrides, one per replica
+    'sticky_seconds': 10,  # reads stay on the primary this long after the session's last write
+    'max_lag': 5,          # seconds; a replica further behind is skipped until it catches up
+    'lag_check_every': 10, # seconds between replication lag checks, per replica
+    'retry_after': 30,     # seconds before trying a replica that failed to connect again
+}
+
+def replica_config(shard, n):
+    return dict(shard_config(shard), **REPLICA_CONFIG['replicas'][shard][n])
+
+def replica_lag_allowance(shard=None):
+    """How stale a read of `shard` may be; watermark polling re-reads this far back."""
+    return REPLICA_CONFIG['max_lag'] if REPLICA_CONFIG['replicas'].get(shard or shard_for()) else 0
+
+def db_connect():
+    return mysql.connector.connect(**shard_config(shard_for()))
+
+
+# --------- Prepared Statements ----------
+class StatementCache:
+    """Server-side prepared statements for one connection, least recently used evicted first.
+
+    Each statement gets its own prepared cursor; re-executing the same query
+    string on it skips the parse and sends parameters over the binary protocol.
+    Closing an evicted cursor deallocates the statement on the server.
+    """
+
+    def __init__(self, conn, size, bump):
+        self.conn = conn
+        self.size = size
+        self._bump = bump
+        self._cursors = OrderedDict()  # query -> prepared cursor
+
+    def execute(self, query, params=()):
+        cur = self._cursors.get(query)
+        if cur is None:
+            cur = self.conn.cursor(prepared=True)
+            self._cursors[query] = cur
+            self._bump('prepares')
+            if len(self._cursors) > self.size:
+                _, old = self._cursors.popitem(last=False)
+                self._close(old); self._bump('statement_evictions')
+        else:
+            self._cursors.move_to_end(query)
+            self._bump('statement_hits')
+        try:
+            cur.execute(query, params)
+        except Exception:
+            # don't keep a cursor in an unknown state; it is re-prepared next time
+            self._close(self._cursors.pop(query))
+            raise
+        return cur
+
+    @staticmethod
+    def _close(cur):
+        try:
+            cur.close()
+        except Exception:
+            pass
+
+def _dict_rows(cur):
+    """Prepared cursors only return tuples; give callers the same dicts as everywhere else."""
+    if not cur.with_rows:
+        return []
+    cols = cur.column_names
+    return [dict(zip(cols, row)) for row in cur.fetchall()]
+
+
+# --------- Connection Pool ----------
+class ConnectionPool:
+    """Small thread-safe pool of MySQL connections.
+
+    Connections run in autocommit mode so a borrowed connection never holds an
+    old read snapshot; multi-statement writes open an explicit transaction.
+    """
+
+    def __init__(self, config, size=5, timeout=10, recycle=1800, ping_after=30, statements=32, connect_timeout=10):
+        self.config = dict(config)
+        self.config.setdefault('connection_timeout', connect_timeout)
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_after = ping_after
+        self.statements = statements
+        self._idle = queue.LifoQueue()  # LIFO keeps the warmest connection in use
+        self._slots = threading.BoundedSemaphore(size)
+        self._born = {}  # id(conn) -> monotonic time the connection was opened
+        self._stmts = {}  # id(conn) -> StatementCache, dropped with the connection
+        self._lock = threading.Lock()
+        self._closed = False
+        self.stats = {'checkouts': 0, 'waits': 0, 'timeouts': 0, 'connects': 0,
+                      'reconnects': 0, 'health_failures': 0, 'discarded': 0,
+                      'prepares': 0, 'statement_hits': 0, 'statement_evictions': 0}
+
+    def _bump(self, key, n=1):
+        with self._lock:
+            self.stats[key] += n
+
+    def _open(self):
+        conn = mysql.connector.connect(**self.config)
+        conn.autocommit = True
+        with self._lock:
+            self._born[id(conn)] = time.monotonic()
+            self.stats['connects'] += 1
+        return conn
+
+    def _discard(self, conn):
+        with self._lock:
+            self._born.pop(id(conn), None)
+            self._stmts.pop(id(conn), None)
+            self.stats['discarded'] += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _take_idle(self):
+        while True:
+            try:
+                conn, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return self._open()
+            now = time.monotonic()
+            if now - self._born.get(id(conn), now) > self.recycle:
+                self._discard(conn); self._bump('reconnects')
+                return self._open()
+            if now - last_used > self.ping_after:
+                try:
+                    conn.ping(reconnect=False)
+                except Exception:
+                    self._discard(conn)
+                    self._bump('health_failures'); self._bump('reconnects')
+                    continue
+            return conn
+
+    def acquire(self):
+        if self._closed:
+            raise PoolError("Connection pool is closed")
+        if not self._slots.acquire(blocking=False):
+            self._bump('waits')
+            if not self._slots.acquire(timeout=self.timeout):
+                self._bump('timeouts')
+                raise PoolError(f"No free database connection after {self.timeout}s (pool size {self.size})")
+        try:
+            conn = self._take_idle()
+        except Exception:
+            self._slots.release()
+            raise
+        self._bump('checkouts')
+        return conn
+
+    def release(self, conn, broken=False):
+        try:
+            if broken or self._closed:
+                self._discard(conn)
+            else:
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.put((conn, time.monotonic()))
+        except Exception:
+            self._discard(conn)
+        finally:
+            self._slots.release()
+
+    def statement_cache(self, conn):
+        """The prepared statement cache of a checked-out connection."""
+        cache = self._stmts.get(id(conn))
+        if cache is None:
+            with self._lock:
+                cache = self._stmts.setdefault(id(conn), StatementCache(conn, self.statements, self._bump))
+        return cache
+
+    def close_all(self):
+        self._closed = True
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    def snapshot(self):
+        with self._lock:
+            data = dict(self.stats)
+            data['open'] = len(self._born)
+        data['idle'] = self._idle.qsize()
+        data['size'] = self.size
+        return data
+
+
+_pools = {}  # (shard name, replica index or None for the primary) -> ConnectionPool
+_pool_lock = threading.Lock()
+
+def get_pool(shard=None, replica=None):
+    """The pool for `shard`'s primary (this terminal's store shard by default) or one of its replicas."""
+    key = (shard or shard_for(), replica)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pool_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                config = shard_config(key[0]) if replica is None else replica_config(*key)
+                pool = _pools[key] = ConnectionPool(config, **POOL_CONFIG)
+    return pool
+
+def configure_pool(**settings):
+    """Override POOL_CONFIG (size, timeout, recycle, ping_after, statements, connect_timeout) and rebuild the pools."""
+    unknown = set(settings) - set(POOL_CONFIG)
+    if unknown:
+        raise ValueError(f"Unknown pool setting(s): {', '.join(sorted(unknown))}")
+    POOL_CONFIG.update(settings)
+    _close_pool()
+    return get_pool()
+
+def configure_shards(store_id=None, shards=None, stores=None):
+    """Change this terminal's store and/or the shard map; open pools are rebuilt on next use."""
+    if store_id is not None:
+        SHARD_CONFIG['store_id'] = int(store_id)
+    if shards is not None:
+        SHARD_CONFIG['shards'] = {HOME_SHARD: {}, **shards}
+    if stores is not None:
+        SHARD_CONFIG['stores'] = {int(k): v for k, v in stores.items()}
+    unknown = set(SHARD_CONFIG['stores'].values()) - set(SHARD_CONFIG['shards'])
+    if unknown:
+        raise ValueError(f"Stores mapped to unknown shard(s): {', '.join(sorted(unknown))}")
+    _close_pool()
+
+def configure_replicas(replicas=None, **settings):
+    """Set the replica map and/or override REPLICA_CONFIG settings; open pools are rebuilt on next use."""
+    unknown = set(settings) - set(REPLICA_CONFIG) - {'replicas'}
+    if unknown:
+        raise ValueError(f"Unknown replica setting(s): {', '.join(sorted(unknown))}")
+    REPLICA_CONFIG.update(settings)
+    if replicas is not None:
+        missing = set(replicas) - set(SHARD_CONFIG['shards'])
+        if missing:
+            raise ValueError(f"Replicas for unknown shard(s): {', '.join(sorted(missing))}")
+        REPLICA_CONFIG['replicas'] = {shard: list(r) for shard, r in replicas.items()}
+    with _route_lock:
+        _replica_health.clear(); _sticky.clear()
+    _close_pool()
+
+def _close_pool():
+    with _pool_lock:
+        old = list(_pools.values())
+        _pools.clear()
+    for pool in old:
+        pool.close_all()
+
+atexit.register(_close_pool)
+
+def pool_stats(shard=None, replica=None):
+    return get_pool(shard, replica).snapshot()
+
+
+# --------- Read Routing ----------
+_session = contextvars.ContextVar("db_session", default=None)
+_sticky = {}          # (session, shard) -> monotonic time its reads may use replicas again
+_replica_health = {}  # (shard, replica) -> {'down_until': t, 'checked': t}
+_route_lock = threading.Lock()
+_next_replica = itertools.count()
+ROUTE_STATS = {'primary_reads': 0, 'replica_reads': 0, 'sticky_reads': 0,
+               'replica_failures': 0, 'replica_lagging': 0}
+
+def _count(key):
+    with _route_lock:
+        ROUTE_STATS[key] += 1
+
+def routing_stats():
+    with _route_lock:
+        return dict(ROUTE_STATS)
+
+@contextmanager
+def read_session(key):
+    """Keep read-your-writes stickiness per `key` (e.g. a logged-in API user).
+
+    Outside any session the whole process is one session, which is right for
+    a terminal that one person uses at a time.
+    """
+    token = _session.set(key)
+    try:
+        yield
+    finally:
+        _session.reset(token)
+
+def _wrote(shard):
+    shard = shard or shard_for()
+    if not REPLICA_CONFIG['replicas'].get(shard):
+        return
+    now = time.monotonic()
+    with _route_lock:
+        if len(_sticky) > 1024:
+            for k in [k for k, until in _sticky.items() if until <= now]:
+                del _sticky[k]
+        _sticky[(_session.get(), shard)] = now + REPLICA_CONFIG['sticky_seconds']
+
+def _is_sticky(shard):
+    with _route_lock:
+        until = _sticky.get((_session.get(), shard))
+        if until is not None and until <= time.monotonic():
+            del _sticky[(_session.get(), shard)]
+            until = None
+    return until is not None
+
+def _replication_lag(conn):
+    """Seconds the replica is behind; None if it reports no replication at all."""
+    cur = conn.cursor(dictionary=True, buffered=True)
+    try:
+        for stmt in ("SHOW REPLICA STATUS", "SHOW SLAVE STATUS"):  # the second for MySQL < 8.0.22
+            try:
+                cur.execute(stmt)
+            except mysql.connector.ProgrammingError:
+                continue
+            row = cur.fetchone()
+            if row is None:
+                return None
+            lag = row.get('Seconds_Behind_Source', row.get('Seconds_Behind_Master'))
+            return float('inf') if lag is None else lag  # NULL: replication is stopped
+        raise PoolError("Could not read replication status")
+    finally:
+        cur.close()
+
+def _replica_connection(shard):
+    """(pool, conn) on a healthy replica of `shard`, or (None, None) when the read belongs on the primary."""
+    replicas = REPLICA_CONFIG['replicas'].get(shard)
+    if not replicas:
+        return None, None
+    if _is_sticky(shard):
+        _count('sticky_reads')
+        return None, None
+    start = next(_next_replica)
+    for k in range(len(replicas)):
+        key = (shard, (start + k) % len(replicas))
+        now = time.monotonic()
+        with _route_lock:
+            health = _replica_health.setdefault(key, {'down_until': 0, 'checked': 0})
+            if health['down_until'] > now:
+                continue
+            check = now - health['checked'] >= REPLICA_CONFIG['lag_check_every']
+            if check:
+                health['checked'] = now
+        pool, conn = get_pool(*key), None
+        try:
+            with measure("pool", "acquire replica"):
+                conn = pool.acquire()
+            lag = _replication_lag(conn) if check else None
+        except Exception as e:
+            if conn is not None:
+                pool.release(conn, broken=True)
+            log.warning("replica %s/%s unavailable: %s", *key, e)
+            with _route_lock:
+                health['down_until'] = now + REPLICA_CONFIG['retry_after']
+            _count('replica_failures')
+            continue
+        if lag is not None and lag > REPLICA_CONFIG['max_lag']:
+            pool.release(conn)
+            with _route_lock:
+                health['down_until'] = now + REPLICA_CONFIG['lag_check_every']
+                health['checked'] = 0  # look again as soon as it is back in rotation
+            _count('replica_lagging')
+            continue
+        _count('replica_reads')
+        return pool, conn
+    return None, None
+
+def fan_out(fn, shards=None):
+    """Run fn(shard) on every shard (or the given ones) in parallel; returns {shard: result}.
+
+    Each call borrows from its own shard's pool, so a slow branch only delays
+    the merged answer, not the other branches' terminals.
+    """
+    shards = list(shards or shard_names())
+    if len(shards) == 1:
+        return {shards[0]: fn(shards[0])}
+    with ThreadPoolExecutor(max_workers=len(shards), thread_name_prefix="shard") as ex:
+        # each worker runs in a copy of the caller's context, so its read session carries over
+        futures = {s: ex.submit(contextvars.copy_context().run, fn, s) for s in shards}
+        return {s: f.result() for s, f in futures.items()}
+
+def fetch_all_shards(query, params=(), shards=None):
+    """fetch_all on every shard; each row is tagged with its 'shard'."""
+    rows = []
+    for shard, part in fan_out(lambda s: fetch_all(query, params, shard=s), shards).items():
+        for r in part:
+            r['shard'] = shard
+        rows += part
+    return rows
+
+@contextmanager
+def _lent(pool, conn):
+    try:
+        yield conn
+    except Exception:
+        # a failed statement usually leaves the connection usable; a dropped link does not
+        try:
+            broken = not conn.is_connected()
+        except Exception:
+            broken = True
+        pool.release(conn, broken=broken)
+        raise
+    else:
+        pool.release(conn)
+
+@contextmanager
+def pooled_connection(shard=None):
+    """A primary connection of `shard`."""
+    pool = get_pool(shard)
+    with measure("pool", "acquire"):
+        conn = pool.acquire()
+    with _lent(pool, conn):
+        yield conn
+
+@contextmanager
+def read_connection(shard=None, primary=False):
+    """(pool, conn) for a read: a replica when one is healthy and the session
+    has not written to the shard lately, otherwise the primary."""
+    shard = shard or shard_for()
+    pool, conn = (None, None) if primary else _replica_connection(shard)
+    if conn is None:
+        _count('primary_reads')
+        pool = get_pool(shard)
+        with measure("pool", "acquire"):
+            conn = pool.acquire()
+    with _lent(pool, conn):
+        yield pool, conn
+
+class TxCursor:
+    """The cursor a transaction yields: a plain cursor plus execute_prepared()."""
+
+    def __init__(self, cur, statements):
+        self._cur = cur
+        self._statements = statements
+
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+
+    def execute_prepared(self, query, params=()):
+        """Run a hot, constant statement prepared on this connection; returns its cursor."""
+        return self._statements.execute(query, params)
+
+@contextmanager
+def transaction(name="transaction", shard=None):
+    """Borrow a connection, run everything on one cursor, commit once at the end.
+
+    `name` labels the whole transaction in the metrics.
+    """
+    with measure("txn", name), pooled_connection(shard) as conn:
+        conn.start_transaction()
+        cur = conn.cursor()
+        try:
+            yield TxCursor(cur, get_pool(shard).statement_cache(conn))
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            raise
+        else:
+            conn.commit()
+            _wrote(shard)
+        finally:
+            cur.close()
+
+
+# --------- DB Helpers ----------
+# prepared=True is for hot statements whose text never changes; queries built
+# per call (filters, IN lists of any length) would just churn the LRU.
+# shard=None runs on this terminal's store shard; pass HOME_SHARD for the
+# chain-wide tables (users, products) when writing or when lag matters.
+# Reads may be served by a replica; primary=True is for reads that must see
+# every committed write (idempotency checks, read-then-write logic).
+def fetch_one(query, params=(), prepared=False, shard=None, primary=False):
+    with measure("sql", statement_name(query)) as m, read_connection(shard, primary) as (pool, conn):
+        if prepared:
+            rows = _dict_rows(pool.statement_cache(conn).execute(query, params))
+            res = rows[0] if rows else None
+        else:
+            cur = conn.cursor(dictionary=True, buffered=True)
+            cur.execute(query, params)
+            res = cur.fetchone()
+            cur.close()
+        m['rows'] = 0 if res is None else 1
+    return res
+
+def fetch_all(query, params=(), prepared=False, shard=None, primary=False):
+    with measure("sql", statement_name(query)) as m, read_connection(shard, primary) as (pool, conn):
+        if prepared:
+            res = _dict_rows(pool.statement_cache(conn).execute(query, params))
+        else:
+            cur = conn.cursor(dictionary=True)
+            cur.execute(query, params)
+            res = cur.fetchall()
+            cur.close()
+        m['rows'] = len(res)
+    return res
+
+def fetch_iter(query, params=(), batch=1000, shard=None, primary=False):
+    """Yield rows from an unbuffered cursor, `batch` at a time, for result sets too big for fetch_all.
+
+    The pooled connection stays checked out until the generator is exhausted or closed.
+    """
+    shard = shard or shard_for()
+    pool, conn = (None, None) if primary else _replica_connection(shard)
+    if conn is None:
+        _count('primary_reads')
+        pool = get_pool(shard)
+        conn = pool.acquire()
+    broken = False
+    try:
+        cur = conn.cursor(dictionary=True)
+        # only the server side is timed; the consumer's pace is not the query's fault
+        with measure("sql", statement_name(query)):
+            cur.execute(query, params)
+        while True:
+            rows = cur.fetchmany(batch)
+            if not rows:
+                break
+            yield from rows
+        cur.close()
+    except BaseException:
+        # an abandoned stream leaves unread rows behind; dropping the
+        # connection is cheaper than draining them
+        broken = True
+        raise
+    finally:
+        pool.release(conn, broken=broken)
+
+def execute(query, params=(), prepared=False, shard=None):
+    with measure("sql", statement_name(query)) as m, pooled_connection(shard) as conn:
+        if prepared:
+            cur = get_pool(shard).statement_cache(conn).execute(query, params)
+            lastid, m['rows'] = cur.lastrowid, cur.rowcount
+        else:
+            cur = conn.cursor()
+            cur.execute(query, params)
+            lastid = cur.lastrowid
+            m['rows'] = cur.rowcount
+            cur.close()
+    _wrote(shard)
+    return lastid
@@ -0,0 +1,185 @@
+"""Delivery dispatch: riders, multi-drop runs and one-shot run commits.
+
+Orders that are Ready for Delivery are grouped by area into runs of up to
+`max_drops` stops, oldest first. Areas come from DISPATCH_CONFIG['areas']
+(address keywords) or, failing that, the barangay/district part of the
+address; a part-filled run takes a whole run from a neighbouring area when
+both fit on one bike. Each run is offered the rider who is free soonest:
+idle riders first (longest idle leads), then riders still out, by when they
+should be back.
+
+dispatch_run() commits a run in one transaction: every order moves
+Ready for Delivery -> Out for Delivery together, or none does. The DB layer
+is imported by the functions that use it, so the planner works (and is
+tested) without a MySQL driver.
+"""
+import re
+from datetime import datetime, timedelta
+
+DISPATCH_CONFIG = {
+    'max_drops': 4,        # orders one rider takes per run
+    'drop_minutes': 10,    # per stop, for estimating when a rider is back
+    'return_minutes': 10,  # ride back to the store after the last stop
+    'areas': {},           # area name -> address keywords, e.g. {'Poblacion': ['poblacion', 'town proper']}
+    'neighbours': {},      # area -> nearby areas whose orders may share a run
+}
+
+# --------- Riders ----------
+# open_drops: deliveries picked up and not yet delivered; last_back: the
+# rider's latest delivery today, to rotate idle riders fairly
+RIDERS_SQL = """
+    SELECT r.id, r.name, r.phone,
+           COUNT(CASE WHEN d.status='Picked Up' THEN 1 END) AS open_drops,
+           MIN(CASE WHEN d.status='Picked Up' THEN d.pickup_time END) AS out_since,
+           MAX(d.delivered_at) AS last_back
+    FROM riders r
+    LEFT JOIN deliveries d ON d.rider_id=r.id AND (d.status='Picked Up' OR d.delivered_at >= CURDATE())
+    WHERE r.store_id=%s AND r.active=1
+    GROUP BY r.id, r.name, r.phone
+    ORDER BY r.name
+"""
+
+def riders():
+    from dalandangan_db import current_store, fetch_all
+    return fetch_all(RIDERS_SQL, (current_store(),))
+
+def add_rider(name, phone=None):
+    from dalandangan_db import current_store, execute
+    return execute("INSERT INTO riders (store_id, name, phone) VALUES (%s,%s,%s)", (current_store(), name, phone))
+
+def set_rider_active(rider_id, active):
+    from dalandangan_db import current_store, execute
+    execute("UPDATE riders SET active=%s WHERE id=%s AND store_id=%s", (int(bool(active)), rider_id, current_store()))
+
+
+# --------- Ready Orders ----------
+READY_ORDERS_SQL = """
+    SELECT o.id, o.total, o.created_at, o.updated_at, o.delivery_address, o.contact_number, u.full_name
+    FROM orders o
+    JOIN users u ON o.user_id=u.id
+    WHERE o.store_id=%s AND o.status='Ready for Delivery'
+    ORDER BY o.updated_at, o.id
+"""
+
+def ready_orders():
+    from dalandangan_db import current_store, fetch_all
+    return fetch_all(READY_ORDERS_SQL, (current_store(),))
+
+
+# --------- Planner ----------
+_AREA_PART = re.compile(r"^(brgy\.?|barangay|bgy\.?|purok|sitio|zone|subd\.?|village)\b", re.I)
+
+class DispatchPlanner:
+    def __init__(self, config=None):
+        self.config = dict(DISPATCH_CONFIG, **(config or {}))
+
+    def area(self, address):
+        text = (address or "").lower()
+        for name, words in self.config['areas'].items():
+            if any(w.lower() in text for w in words):
+                return name
+        parts = [" ".join(p.split()) for p in re.split(r"[,\n]", address or "") if p.strip()]
+        for p in parts:
+            if _AREA_PART.match(p):
+                return p.title()
+        # "street, district, city": the district is the useful part
+        return (parts[-2] if len(parts) >= 2 else parts[0] if parts else "Unknown").title()
+
+    def runs(self, orders):
+        """Group ready orders into runs: [{'area', 'orders'}], most urgent run first."""
+        cap = max(1, self.config['max_drops'])
+        by_area = {}
+        for o in sorted(orders, key=lambda o: (o.get('updated_at') or o['created_at'], o['id'])):
+            by_area.setdefault(self.area(o['delivery_address']), []).append(o)
+        runs = [{'area': a, 'orders': group[i:i + cap]}
+                for a, group in by_area.items() for i in range(0, len(group), cap)]
+
+        # part-filled runs take a whole neighbouring run when both fit
+        neighbours = self.config['neighbours']
+        for run in runs:
+            for other in runs:
+                if (other is run or not other['orders'] or not run['orders']
+                        or other['area'] not in neighbours.get(run['area'].split(" + ")[0], ())
+                        or len(run['orders']) + len(other['orders']) > cap):
+                    continue
+                run['orders'] += other['orders']; other['orders'] = []
+                run['area'] += " + " + other['area']
+        runs = [r for r in runs if r['orders']]
+        runs.sort(key=lambda r: min((o.get('updated_at') or o['created_at'], o['id']) for o in r['orders']))
+        return runs
+
+    def back_at(self, rider, now):
+        """When a rider should be at the store again."""
+        cfg = self.config
+        if not rider['open_drops']:
+            return now
+        out = rider['out_since'] or now
+        back = out + timedelta(minutes=rider['open_drops'] * cfg['drop_minutes'] + cfg['return_minutes'])
+        return max(now, back)
+
+    def suggest(self, orders, riders, now=None):
+        """Runs with a suggested rider each: [{'area', 'orders', 'rider', 'leaves', 'back'}].
+
+        Each rider is offered at most one run; runs beyond the riders on shift
+        get rider None and wait.
+        """
+        cfg = self.config
+        now = now or datetime.now()
+        idle = sorted((r for r in riders if not r['open_drops']), key=lambda r: (r['last_back'] or datetime.min, r['id']))
+        out = sorted((r for r in riders if r['open_drops']), key=lambda r: (self.back_at(r, now), r['id']))
+        queue = idle + out
+        runs = self.runs(orders)
+        for k, run in enumerate(runs):
+            rider = queue[k] if k < len(queue) else None
+            run['rider'] = rider
+            run['leaves'] = self.back_at(rider, now) if rider else None
+            run['back'] = (run['leaves'] + timedelta(minutes=len(run['orders']) * cfg['drop_minutes']
+                                                     + cfg['return_minutes'])) if rider else None
+        return runs
+
+
+# --------- Committing a Run ----------
+RIDER_LOCK_SQL = "SELECT name FROM riders WHERE id=%s AND store_id=%s AND active=1 FOR UPDATE"
+LOCK_ORDERS_SQL = "SELECT id, status FROM orders WHERE store_id=%s AND id IN ({ids}) FOR UPDATE"
+INSERT_RUN_SQL = "INSERT INTO delivery_runs (store_id, rider_id, drops) VALUES (%s,%s,%s)"
+DISPATCH_SQL = """UPDATE orders SET status='Out for Delivery'
+                  WHERE store_id=%s AND status='Ready for Delivery' AND id IN ({ids})"""
+RUN_DELIVERY_SQL = """INSERT INTO deliveries (order_id, delivery_person, rider_id, run_id, pickup_time, status)
+                      VALUES {rows}"""
+
+def dispatch_run(rider_id, order_ids, op_key=None):
+    """Send `rider_id` out with all of `order_ids` in one transaction; returns the run id.
+
+    If any order is no longer Ready for Delivery (another terminal dispatched
+    it, or it never was) nothing is written and InvalidTransition names it.
+    """
+    ids = list(dict.fromkeys(int(i) for i in order_ids))
+    if not ids:
+        raise ValueError("A run needs at least one order")
+    if len(ids) > max(1, DISPATCH_CONFIG['max_drops']):
+        raise ValueError(f"A run takes at most {DISPATCH_CONFIG['max_drops']} orders")
+    from dalandangan_db import current_store, transaction
+    from dalandangan_events import bus, record_event
+    from dalandangan_orders import CLAIM_OP_SQL, InvalidTransition
+    store = current_store()
+    marks = ",".join(["%s"] * len(ids))
+    with transaction("dispatch_run") as cur:
+        if op_key:
+            cur.execute_prepared(CLAIM_OP_SQL, (op_key, None))
+        rider = cur.execute_prepared(RIDER_LOCK_SQL, (rider_id, store)).fetchall()
+        if not rider:
+            raise ValueError(f"Rider #{rider_id} is not on shift at this store")
+        # lock the run's orders first: a terminal dispatching any of them waits, then sees them gone
+        cur.execute(LOCK_ORDERS_SQL.format(ids=marks), (store, *ids))
+        status = dict(cur.fetchall())
+        bad = next((i for i in ids if status.get(i) != 'Ready for Delivery'), None)
+        if bad is not None:
+            raise InvalidTransition(bad, status.get(bad), 'Out for Delivery')
+        cur.execute(DISPATCH_SQL.format(ids=marks), (store, *ids))
+        run_id = cur.execute_prepared(INSERT_RUN_SQL, (store, rider_id, len(ids))).lastrowid
+        cur.execute(RUN_DELIVERY_SQL.format(rows=",".join(["(%s,%s,%s,%s,NOW(),'Picked Up')"] * len(ids))),
+                    [v for oid in ids for v in (oid, rider[0][0], rider_id, run_id)])
+        events = [record_event(cur, oid, 'dispatched', 'Out for Delivery') for oid in ids]
+    for event in events:
+        bus.publish(event)
+    return run_id
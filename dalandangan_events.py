@@ -0,0 +1,153 @@
+"""Order event channel: an outbox table tailed by a notifier thread.
+
+Every order write adds a row to `order_events` inside its own transaction, so
+an event exists exactly when the change committed. Each terminal runs one
+OutboxNotifier that tails the table by primary key (a cheap range read, never
+a scan of `orders`) and publishes new events on the process-wide `bus`.
+Writes made on this terminal are also published straight away.
+"""
+import queue
+import threading
+import time
+from collections import deque
+
+from dalandangan_db import fetch_all, fetch_one, execute
+
+# --------- Outbox ----------
+EVENT_INSERT_SQL = "INSERT INTO order_events (order_id, kind, status) VALUES (%s,%s,%s)"
+
+def record_event(cur, order_id, kind, status=None):
+    """Write an outbox row on the caller's transaction cursor; returns the event dict."""
+    ins = cur.execute_prepared(EVENT_INSERT_SQL, (order_id, kind, status))
+    return {'id': ins.lastrowid, 'order_id': int(order_id), 'kind': kind, 'status': status}
+
+def prune_events(keep_hours=48):
+    execute("DELETE FROM order_events WHERE created_at < NOW() - INTERVAL %s HOUR", (keep_hours,))
+
+# an idempotency key must outlive every queued write that may still replay
+# under it; dalandangan_offline gives up on writes queued for MAX_QUEUED_DAYS
+CLIENT_OPS_KEEP_DAYS = 30
+
+def prune_client_ops(keep_days=CLIENT_OPS_KEEP_DAYS):
+    execute("DELETE FROM client_ops WHERE applied_at < NOW() - INTERVAL %s DAY", (keep_days,))
+
+
+# --------- Local Pub/Sub ----------
+class EventBus:
+    """Thread-safe fan-out of order events; duplicate event ids are delivered once."""
+
+    def __init__(self, remember=5000):
+        self._subs = []
+        self._lock = threading.Lock()
+        self._seen = set()
+        self._seen_order = deque(maxlen=remember)
+
+    def subscribe(self, fn):
+        with self._lock:
+            self._subs.append(fn)
+        def unsubscribe():
+            with self._lock:
+                if fn in self._subs:
+                    self._subs.remove(fn)
+        return unsubscribe
+
+    def publish(self, event):
+        with self._lock:
+            eid = event.get('id')
+            if eid is not None:
+                if eid in self._seen:
+                    return
+                if len(self._seen_order) == self._seen_order.maxlen:
+                    self._seen.discard(self._seen_order[0])
+                self._seen.add(eid); self._seen_order.append(eid)
+            subs = list(self._subs)
+        for fn in subs:
+            try:
+                fn(event)
+            except Exception:
+                pass
+
+bus = EventBus()
+
+
+# --------- Outbox Notifier ----------
+class OutboxNotifier(threading.Thread):
+    """Tails order_events and publishes new rows on the bus.
+
+    Auto-increment ids can commit out of order, so each poll re-reads a short
+    window behind the highest id seen; the bus drops the repeats.
+    """
+
+    def __init__(self, event_bus=bus, interval=0.5, lookback=50, batch=500, prune_every=3600):
+        super().__init__(name="order-events", daemon=True)
+        self.bus = event_bus
+        self.interval = interval
+        self.lookback = lookback
+        self.batch = batch
+        self.last_id = None
+        self.prune_every = prune_every
+        self._halt = threading.Event()
+
+    def stop(self):
+        self._halt.set()
+
+    def poll_once(self):
+        if self.last_id is None:
+            row = fetch_one("SELECT COALESCE(MAX(id), 0) AS last FROM order_events")
+            self.last_id = row['last']
+            return 0
+        rows = fetch_all("""SELECT id, order_id, kind, status FROM order_events
+                            WHERE id > %s ORDER BY id LIMIT %s""",
+                         (max(0, self.last_id - self.lookback), self.batch))
+        for r in rows:
+            self.bus.publish(r)
+            self.last_id = max(self.last_id, r['id'])
+        return len(rows)
+
+    def run(self):
+        next_prune = time.monotonic() + self.prune_every
+        while not self._halt.is_set():
+            try:
+                self.poll_once()
+                if time.monotonic() >= next_prune:
+                    prune_events(); prune_client_ops()
+                    next_prune = time.monotonic() + self.prune_every
+            except Exception:
+                pass  # DB hiccup: keep the thread alive and try again
+            self._halt.wait(self.interval)
+
+
+# --------- Tk Bridge ----------
+class TkEventPump:
+    """Delivers bus events to Tk handlers on the main loop.
+
+    Handlers registered with an `owner` widget are dropped automatically once
+    that widget is destroyed, so dashboards never have to unsubscribe.
+    """
+
+    def __init__(self, root, event_bus=bus, interval_ms=100):
+        self.root = root
+        self.interval_ms = interval_ms
+        self._inbox = queue.SimpleQueue()
+        self._handlers = []
+        event_bus.subscribe(self._inbox.put)
+        root.after(interval_ms, self._drain)
+
+    def subscribe(self, handler, owner=None):
+        self._handlers.append((handler, owner))
+
+    def _drain(self):
+        events = []
+        while True:
+            try:
+                events.append(self._inbox.get_nowait())
+            except queue.Empty:
+                break
+        if events:
+            self._handlers = [(h, o) for h, o in self._handlers if o is None or o.winfo_exists()]
+            for handler, _ in list(self._handlers):
+                try:
+                    handler(events)
+                except Exception:
+                    pass
+        self.root.after(self.interval_ms, self._drain)
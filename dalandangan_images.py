@@ -0,0 +1,101 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image, ImageTk
+
+THUMB_DIR = os.path.join(".cache", "thumbs")
+
+# --------- Thumbnail Cache ----------
+class ThumbnailCache:
+    """Pre-resized images on disk plus an in-memory LRU of PhotoImages.
+
+    Disk entries are keyed by source path, mtime and size, so replacing a
+    product photo simply produces a new thumbnail. `load()` only touches PIL
+    and is safe on a worker thread; `photo()` creates Tk objects and must run
+    on the main loop.
+    """
+
+    def __init__(self, cache_dir=THUMB_DIR, max_photos=256):
+        self.cache_dir = cache_dir
+        self.max_photos = max_photos
+        self._photos = OrderedDict()
+        self._dirs = {}  # directory -> (mtime, {lowercased file name: path})
+        self._lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'decodes': 0}
+
+    def _key(self, src, size):
+        st = os.stat(src)
+        raw = f"{os.path.abspath(src)}|{st.st_mtime_ns}|{st.st_size}|{size[0]}x{size[1]}"
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    def load(self, src, size):
+        """Return a resized PIL image, decoding the original only on a cache miss."""
+        key = self._key(src, size)
+        cached = os.path.join(self.cache_dir, key + ".png")
+        if os.path.exists(cached):
+            try:
+                img = Image.open(cached); img.load()
+                self.stats['disk_hits'] += 1
+                return img
+            except OSError:
+                pass  # unreadable cache file: rebuild it below
+        img = Image.open(src).resize(size)
+        self.stats['decodes'] += 1
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = f"{cached}.{threading.get_ident()}.tmp"
+            img.save(tmp, "PNG")
+            os.replace(tmp, cached)
+        except OSError:
+            pass  # read-only disk: still return the image
+        return img
+
+    def peek(self, src, size):
+        """PhotoImage already in memory for `src`, or None; never decodes."""
+        try:
+            key = self._key(src, size)
+        except OSError:
+            return None
+        with self._lock:
+            photo = self._photos.get(key)
+            if photo is not None:
+                self._photos.move_to_end(key)
+                self.stats['memory_hits'] += 1
+            return photo
+
+    def photo(self, src, size, image=None):
+        """PhotoImage for `src`, reusing one from memory when the file hasn't changed.
+
+        Pass `image` when it was already loaded on a worker thread.
+        """
+        key = self._key(src, size)
+        with self._lock:
+            if key in self._photos:
+                self._photos.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return self._photos[key]
+        photo = ImageTk.PhotoImage(image if image is not None else self.load(src, size))
+        with self._lock:
+            self._photos[key] = photo
+            while len(self._photos) > self.max_photos:
+                self._photos.popitem(last=False)
+        return photo
+
+    def find(self, directory, stem, exts=(".jpg", ".jpeg", ".png")):
+        """Look up `<stem><ext>` in a directory listing cached until the directory changes."""
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            return None
+        with self._lock:
+            entry = self._dirs.get(directory)
+            if entry is None or entry[0] != mtime:
+                names = {e.name.lower(): e.path for e in os.scandir(directory) if e.is_file()}
+                entry = self._dirs[directory] = (mtime, names)
+        for ext in exts:
+            path = entry[1].get(stem.lower() + ext)
+            if path:
+                return path
+        return None
@@ -0,0 +1,165 @@
+"""Kitchen scheduling: which pizzas go in the oven next.
+
+Tickets (kitchen orders with their items) are kept in a KitchenScheduler that
+is updated order by order from the board's change feed. plan() turns them
+into oven loads:
+
+  * every pizza has a latest start time: the order's kitchen due time (order
+    time + promise - travel) minus that pizza's prep time;
+  * the most urgent pizza opens a load, identical pizzas from orders due soon
+    after it ride along (one tray, one timer), and spare slots go to the next
+    most urgent pizzas that don't take longer than the load already does;
+  * loads are assigned to the oven that frees up first; orders already
+    Preparing hold their oven until their own prep time has passed.
+
+Prep times come from products.prep_minutes (migration 008) with a default.
+The loaders import the DB layer when called, so the scheduler itself can be
+used (and tested) without a MySQL driver.
+"""
+from datetime import datetime, timedelta
+
+KITCHEN_STATUSES = ("Pending", "Preparing")  # what kitchen_orders() reads; anything else leaves the board
+
+KITCHEN_CONFIG = {
+    'promise_minutes': 45,       # delivery time promised to the customer
+    'travel_minutes': 15,        # kept free for the rider; the kitchen is due this much earlier
+    'default_prep_minutes': 12,  # products without prep_minutes
+    'ovens': 1,
+    'oven_slots': 6,             # pizzas per oven load
+    'group_window_minutes': 15,  # identical pizzas due within this much of the load's first one join it
+}
+
+ORDER_ITEMS_SQL = """
+    SELECT oi.order_id, oi.product_id, p.name, oi.qty, COALESCE(p.prep_minutes, %s) AS prep_minutes
+    FROM order_items oi
+    JOIN products p ON p.id=oi.product_id
+    WHERE oi.order_id IN ({ids})
+"""
+
+# --------- Loading (DbWorker side) ----------
+def attach_items(rows):
+    """Add an 'items' list to each kitchen-status order row (one query for all of them)."""
+    from dalandangan_db import fetch_all
+    ids = [r['id'] for r in rows if r['status'] in KITCHEN_STATUSES]
+    items = {}
+    if ids:
+        sql = ORDER_ITEMS_SQL.format(ids=",".join(["%s"] * len(ids)))
+        for it in fetch_all(sql, (KITCHEN_CONFIG['default_prep_minutes'], *ids)):
+            items.setdefault(it['order_id'], []).append(it)
+    for r in rows:
+        r['items'] = items.get(r['id'], [])
+    return rows
+
+def kitchen_tickets():
+    from dalandangan_orders import kitchen_orders
+    return attach_items(kitchen_orders())
+
+def kitchen_changes(since, limit=500):
+    """changes_since() with items attached, for the board's ChangePoller."""
+    from dalandangan_orders import changes_since
+    rows, mark = changes_since(since, limit)
+    return attach_items(rows), mark
+
+
+# --------- Scheduler (Tk side) ----------
+class KitchenScheduler:
+    def __init__(self, config=None):
+        self.config = dict(KITCHEN_CONFIG, **(config or {}))
+        self.tickets = {}  # order id -> order row with items
+
+    def load(self, rows):
+        self.tickets.clear()
+        self.apply(rows)
+
+    def apply(self, rows):
+        """Fold changed orders in: kitchen statuses are (re)placed, anything else leaves the queue."""
+        for r in rows:
+            if r['status'] in KITCHEN_STATUSES:
+                self.tickets[r['id']] = r
+            else:
+                self.tickets.pop(r['id'], None)
+
+    def due(self, ticket):
+        cfg = self.config
+        return ticket['created_at'] + timedelta(minutes=cfg['promise_minutes'] - cfg['travel_minutes'])
+
+    def plan(self, now=None):
+        """Returns {'loads': [...], 'orders': {id: {'seq', 'eta', 'due', 'late'}}}.
+
+        Each load is {'oven', 'start', 'ready', 'lines': [{'name', 'qty', 'orders'}]}.
+        """
+        cfg = self.config
+        now = now or datetime.now()
+        ovens = [now] * max(1, cfg['ovens'])
+        eta, seq = {}, {}
+
+        # orders in progress keep their oven until they should be done
+        preparing = sorted((t for t in self.tickets.values() if t['status'] == 'Preparing'),
+                           key=lambda t: t.get('updated_at') or t['created_at'])
+        for t in preparing:
+            prep = max((i['prep_minutes'] for i in t['items']), default=cfg['default_prep_minutes'])
+            started = t.get('updated_at') or now
+            done = max(now, started + timedelta(minutes=prep))
+            k = ovens.index(min(ovens))
+            ovens[k] = max(ovens[k], done)
+            eta[t['id']] = done
+
+        # one entry per pizza: (latest start, order id, product id, name, prep minutes)
+        units = []
+        for t in self.tickets.values():
+            if t['status'] != 'Pending':
+                continue
+            due = self.due(t)
+            for it in t['items']:
+                latest = due - timedelta(minutes=it['prep_minutes'])
+                units += [(latest, t['id'], it['product_id'], it['name'], it['prep_minutes'])] * it['qty']
+        units.sort(key=lambda u: (u[0], u[1]))
+
+        window = timedelta(minutes=cfg['group_window_minutes'])
+        slots = max(1, cfg['oven_slots'])
+        loads = []
+        while units:
+            head = units[0]
+            taken = [0]
+            for k in range(1, len(units)):  # identical pizzas first
+                if len(taken) == slots:
+                    break
+                if units[k][2] == head[2] and units[k][0] <= head[0] + window:
+                    taken.append(k)
+            for k in range(1, len(units)):  # then whatever is next and fits the timer
+                if len(taken) == slots:
+                    break
+                if k not in taken and units[k][4] <= head[4]:
+                    taken.append(k)
+            batch = [units[k] for k in taken]
+            chosen = set(taken)
+            units = [u for k, u in enumerate(units) if k not in chosen]
+
+            oven = ovens.index(min(ovens))
+            start = max(now, ovens[oven])
+            ready = start + timedelta(minutes=max(u[4] for u in batch))
+            ovens[oven] = ready
+
+            lines = {}
+            for _, oid, pid, name, _ in batch:
+                line = lines.setdefault(pid, {'name': name, 'qty': 0, 'orders': []})
+                line['qty'] += 1
+                if oid not in line['orders']:
+                    line['orders'].append(oid)
+                eta[oid] = max(eta.get(oid, ready), ready)
+                seq.setdefault(oid, len(loads) + 1)
+            loads.append({'oven': oven + 1, 'start': start, 'ready': ready, 'lines': list(lines.values())})
+
+        orders = {}
+        for oid, t in self.tickets.items():
+            ready = eta.get(oid, now)  # a ticket with no items has nothing to wait for
+            orders[oid] = {'seq': 0 if t['status'] == 'Preparing' else seq.get(oid, 0),
+                           'eta': ready, 'due': self.due(t), 'late': ready > self.due(t)}
+        return {'loads': loads, 'orders': orders}
+
+    def queue(self, now=None):
+        """Tickets in cooking order (in progress first), each with its plan entry; plus the loads."""
+        plan = self.plan(now)
+        order = sorted(self.tickets.values(),
+                       key=lambda t: (plan['orders'][t['id']]['seq'], plan['orders'][t['id']]['eta'], t['id']))
+        return [(t, plan['orders'][t['id']]) for t in order], plan['loads']
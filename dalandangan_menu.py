@@ -0,0 +1,89 @@
+import threading
+import time
+
+import mysql.connector
+
+from dalandangan_db import fan_out, fetch_all, shard_for, transaction
+from dalandangan_events import bus, record_event
+
+# one row per product name (the lowest id wins), only the columns the menu uses
+MENU_SQL = """
+    SELECT p.id, p.name, p.price, p.image_path
+    FROM products p
+    JOIN (SELECT MIN(id) AS id FROM products
+          WHERE available=1 AND TRIM(name) <> ''
+          GROUP BY TRIM(name)) first ON first.id=p.id
+    ORDER BY p.id
+"""
+
+# --------- Menu Catalog Cache ----------
+class MenuCatalog:
+    """Process-wide cache of the available menu.
+
+    Entries expire after `ttl` seconds and are dropped at once when a 'menu'
+    event arrives on the bus, so a product edit on any terminal shows up
+    everywhere without every login re-querying `products`.
+
+    If `snapshot` is set (an object with save_menu/load_menu, see
+    dalandangan_offline) every load is copied there and served back when the
+    database can't be reached.
+    """
+
+    def __init__(self, ttl=300, snapshot=None):
+        self.ttl = ttl
+        self.snapshot = snapshot
+        self._products = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()  # also makes concurrent misses share one query
+        self.stats = {'hits': 0, 'loads': 0, 'invalidations': 0, 'snapshot_loads': 0}
+
+    def peek(self):
+        """Cached products if still fresh, else None; never touches the DB."""
+        products = self._products
+        if products is not None and time.monotonic() - self._loaded_at < self.ttl:
+            self.stats['hits'] += 1
+            return products
+        return None
+
+    def products(self):
+        cached = self.peek()
+        if cached is not None:
+            return cached
+        with self._lock:
+            cached = self.peek()
+            if cached is not None:
+                return cached
+            try:
+                products = fetch_all(MENU_SQL)
+            except mysql.connector.Error:
+                saved = self.snapshot.load_menu() if self.snapshot is not None else None
+                if saved is None:
+                    raise
+                self.stats['snapshot_loads'] += 1
+                return saved  # not cached, so the next call tries the database again
+            for p in products:
+                p['name'] = p['name'].strip()
+            self._products, self._loaded_at = products, time.monotonic()
+            self.stats['loads'] += 1
+            if self.snapshot is not None:
+                self.snapshot.save_menu(products)
+            return products
+
+    def invalidate(self):
+        self._products = None
+        self.stats['invalidations'] += 1
+
+    def on_event(self, event):
+        if event.get('kind') == 'menu':
+            self.invalidate()
+
+catalog = MenuCatalog()
+bus.subscribe(catalog.on_event)
+
+
+def menu_changed():
+    """Call after editing products: clears this cache and tells other terminals on every branch."""
+    def announce(shard):
+        with transaction("menu_changed", shard=shard) as cur:
+            return record_event(cur, 0, 'menu')
+    bus.publish(fan_out(announce)[shard_for()])
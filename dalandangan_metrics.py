@@ -0,0 +1,123 @@
+"""Timing instrumentation for SQL statements, pool checkouts and UI callbacks.
+
+Every measurement lands in a rolling window per (kind, name); anything over
+the slow threshold is logged to the `dalandangan.perf` logger. The summary
+feeds the app's hidden diagnostics panel (Ctrl+Shift+D) and, when
+METRICS_CONFIG['dump_every'] is set, a periodic log dump.
+"""
+import logging
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+METRICS_CONFIG = {
+    'slow_query_ms': 200,     # sql statements, transactions and pool waits
+    'slow_callback_ms': 100,  # ui callbacks (a frame is ~16ms; 100ms feels laggy)
+    'window': 500,            # samples kept per statement/callback
+    'dump_every': 0,          # seconds between summary dumps to the log, 0 = off
+}
+
+log = logging.getLogger("dalandangan.perf")
+
+# kinds measured against slow_query_ms; everything else uses slow_callback_ms
+DB_KINDS = ("sql", "txn", "pool")
+
+
+def statement_name(query):
+    """Collapse whitespace so one statement always maps to one series."""
+    return " ".join(query.split())[:160]
+
+def _pct(sorted_values, pct):
+    k = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+# --------- Recorder ----------
+class Metrics:
+    def __init__(self):
+        self._series = {}  # (kind, name) -> {'count', 'errors', 'samples': deque of (ms, rows)}
+        self._lock = threading.Lock()
+
+    def record(self, kind, name, ms, rows=None, error=False):
+        with self._lock:
+            s = self._series.get((kind, name))
+            if s is None:
+                s = self._series[(kind, name)] = {'count': 0, 'errors': 0,
+                                                 'samples': deque(maxlen=METRICS_CONFIG['window'])}
+            s['count'] += 1
+            s['errors'] += bool(error)
+            s['samples'].append((ms, rows))
+        limit = METRICS_CONFIG['slow_query_ms'] if kind in DB_KINDS else METRICS_CONFIG['slow_callback_ms']
+        if ms >= limit:
+            log.warning("slow %s %.1fms%s: %s", kind, ms, "" if rows is None else f" rows={rows}", name)
+
+    def summary(self):
+        """One dict per series, slowest p95 first."""
+        with self._lock:
+            series = [(k, dict(v, samples=list(v['samples']))) for k, v in self._series.items()]
+        out = []
+        for (kind, name), s in series:
+            times = sorted(ms for ms, _ in s['samples'])
+            rows = [r for _, r in s['samples'] if r is not None]
+            if not times:
+                continue
+            out.append({'kind': kind, 'name': name, 'count': s['count'], 'errors': s['errors'],
+                        'p50_ms': round(_pct(times, 50), 2), 'p95_ms': round(_pct(times, 95), 2),
+                        'max_ms': round(times[-1], 2),
+                        'avg_rows': round(sum(rows) / len(rows), 1) if rows else None})
+        out.sort(key=lambda r: r['p95_ms'], reverse=True)
+        return out
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+metrics = Metrics()
+
+
+# --------- Helpers ----------
+@contextmanager
+def measure(kind, name):
+    """Time a block; set box['rows'] inside it to record a row count."""
+    box = {'rows': None}
+    start = time.perf_counter()
+    error = False
+    try:
+        yield box
+    except BaseException:
+        error = True
+        raise
+    finally:
+        metrics.record(kind, name, (time.perf_counter() - start) * 1000, box['rows'], error)
+
+def timed(name, kind="ui"):
+    """Decorator form of measure() for callbacks."""
+    def wrap(fn):
+        @wraps(fn)
+        def inner(*args, **kwargs):
+            with measure(kind, name):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+
+# --------- Periodic Dump ----------
+_dumper = None
+
+def start_periodic_dump(every=None, top=15):
+    """Log the slowest series every `every` seconds from a daemon thread (once per process)."""
+    global _dumper
+    every = every or METRICS_CONFIG['dump_every']
+    if not every or _dumper is not None:
+        return
+    def loop():
+        while True:
+            time.sleep(every)
+            for r in metrics.summary()[:top]:
+                log.info("%-4s n=%-6d p50=%.1fms p95=%.1fms max=%.1fms rows=%s %s", r['kind'], r['count'],
+                         r['p50_ms'], r['p95_ms'], r['max_ms'], r['avg_rows'], r['name'])
+    _dumper = threading.Thread(target=loop, name="metrics-dump", daemon=True)
+    _dumper.start()
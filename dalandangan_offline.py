@@ -0,0 +1,213 @@
+"""Keep a terminal selling while MySQL is unreachable.
+
+Orders and status changes that fail with a connection error are written to a
+local SQLite queue (fsynced, so they survive a crash) under a fresh
+idempotency key. An OfflineReplayer thread drains the queue in order once the
+database answers again; each write claims its key in `client_ops` inside its
+own transaction, so replaying something that already committed is a no-op.
+
+Keys are kept in `client_ops` for CLIENT_OPS_KEEP_DAYS (30) and pruned
+hourly. A queued write older than MAX_QUEUED_DAYS (14) is no longer replayed:
+it is marked failed for someone to look at, since its key may already be
+gone. Keep MAX_QUEUED_DAYS below CLIENT_OPS_KEEP_DAYS.
+The same file keeps the last menu MenuCatalog loaded, which is served when the
+menu query fails.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from decimal import Decimal
+
+from mysql.connector import errors as db_errors
+
+from dalandangan_dispatch import dispatch_run
+from dalandangan_orders import applied_op, dispatch_order, mark_delivered, mark_paid, place_order, set_status
+
+OFFLINE_PATH = os.path.join(".cache", "offline.sqlite3")
+MAX_QUEUED_DAYS = 14
+
+log = logging.getLogger("dalandangan.offline")
+
+# client-side codes for "could not reach / lost the server"
+_CONNECTION_ERRNOS = {2002, 2003, 2005, 2006, 2013, 2055}
+
+def is_connection_error(exc):
+    """True when `exc` means the database is unreachable rather than the write being wrong.
+
+    An exhausted pool (PoolError) is not one: MySQL is up, the terminal is just busy.
+    """
+    if isinstance(exc, db_errors.PoolError):
+        return False
+    if isinstance(exc, (db_errors.InterfaceError, db_errors.OperationalError)):
+        return True
+    return getattr(exc, 'errno', None) in _CONNECTION_ERRNOS
+
+def new_op_key():
+    return str(uuid.uuid4())
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+# --------- Replayable Writes ----------
+# kind -> function(payload, op_key); payloads are plain JSON
+def _replay_place_order(p, op_key):
+    cart = {int(pid): {'product': dict(line['product'], price=Decimal(line['product']['price'])),
+                       'qty': line['qty']}
+            for pid, line in p['cart'].items()}
+    place_order(p['user_id'], cart, p['address'], p['contact'], p['method'], op_key=op_key)
+
+WRITES = {
+    'place_order': _replay_place_order,
+    'set_status': lambda p, k: set_status(p['oid'], p['status'], op_key=k),
+    'dispatch_order': lambda p, k: dispatch_order(p['oid'], p['delivery_person'], op_key=k),
+    'dispatch_run': lambda p, k: dispatch_run(p['rider_id'], p['order_ids'], op_key=k),
+    'mark_delivered': lambda p, k: mark_delivered(p['oid'], op_key=k),
+    'mark_paid': lambda p, k: mark_paid(p['oid'], op_key=k),
+}
+
+
+# --------- Local Store ----------
+class OfflineStore:
+    """SQLite file holding queued writes and the last menu snapshot."""
+
+    def __init__(self, path=OFFLINE_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=FULL")  # a queued sale must survive a power cut
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS queue (
+                                      id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                      op_key TEXT NOT NULL UNIQUE,
+                                      kind TEXT NOT NULL,
+                                      payload TEXT NOT NULL,
+                                      queued_at REAL NOT NULL,
+                                      failed INTEGER NOT NULL DEFAULT 0,
+                                      last_error TEXT)""")
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS menu_snapshot (
+                                      id INTEGER PRIMARY KEY CHECK (id = 1),
+                                      products TEXT NOT NULL,
+                                      saved_at REAL NOT NULL)""")
+
+    # queue
+    def enqueue(self, kind, payload, op_key=None):
+        """Queue a write; returns its idempotency key.
+
+        Pass the key the failed online attempt used: if that attempt did
+        commit (the link dropped during COMMIT), the replay then finds it in
+        client_ops instead of writing it twice.
+        """
+        if kind not in WRITES:
+            raise ValueError(f"Unknown offline write {kind!r}")
+        op_key = op_key or new_op_key()
+        with self._lock:
+            self._conn.execute("INSERT INTO queue (op_key, kind, payload, queued_at) VALUES (?,?,?,?)",
+                               (op_key, kind, json.dumps(payload, default=_json_default), time.time()))
+        return op_key
+
+    def pending(self, limit=50):
+        with self._lock:
+            rows = self._conn.execute("""SELECT id, op_key, kind, payload, queued_at FROM queue
+                                         WHERE failed=0 ORDER BY id LIMIT ?""", (limit,)).fetchall()
+        return [{'id': r[0], 'op_key': r[1], 'kind': r[2], 'payload': json.loads(r[3]), 'queued_at': r[4]}
+                for r in rows]
+
+    def done(self, ids):
+        if ids:
+            with self._lock:
+                self._conn.execute(f"DELETE FROM queue WHERE id IN ({','.join('?' * len(ids))})", list(ids))
+
+    def fail(self, item_id, error):
+        # kept for a human to look at, but no longer blocks the rest of the queue
+        with self._lock:
+            self._conn.execute("UPDATE queue SET failed=1, last_error=? WHERE id=?", (str(error), item_id))
+
+    def counts(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT failed, COUNT(*) FROM queue GROUP BY failed").fetchall()
+        by = dict(rows)
+        return {'pending': by.get(0, 0), 'failed': by.get(1, 0)}
+
+    # menu snapshot (the MenuCatalog.snapshot protocol)
+    def save_menu(self, products):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO menu_snapshot (id, products, saved_at) VALUES (1,?,?)",
+                               (json.dumps(products, default=_json_default), time.time()))
+
+    def load_menu(self):
+        with self._lock:
+            row = self._conn.execute("SELECT products FROM menu_snapshot WHERE id=1").fetchone()
+        if row is None:
+            return None
+        products = json.loads(row[0])
+        for p in products:
+            p['price'] = Decimal(p['price'])
+        return products
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# --------- Replayer ----------
+class OfflineReplayer(threading.Thread):
+    """Drains the offline queue in order whenever the database is reachable."""
+
+    def __init__(self, store, interval=5.0, batch=50):
+        super().__init__(name="offline-replay", daemon=True)
+        self.store = store
+        self.interval = interval
+        self.batch = batch
+        self._halt = threading.Event()
+        self._wake = threading.Event()
+
+    def stop(self):
+        self._halt.set(); self._wake.set()
+
+    def nudge(self):
+        """Try again now instead of at the next interval (e.g. right after queueing)."""
+        self._wake.set()
+
+    def replay_once(self):
+        """Apply one batch; returns how many writes were settled. Stops at the first connection error."""
+        items = self.store.pending(self.batch)
+        settled = []
+        stale = time.time() - MAX_QUEUED_DAYS * 86400
+        try:
+            for item in items:
+                if item['queued_at'] < stale:
+                    # its client_ops key may have been pruned; replaying could apply it twice
+                    log.warning("offline %s %s expired unreplayed", item['kind'], item['op_key'])
+                    self.store.fail(item['id'], f"queued over {MAX_QUEUED_DAYS} days; not replayed"); continue
+                try:
+                    if applied_op(item['op_key']) is None:
+                        WRITES[item['kind']](item['payload'], item['op_key'])
+                except db_errors.IntegrityError as e:
+                    if applied_op(item['op_key']) is None:  # a real constraint failure, not our key
+                        self.store.fail(item['id'], e); continue
+                except Exception as e:
+                    if is_connection_error(e):
+                        raise
+                    log.warning("offline %s %s rejected: %s", item['kind'], item['op_key'], e)
+                    self.store.fail(item['id'], e); continue
+                settled.append(item['id'])
+        finally:
+            self.store.done(settled)
+        return len(settled)
+
+    def run(self):
+        while not self._halt.is_set():
+            try:
+                while self.replay_once() == self.batch:
+                    pass
+            except Exception as e:
+                log.info("offline replay paused: %s", e)  # still down; retry next round
+            self._wake.wait(self.interval); self._wake.clear()
@@ -0,0 +1,307 @@
+from datetime import timedelta
+
+from dalandangan_cart import PriceChanged, reprice, to_cents
+from dalandangan_db import current_store, fan_out, fetch_all, fetch_one, replica_lag_allowance, shard_for, transaction
+from dalandangan_events import bus, record_event
+
+ORDER_STATUSES = ["Pending", "Preparing", "Ready for Delivery", "Out for Delivery", "Completed"]
+
+# --------- Order Service ----------
+# checkout and the status buttons run these constantly, so they go through
+# the per-connection prepared statement cache (TxCursor.execute_prepared)
+INSERT_ORDER_SQL = """INSERT INTO orders (store_id,user_id,total,delivery_address,contact_number,payment_method,status)
+                      VALUES (%s,%s,%s,%s,%s,%s,'Pending')"""
+INSERT_PAYMENT_SQL = "INSERT INTO payments (order_id,amount,method,status,paid_at) VALUES (%s,%s,%s,%s,NOW())"
+
+def order_items_sql(lines):
+    """One multi-row INSERT per cart size, so each size is prepared once per connection."""
+    return ("INSERT INTO order_items (order_id,product_id,qty,unit_price) VALUES "
+            + ",".join(["(%s,%s,%s,%s)"] * lines))
+
+# Writes replayed from a terminal's offline queue carry an idempotency key;
+# claiming it in the same transaction means a replay that already committed
+# (e.g. the terminal crashed before forgetting it) fails instead of repeating.
+CLAIM_OP_SQL = "INSERT INTO client_ops (op_key, order_id) VALUES (%s,%s)"
+
+def _claim(cur, op_key, oid):
+    if op_key:
+        cur.execute_prepared(CLAIM_OP_SQL, (op_key, oid))
+
+def applied_op(op_key):
+    """The client_ops row for an idempotency key if that write already committed, else None."""
+    return fetch_one("SELECT op_key, order_id FROM client_ops WHERE op_key=%s", (op_key,), prepared=True, primary=True)
+
+def place_order(user_id, cart, address, contact, method, op_key=None, expected_total=None):
+    """Write the order, its items and its payment in one transaction.
+
+    `cart` is a product_id -> {'product': dict, 'qty': int} mapping (normally a
+    dalandangan_cart.Cart). Lines are priced from `products`, not from the cart;
+    if `expected_total` (what the customer was shown) no longer matches,
+    PriceChanged is raised and nothing is written. The order belongs to this
+    terminal's store and is written on that store's shard. Returns (order_id, total).
+    """
+    if not cart:
+        raise ValueError("Cannot place an empty order")
+    payment_status = "Paid" if method == "Cash" else "Pending"
+    store = current_store()
+    with transaction("place_order", shard=shard_for(store)) as cur:
+        lines, total = reprice(cur, cart)
+        if expected_total is not None and to_cents(expected_total) != to_cents(total):
+            raise PriceChanged({pid: price for pid, _, price in lines}, total)
+        oid = cur.execute_prepared(INSERT_ORDER_SQL, (store, user_id, total, address, contact, method)).lastrowid
+        params = [v for pid, qty, price in lines for v in (oid, pid, qty, price)]
+        cur.execute_prepared(order_items_sql(len(lines)), params)
+        cur.execute_prepared(INSERT_PAYMENT_SQL, (oid, total, method, payment_status))
+        _claim(cur, op_key, oid)
+        event = record_event(cur, oid, 'placed', 'Pending')
+    bus.publish(event)
+    return oid, total
+
+
+# --------- Status Changes ----------
+# Orders move one step at a time along TRANSITIONS. Every step is a
+# conditional UPDATE ("... WHERE id=%s AND status=<expected>"): the row lock it
+# takes serialises terminals acting on the same order, and whoever loses the
+# race matches nothing and gets InvalidTransition instead of writing a second
+# deliveries row. Only the winner's transaction goes on to touch other tables.
+# orders.updated_at moves with each change (ON UPDATE, or explicitly when only
+# payments change) and each write leaves an order_events row for the boards.
+TRANSITIONS = {
+    'Pending': ('Preparing',),
+    'Preparing': ('Ready for Delivery',),
+    'Ready for Delivery': ('Out for Delivery',),
+    'Out for Delivery': ('Completed',),
+    'Completed': (),
+}
+# target status -> the one status it can be reached from
+PREVIOUS = {to: frm for frm, targets in TRANSITIONS.items() for to in targets}
+
+ADVANCE_SQL = "UPDATE orders SET status=%s WHERE id=%s AND status=%s"
+INSERT_DELIVERY_SQL = """INSERT INTO deliveries (order_id, delivery_person, pickup_time, status)
+                         VALUES (%s,%s,NOW(),'Picked Up')"""
+# order and delivery rows change in one statement
+COMPLETE_SQL = """UPDATE orders o LEFT JOIN deliveries d ON d.order_id=o.id
+                  SET o.status='Completed', d.delivered_at=NOW(), d.status='Delivered'
+                  WHERE o.id=%s AND o.status='Out for Delivery'"""
+PAY_SQL = """UPDATE payments p JOIN orders o ON o.id=p.order_id
+             SET p.status='Paid', p.paid_at=NOW(), o.updated_at=CURRENT_TIMESTAMP(6)
+             WHERE p.order_id=%s AND p.status<>'Paid'"""
+
+# target status -> (event kind, transaction name)
+_STEP_NAMES = {
+    'Preparing': ('status', "set_status"),
+    'Ready for Delivery': ('status', "set_status"),
+    'Out for Delivery': ('dispatched', "dispatch_order"),
+    'Completed': ('delivered', "mark_delivered"),
+}
+
+class InvalidTransition(ValueError):
+    """The order is not in the state the requested step starts from (or doesn't exist)."""
+
+    def __init__(self, oid, current, wanted):
+        self.oid, self.current, self.wanted = oid, current, wanted
+        if current is None:
+            msg = f"Order #{oid} not found"
+        else:
+            msg = f"Order #{oid} is {current}; it can't move to {wanted}"
+        super().__init__(msg)
+
+def _current_status(cur, oid):
+    rows = cur.execute_prepared("SELECT status FROM orders WHERE id=%s", (oid,)).fetchall()
+    return rows[0][0] if rows else None
+
+def transition(oid, status, op_key=None, delivery_person=None):
+    """Move an order one step to `status` atomically, only from the step before it."""
+    frm = PREVIOUS.get(status)
+    if frm is None:
+        raise ValueError(f"No step leads to status {status!r}")
+    if status == 'Out for Delivery' and not delivery_person:
+        raise ValueError("Dispatching needs a delivery person")
+    kind, name = _STEP_NAMES[status]
+    with transaction(name) as cur:
+        _claim(cur, op_key, oid)
+        if status == 'Completed':
+            changed = cur.execute_prepared(COMPLETE_SQL, (oid,)).rowcount
+        else:
+            changed = cur.execute_prepared(ADVANCE_SQL, (status, oid, frm)).rowcount
+        if not changed:
+            raise InvalidTransition(oid, _current_status(cur, oid), status)
+        if status == 'Out for Delivery':
+            cur.execute_prepared(INSERT_DELIVERY_SQL, (oid, delivery_person))
+        event = record_event(cur, oid, kind, status)
+    bus.publish(event)
+
+def set_status(oid, status, op_key=None):
+    if status in ('Out for Delivery', 'Completed'):
+        raise ValueError(f"{status} is set by dispatch_order/mark_delivered, not set_status")
+    transition(oid, status, op_key)
+
+def dispatch_order(oid, delivery_person, op_key=None):
+    transition(oid, 'Out for Delivery', op_key, delivery_person)
+
+def mark_delivered(oid, op_key=None):
+    transition(oid, 'Completed', op_key)
+
+def mark_paid(oid, op_key=None):
+    """Mark the payment Paid; returns False (and writes nothing) if it already was or doesn't exist.
+
+    The key is claimed only once the UPDATE matched: a no-op must not leave a
+    claim behind, or a later replay under the same key would be skipped as applied.
+    """
+    with transaction("mark_paid") as cur:
+        if not cur.execute_prepared(PAY_SQL, (oid,)).rowcount:
+            return False
+        _claim(cur, op_key, oid)
+        event = record_event(cur, oid, 'paid')
+    bus.publish(event)
+    return True
+
+
+# --------- Order Queries ----------
+# deliveries/payments are joined rather than looked up per row; see
+# dalandangan_schema for the indexes these plans rely on. Boards read their
+# own store's orders on its shard; a shard may hold several stores, hence
+# the store_id filter.
+KITCHEN_ORDERS_SQL = """
+    SELECT o.id, o.status, o.total, o.created_at, o.updated_at, u.full_name
+    FROM orders o
+    JOIN users u ON o.user_id=u.id
+    WHERE o.store_id=%s AND o.status IN ('Pending','Preparing')
+"""
+
+ORDER_PAGE_SQL = """
+    SELECT o.id, o.store_id, o.user_id, o.status, o.total, o.created_at,
+           d.status AS delivery_status, d.delivery_person,
+           p.method AS payment_method, p.status AS payment_status
+    FROM orders o
+    LEFT JOIN deliveries d ON d.order_id=o.id
+    LEFT JOIN payments p ON p.order_id=o.id
+    {where}
+    ORDER BY o.created_at DESC, o.id DESC
+    LIMIT %s
+"""
+
+RECEIPT_ORDER_SQL = """
+    SELECT o.*, u.full_name, d.delivery_person
+    FROM orders o
+    JOIN users u ON o.user_id=u.id
+    LEFT JOIN deliveries d ON d.order_id=o.id
+    WHERE o.id=%s
+"""
+
+CHANGED_ORDERS_SQL = """
+    SELECT o.id, o.store_id, o.user_id, o.status, o.total, o.created_at, o.updated_at, u.full_name,
+           d.status AS delivery_status, d.delivery_person,
+           p.method AS payment_method, p.status AS payment_status
+    FROM orders o
+    JOIN users u ON o.user_id=u.id
+    LEFT JOIN deliveries d ON d.order_id=o.id
+    LEFT JOIN payments p ON p.order_id=o.id
+    WHERE o.store_id=%s AND (o.updated_at > %s OR (o.updated_at = %s AND o.id > %s))
+    ORDER BY o.updated_at, o.id
+    LIMIT %s
+"""
+
+# re-read this far behind the watermark: a transaction stamps updated_at when
+# its statement runs but only becomes visible at commit (and, on a replica,
+# only once replicated; changes_since adds the allowed replica lag)
+CHANGE_LOOKBACK = timedelta(seconds=2)
+
+def _one_per_order(rows):
+    # an order normally has one delivery and one payment row; if a stray
+    # duplicate exists keep the first, like the old LIMIT 1 lookups did
+    seen = set(); out = []
+    for r in rows:
+        if r['id'] in seen:
+            continue
+        seen.add(r['id']); out.append(r)
+    return out
+
+def kitchen_orders():
+    return fetch_all(KITCHEN_ORDERS_SQL, (current_store(),))
+
+def order_page_sql(after=None, limit=50, user_id=None, status=None, date_from=None, date_to=None, store_id=None):
+    """Build the keyset-paged order list query; returns (sql, params).
+
+    `after` is the (created_at, id) of the last row already shown. Dates are
+    inclusive calendar days. store_id=None lists every store on the shard.
+    """
+    where, params = [], []
+    if store_id is not None:
+        where.append("o.store_id=%s"); params.append(store_id)
+    if user_id is not None:
+        where.append("o.user_id=%s"); params.append(user_id)
+    if status:
+        where.append("o.status=%s"); params.append(status)
+    if date_from:
+        where.append("o.created_at >= %s"); params.append(date_from)
+    if date_to:
+        where.append("o.created_at < %s"); params.append(date_to + timedelta(days=1))
+    if after:
+        created_at, oid = after
+        where.append("(o.created_at < %s OR (o.created_at = %s AND o.id < %s))")
+        params += [created_at, created_at, oid]
+    sql = ORDER_PAGE_SQL.format(where=("WHERE " + " AND ".join(where)) if where else "")
+    return sql, tuple(params) + (limit,)
+
+def order_page(after=None, limit=50, **filters):
+    """One page of this store's orders, newest first; returns (rows, cursor for the next page or None)."""
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    store = filters.setdefault('store_id', current_store())
+    sql, params = order_page_sql(after, limit, **filters)
+    rows = fetch_all(sql, params, shard=shard_for(store))
+    cursor = (rows[-1]['created_at'], rows[-1]['id']) if len(rows) == limit else None
+    return _one_per_order(rows), cursor
+
+def order_page_all_stores(after=None, limit=50, **filters):
+    """order_page across every shard, merged newest first; each row carries its 'shard'.
+
+    Every shard is asked for a full page in parallel and the merge keeps the
+    newest `limit`, so the (created_at, id) cursor works the same as for one
+    store. Order ids are only unique per shard; pair them with 'shard'.
+    """
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    filters.pop('store_id', None)
+    sql, params = order_page_sql(after, limit, **filters)
+    pages = fan_out(lambda s: fetch_all(sql, params, shard=s))
+    rows, more = [], False
+    for shard, part in pages.items():
+        more = more or len(part) == limit
+        for r in _one_per_order(part):
+            r['shard'] = shard
+            rows.append(r)
+    rows.sort(key=lambda r: (r['created_at'], r['id']), reverse=True)
+    more = more or len(rows) > limit
+    rows = rows[:limit]
+    cursor = (rows[-1]['created_at'], rows[-1]['id']) if more and rows else None
+    return rows, cursor
+
+def db_clock():
+    return fetch_one("SELECT CURRENT_TIMESTAMP(6) AS now")['now']
+
+def changes_since(since, limit=500):
+    """Orders touched after `since`, any status; returns (rows, new watermark).
+
+    Callers decide per row whether it still belongs on their board. Rows near
+    the watermark come back again on the next poll, so patching must be idempotent.
+    Pages of `limit` are read by (updated_at, id) until one comes back short,
+    so a burst bigger than a page cannot pin every poll to the same rows.
+    """
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    lookback = CHANGE_LOOKBACK + timedelta(seconds=replica_lag_allowance())
+    store, after = current_store(), (since - lookback, 0)
+    rows = []
+    while True:
+        page = fetch_all(CHANGED_ORDERS_SQL, (store, after[0], after[0], after[1], limit))
+        rows += page
+        if len(page) < limit:
+            break
+        after = (page[-1]['updated_at'], page[-1]['id'])
+    mark = max([since] + [r['updated_at'] for r in rows])
+    return _one_per_order(rows), mark
+
+def receipt_order(oid):
+    return fetch_one(RECEIPT_ORDER_SQL, (oid,))
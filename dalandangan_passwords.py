@@ -0,0 +1,172 @@
+"""Salted, versioned password hashing.
+
+Stored hashes look like `$scrypt$ln=14,r=8,p=1$<salt>$<hash>` (base64), so the
+cost can be raised later without breaking existing accounts: verify() reads
+the parameters from the string, and needs_rehash() tells the login path to
+re-store the hash with the current PASSWORD_CONFIG. Hashes written by the old
+unsalted SHA-256 scheme (64 hex chars) still verify and are upgraded the same way.
+
+Pick a cost for the cashier machines with:
+
+    python dalandangan_passwords.py --target-ms 250
+"""
+import argparse
+import base64
+import hashlib
+import hmac
+import os
+import re
+import time
+
+PASSWORD_CONFIG = {
+    'scheme': 'scrypt',
+    'ln': 14,      # log2 of the scrypt CPU/memory cost N (2**14 uses 16 MiB with r=8)
+    'r': 8,
+    'p': 1,
+    'salt_bytes': 16,
+    'key_bytes': 32,
+}
+
+_LEGACY_SHA256 = re.compile(r"^[0-9a-f]{64}$")
+
+
+def _b64(raw):
+    return base64.b64encode(raw).decode().rstrip("=")
+
+def _unb64(text):
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+# --------- Hashers ----------
+class ScryptHasher:
+    scheme = "scrypt"
+
+    def __init__(self, ln=14, r=8, p=1, salt_bytes=16, key_bytes=32):
+        self.ln, self.r, self.p = ln, r, p
+        self.salt_bytes, self.key_bytes = salt_bytes, key_bytes
+
+    @staticmethod
+    def _derive(password, salt, ln, r, p, key_bytes):
+        n = 1 << ln
+        # OpenSSL's default 32 MiB ceiling is below what larger costs need
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                              maxmem=256 * n * r * p, dklen=key_bytes)
+
+    def hash(self, password):
+        salt = os.urandom(self.salt_bytes)
+        key = self._derive(password, salt, self.ln, self.r, self.p, self.key_bytes)
+        return f"${self.scheme}$ln={self.ln},r={self.r},p={self.p}${_b64(salt)}${_b64(key)}"
+
+    def _parse(self, stored):
+        _, scheme, params, salt, key = stored.split("$")
+        if scheme != self.scheme:
+            raise ValueError(f"Not a {self.scheme} hash")
+        cost = {k: int(v) for k, v in (kv.split("=") for kv in params.split(","))}
+        return cost, _unb64(salt), _unb64(key)
+
+    def verify(self, password, stored):
+        cost, salt, key = self._parse(stored)
+        derived = self._derive(password, salt, cost['ln'], cost['r'], cost['p'], len(key))
+        return hmac.compare_digest(derived, key)
+
+    def needs_rehash(self, stored):
+        cost, salt, key = self._parse(stored)
+        return ((cost['ln'], cost['r'], cost['p'], len(salt), len(key))
+                != (self.ln, self.r, self.p, self.salt_bytes, self.key_bytes))
+
+
+class LegacySha256Hasher:
+    """The original unsalted hex SHA-256; verify-only, always due for a rehash."""
+    scheme = "sha256"
+
+    def verify(self, password, stored):
+        return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), stored)
+
+
+def current_hasher():
+    cfg = dict(PASSWORD_CONFIG)
+    if cfg.pop('scheme') != ScryptHasher.scheme:
+        raise ValueError(f"Unsupported password scheme {PASSWORD_CONFIG['scheme']!r}")
+    return ScryptHasher(**cfg)
+
+def _hasher_for(stored):
+    if stored.startswith(f"${ScryptHasher.scheme}$"):
+        return current_hasher()
+    if _LEGACY_SHA256.match(stored):
+        return LegacySha256Hasher()
+    return None
+
+
+# --------- API ----------
+def hash_password(password):
+    return current_hasher().hash(password)
+
+def verify_password(password, stored):
+    hasher = _hasher_for(stored or "")
+    if hasher is None:
+        return False
+    try:
+        return hasher.verify(password, stored)
+    except ValueError:  # malformed hash string
+        return False
+
+def needs_rehash(stored):
+    hasher = _hasher_for(stored or "")
+    if not isinstance(hasher, ScryptHasher):
+        return True
+    try:
+        return hasher.needs_rehash(stored)
+    except ValueError:
+        return True
+
+_dummy_hash = None
+
+def burn_verify(password):
+    """Spend a real verify's time when the username does not exist, so response
+    times don't reveal which accounts are real."""
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = hash_password("not-a-real-password")
+    verify_password(password, _dummy_hash)
+
+
+# --------- Cost Tuning ----------
+def time_cost(ln, r=8, p=1, rounds=5):
+    """Median milliseconds for one scrypt derivation at this cost."""
+    hasher = ScryptHasher(ln=ln, r=r, p=p)
+    stored = hasher.hash("benchmark-password")
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        hasher.verify("benchmark-password", stored)
+        samples.append((time.perf_counter() - start) * 1000)
+    return sorted(samples)[len(samples) // 2]
+
+def tune(target_ms=250, r=8, p=1, ln_range=range(12, 20), rounds=5):
+    """Time each cost; returns ([(ln, ms, MiB)], largest ln that stays under target_ms or None)."""
+    results, best = [], None
+    for ln in ln_range:
+        ms = time_cost(ln, r, p, rounds)
+        results.append((ln, ms, (128 * r * (1 << ln)) / 2 ** 20))
+        if ms <= target_ms:
+            best = ln
+        else:
+            break  # cost only goes up from here
+    return results, best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pick a scrypt cost for this machine")
+    parser.add_argument("--target-ms", type=float, default=250, help="login hashing budget per attempt")
+    parser.add_argument("-r", type=int, default=PASSWORD_CONFIG['r'])
+    parser.add_argument("-p", type=int, default=PASSWORD_CONFIG['p'])
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    results, best = tune(args.target_ms, args.r, args.p, rounds=args.rounds)
+    print(f"{'ln':>3}{'N':>10}{'median ms':>12}{'memory MiB':>12}")
+    for ln, ms, mib in results:
+        print(f"{ln:>3}{1 << ln:>10}{ms:>12.1f}{mib:>12.0f}")
+    if best is None:
+        print(f"Even ln={results[0][0]} is over {args.target_ms}ms; lower r or accept the latency.")
+    else:
+        print(f"Use PASSWORD_CONFIG['ln'] = {best} (current: {PASSWORD_CONFIG['ln']})")
@@ -0,0 +1,168 @@
+"""PDF receipts, one at a time or in end-of-day batches.
+
+Batches read every order and all of their items in two queries, then render
+in a process pool. Files land in receipts/<day>/receipt_order_<id>.pdf, where
+the day is the one the order was delivered (the day render_day picks it up
+on), or the day it was placed while it is still out.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+from dalandangan_db import current_store, fetch_all
+
+RECEIPTS_DIR = "receipts"
+
+# --------- Template ----------
+class ReceiptTemplate:
+    """Receipt layout; the static header is drawn once per canvas as a reusable form."""
+
+    FORM = "receipt_header"
+
+    def __init__(self, pagesize=A4):
+        self.pagesize = pagesize
+        self.width, self.height = pagesize
+
+    def _header(self, c):
+        if not c.hasForm(self.FORM):
+            c.beginForm(self.FORM)
+            c.setFont("Helvetica-Bold", 16)
+            c.drawString(180, self.height - 50, "🍕 Dalandangan Pizza Receipt")
+            c.endForm()
+        c.doForm(self.FORM)
+
+    def draw(self, c, o, items):
+        """Draw one order as one page."""
+        self._header(c)
+        y = self.height - 90
+        c.setFont("Helvetica", 12)
+        for line in (f"Order ID: {o['id']}",
+                     f"Customer: {o['full_name']}",
+                     f"Address: {o['delivery_address']}",
+                     f"Payment: {o['payment_method']}"):
+            c.drawString(50, y, line)
+            y -= 20
+        c.drawString(50, y, f"Delivery Person: {o['delivery_person'] or 'N/A'}")
+        y -= 30
+        c.drawString(50, y, "Items:")
+        y -= 20
+        for it in items:
+            c.drawString(60, y, f"{it['name']} x{it['qty']} - ₱{it['unit_price']*it['qty']}")
+            y -= 20
+        y -= 10
+        c.drawString(50, y, f"Total: ₱{o['total']:.2f}")
+        y -= 40
+        c.drawString(200, y, "Thank you for your order!")
+        c.showPage()
+
+    def write(self, path, o, items):
+        c = canvas.Canvas(path, pagesize=self.pagesize)
+        self.draw(c, o, items)
+        c.save()
+        return path
+
+
+_template = None
+
+def _get_template():
+    global _template
+    if _template is None:
+        _template = ReceiptTemplate()
+    return _template
+
+
+# --------- Data ----------
+ORDERS_SQL = """
+    SELECT o.*, u.full_name, d.delivery_person, d.delivered_at
+    FROM orders o
+    JOIN users u ON o.user_id=u.id
+    LEFT JOIN deliveries d ON d.order_id=o.id
+    WHERE o.id IN ({ids})
+"""
+
+ITEMS_SQL = """
+    SELECT oi.order_id, oi.qty, oi.unit_price, p.name
+    FROM order_items oi
+    JOIN products p ON oi.product_id=p.id
+    WHERE oi.order_id IN ({ids})
+    ORDER BY oi.order_id
+"""
+
+def _in_chunks(values, size=1000):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+def fetch_receipt_data(order_ids):
+    """[(order, items)] for the given ids: one orders query and one items query per 1000 ids."""
+    orders, items = {}, {}
+    for chunk in _in_chunks(int(i) for i in order_ids):
+        marks = ",".join(["%s"] * len(chunk))
+        for o in fetch_all(ORDERS_SQL.format(ids=marks), tuple(chunk)):
+            orders.setdefault(o['id'], o)  # first delivery row wins
+        for it in fetch_all(ITEMS_SQL.format(ids=marks), tuple(chunk)):
+            items.setdefault(it['order_id'], []).append(it)
+    return [(orders[oid], items.get(oid, [])) for oid in sorted(orders)]
+
+def completed_order_ids(day):
+    """This store's orders delivered on `day` (an order placed before midnight counts the day it arrived)."""
+    rows = fetch_all("""SELECT DISTINCT o.id FROM orders o
+                        JOIN deliveries d ON d.order_id=o.id
+                        WHERE o.store_id=%s AND o.status='Completed'
+                          AND d.delivered_at >= %s AND d.delivered_at < %s
+                        ORDER BY o.id""", (current_store(), day, day + timedelta(days=1)))
+    return [r['id'] for r in rows]
+
+
+# --------- Rendering ----------
+def receipt_path(o, root=RECEIPTS_DIR):
+    # filed by the same date completed_order_ids selects on, so a batch never
+    # writes into (or misses files in) the previous day's folder
+    when = o.get('delivered_at') or o.get('created_at')
+    day = when.date().isoformat() if when else "undated"
+    folder = os.path.join(root, day)
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, f"receipt_order_{o['id']}.pdf")
+
+def _render_chunk(batch, root):
+    # runs in a pool process; the template is built once per process
+    template = _get_template()
+    return [template.write(receipt_path(o, root), o, items) for o, items in batch]
+
+def render_receipt(oid, root=RECEIPTS_DIR):
+    data = fetch_receipt_data([oid])
+    if not data:
+        raise LookupError(f"Order #{oid} not found")
+    return _render_chunk(data, root)[0]
+
+def iter_render_batch(order_ids, root=RECEIPTS_DIR, processes=None, chunk=25):
+    """Yield receipt paths as chunks finish; small batches skip the process pool."""
+    data = fetch_receipt_data(order_ids)
+    if len(data) <= chunk:
+        yield from _render_chunk(data, root)
+        return
+    # spawn, not fork: the caller is usually a threaded Tk process
+    with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(_render_chunk, data[i:i + chunk], root) for i in range(0, len(data), chunk)]
+        for fut in as_completed(futures):
+            yield from fut.result()
+
+def render_batch(order_ids, root=RECEIPTS_DIR, processes=None, chunk=25):
+    return list(iter_render_batch(order_ids, root, processes, chunk))
+
+def render_combined(order_ids, path):
+    """All receipts as pages of one PDF for printing; the header form is shared by every page."""
+    template = _get_template()
+    c = canvas.Canvas(path, pagesize=template.pagesize)
+    for o, items in fetch_receipt_data(order_ids):
+        template.draw(c, o, items)
+    c.save()
+    return path
+
+def render_day(day, root=RECEIPTS_DIR, processes=None):
+    """Render every completed order of `day`; returns the written paths."""
+    return render_batch(completed_order_ids(day), root, processes)
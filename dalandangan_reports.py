@@ -0,0 +1,167 @@
+"""Sales reporting over orders, order_items and payments.
+
+Aggregation happens in MySQL and results are streamed with fetch_iter, so a
+year of data is never held in memory. Closed days can be served from the
+daily rollup tables, which refresh_rollups() keeps up to date incrementally.
+
+Each report runs on one shard (`shard=`); all_shards() runs it on every
+branch shard in parallel and adds the groups up, which is what the CLI does
+unless --shard is given.
+
+    python dalandangan_reports.py daily --from 2025-01-01 --to 2025-12-31
+"""
+import argparse
+import csv
+import sys
+from datetime import date, timedelta
+
+from dalandangan_db import execute, fan_out, fetch_iter, fetch_one, shard_names
+
+def _range(date_from, date_to):
+    # inclusive calendar days -> half-open timestamps, so created_at indexes stay usable
+    return date_from, date_to + timedelta(days=1)
+
+def _limit(limit):
+    # None lets all_shards() merge every product before taking the top ones
+    return ("LIMIT %s", (limit,)) if limit else ("", ())
+
+# --------- Live Reports ----------
+def daily_revenue(date_from, date_to, shard=None):
+    return fetch_iter("""SELECT DATE(created_at) AS day, COUNT(*) AS orders, SUM(total) AS revenue
+                         FROM orders WHERE created_at >= %s AND created_at < %s
+                         GROUP BY DATE(created_at) ORDER BY day""", _range(date_from, date_to), shard=shard)
+
+def hourly_revenue(day, shard=None):
+    return fetch_iter("""SELECT HOUR(created_at) AS hour, COUNT(*) AS orders, SUM(total) AS revenue
+                         FROM orders WHERE created_at >= %s AND created_at < %s
+                         GROUP BY HOUR(created_at) ORDER BY hour""", _range(day, day), shard=shard)
+
+def top_products(date_from, date_to, limit=10, shard=None):
+    limit_sql, limit_params = _limit(limit)
+    return fetch_iter(f"""SELECT p.id AS product_id, p.name, SUM(oi.qty) AS qty,
+                                 SUM(oi.qty * oi.unit_price) AS revenue
+                          FROM orders o
+                          JOIN order_items oi ON oi.order_id=o.id
+                          JOIN products p ON p.id=oi.product_id
+                          WHERE o.created_at >= %s AND o.created_at < %s
+                          GROUP BY p.id, p.name ORDER BY revenue DESC {limit_sql}""",
+                      _range(date_from, date_to) + limit_params, shard=shard)
+
+def payment_breakdown(date_from, date_to, shard=None):
+    return fetch_iter("""SELECT p.method, p.status, COUNT(*) AS payments, SUM(p.amount) AS amount
+                         FROM orders o
+                         JOIN payments p ON p.order_id=o.id
+                         WHERE o.created_at >= %s AND o.created_at < %s
+                         GROUP BY p.method, p.status ORDER BY p.method, p.status""",
+                      _range(date_from, date_to), shard=shard)
+
+
+# --------- Rollups ----------
+# each refresh recomputes from the last rolled-up day (it may have been
+# partial) through today; older days are never touched again
+def refresh_rollups(today=None, shard=None):
+    today = today or date.today()
+    row = fetch_one("SELECT MAX(day) AS last FROM daily_sales_rollup", shard=shard, primary=True)
+    start = row['last'] if row and row['last'] else None
+    if start is None:
+        first = fetch_one("SELECT MIN(created_at) AS first FROM orders", shard=shard, primary=True)
+        if not first or not first['first']:
+            return None
+        start = first['first'].date()
+    end = today + timedelta(days=1)
+    execute("""INSERT INTO daily_sales_rollup (day, orders, revenue)
+               SELECT DATE(created_at), COUNT(*), SUM(total)
+               FROM orders WHERE created_at >= %s AND created_at < %s
+               GROUP BY DATE(created_at)
+               ON DUPLICATE KEY UPDATE orders=VALUES(orders), revenue=VALUES(revenue)""", (start, end), shard=shard)
+    execute("""INSERT INTO daily_product_rollup (day, product_id, qty, revenue)
+               SELECT DATE(o.created_at), oi.product_id, SUM(oi.qty), SUM(oi.qty * oi.unit_price)
+               FROM orders o JOIN order_items oi ON oi.order_id=o.id
+               WHERE o.created_at >= %s AND o.created_at < %s
+               GROUP BY DATE(o.created_at), oi.product_id
+               ON DUPLICATE KEY UPDATE qty=VALUES(qty), revenue=VALUES(revenue)""", (start, end), shard=shard)
+    return start
+
+def daily_revenue_rollup(date_from, date_to, shard=None):
+    """Like daily_revenue but read from the rollup table; call refresh_rollups() first."""
+    return fetch_iter("""SELECT day, orders, revenue FROM daily_sales_rollup
+                         WHERE day BETWEEN %s AND %s ORDER BY day""", (date_from, date_to), shard=shard)
+
+def top_products_rollup(date_from, date_to, limit=10, shard=None):
+    limit_sql, limit_params = _limit(limit)
+    return fetch_iter(f"""SELECT r.product_id, p.name, SUM(r.qty) AS qty, SUM(r.revenue) AS revenue
+                          FROM daily_product_rollup r JOIN products p ON p.id=r.product_id
+                          WHERE r.day BETWEEN %s AND %s
+                          GROUP BY r.product_id, p.name ORDER BY revenue DESC {limit_sql}""",
+                      (date_from, date_to) + limit_params, shard=shard)
+
+
+# --------- All Branches ----------
+# report -> (group columns, summed columns, sort columns, descending)
+MERGES = {
+    daily_revenue: (('day',), ('orders', 'revenue'), ('day',), False),
+    daily_revenue_rollup: (('day',), ('orders', 'revenue'), ('day',), False),
+    hourly_revenue: (('hour',), ('orders', 'revenue'), ('hour',), False),
+    top_products: (('product_id',), ('qty', 'revenue'), ('revenue',), True),
+    top_products_rollup: (('product_id',), ('qty', 'revenue'), ('revenue',), True),
+    payment_breakdown: (('method', 'status'), ('payments', 'amount'), ('method', 'status'), False),
+}
+
+def all_shards(report, *args, limit=None):
+    """Run `report` on every shard in parallel and add up rows of the same group.
+
+    Top-N reports are asked for every group per shard (a product can be tenth
+    in each branch and first overall), then cut to `limit` after the merge.
+    """
+    group, sums, order, desc = MERGES[report]
+    kwargs = {'limit': None} if report in (top_products, top_products_rollup) else {}
+    merged = {}
+    for part in fan_out(lambda s: list(report(*args, shard=s, **kwargs))).values():
+        for r in part:
+            row = merged.get(tuple(r[c] for c in group))
+            if row is None:
+                merged[tuple(r[c] for c in group)] = dict(r)
+            else:
+                for c in sums:
+                    row[c] += r[c]
+    rows = sorted(merged.values(), key=lambda r: tuple(r[c] for c in order), reverse=desc)
+    return rows[:limit] if limit else rows
+
+
+# --------- CLI ----------
+# name -> (report, args from the command line)
+REPORTS = {
+    'daily': (lambda a: daily_revenue_rollup if a.rollup else daily_revenue, lambda a: (a.date_from, a.date_to)),
+    'hourly': (lambda a: hourly_revenue, lambda a: (a.date_to,)),
+    'products': (lambda a: top_products_rollup if a.rollup else top_products, lambda a: (a.date_from, a.date_to)),
+    'payments': (lambda a: payment_breakdown, lambda a: (a.date_from, a.date_to)),
+}
+
+def run_report(args):
+    pick, report_args = REPORTS[args.report]
+    report, params = pick(args), report_args(args)
+    limit = {'limit': args.limit} if args.report == 'products' else {}
+    if args.shard:
+        return report(*params, shard=args.shard, **limit)
+    return all_shards(report, *params, **limit)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dalandangan sales reports (CSV on stdout)")
+    parser.add_argument("report", choices=sorted(REPORTS))
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat, default=date.today())
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat, default=date.today())
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--rollup", action="store_true", help="refresh and read the daily rollup tables")
+    parser.add_argument("--shard", choices=shard_names(), help="one branch shard instead of all of them")
+    args = parser.parse_args(argv)
+    if args.rollup:
+        fan_out(lambda s: refresh_rollups(shard=s), [args.shard] if args.shard else None)
+    writer = None
+    for row in run_report(args):
+        if writer is None:
+            writer = csv.DictWriter(sys.stdout, fieldnames=list(row))
+            writer.writeheader()
+        writer.writerow(row)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""Schema migrations and query-plan checks for the ordering database.
+
+Run `python dalandangan_schema.py` to apply pending migrations on every shard
+and print an EXPLAIN report for the hot dashboard queries.
+"""
+import sys
+from datetime import datetime
+
+from dalandangan_db import pooled_connection, shard_names
+from dalandangan_dispatch import READY_ORDERS_SQL, RIDERS_SQL
+from dalandangan_orders import CHANGED_ORDERS_SQL, KITCHEN_ORDERS_SQL, RECEIPT_ORDER_SQL, order_page_sql
+
+# --------- Helpers ----------
+def has_index(cur, table, columns):
+    """True if some index on `table` starts with exactly `columns` (in order)."""
+    cur.execute("""SELECT index_name, column_name FROM information_schema.statistics
+                   WHERE table_schema=DATABASE() AND table_name=%s
+                   ORDER BY index_name, seq_in_index""", (table,))
+    by_index = {}
+    for name, col in cur.fetchall():
+        by_index.setdefault(name, []).append(col.lower())
+    want = [c.lower() for c in columns]
+    return any(cols[:len(want)] == want for cols in by_index.values())
+
+def ensure_index(cur, table, name, columns):
+    if not has_index(cur, table, columns):
+        cur.execute(f"ALTER TABLE {table} ADD INDEX {name} ({', '.join(columns)})")
+
+def has_column(cur, table, column):
+    cur.execute("""SELECT 1 FROM information_schema.columns
+                   WHERE table_schema=DATABASE() AND table_name=%s AND column_name=%s""", (table, column))
+    return cur.fetchone() is not None
+
+
+# --------- Migrations ----------
+def _order_lookup_indexes(cur):
+    ensure_index(cur, "deliveries", "idx_deliveries_order", ["order_id"])
+    ensure_index(cur, "payments", "idx_payments_order", ["order_id"])
+    ensure_index(cur, "orders", "idx_orders_user_created", ["user_id", "created_at"])
+    ensure_index(cur, "orders", "idx_orders_created", ["created_at"])
+    ensure_index(cur, "orders", "idx_orders_status", ["status"])
+    ensure_index(cur, "order_items", "idx_order_items_order", ["order_id"])
+
+def _order_status_paging_index(cur):
+    # status filter plus newest-first paging reads straight off this index
+    ensure_index(cur, "orders", "idx_orders_status_created", ["status", "created_at"])
+
+def _order_updated_at(cur):
+    # boards poll "WHERE updated_at > watermark" instead of re-reading everything
+    if not has_column(cur, "orders", "updated_at"):
+        cur.execute("""ALTER TABLE orders ADD COLUMN updated_at TIMESTAMP(6) NOT NULL
+                       DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)""")
+    ensure_index(cur, "orders", "idx_orders_updated", ["updated_at"])
+
+def _order_events(cur):
+    # outbox tailed by dalandangan_events.OutboxNotifier
+    cur.execute("""CREATE TABLE IF NOT EXISTS order_events (
+                       id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                       order_id INT NOT NULL,
+                       kind VARCHAR(32) NOT NULL,
+                       status VARCHAR(32) NULL,
+                       created_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+                       KEY idx_order_events_created (created_at))""")
+
+def _sales_rollups(cur):
+    # maintained by dalandangan_reports.refresh_rollups
+    cur.execute("""CREATE TABLE IF NOT EXISTS daily_sales_rollup (
+                       day DATE PRIMARY KEY,
+                       orders INT NOT NULL,
+                       revenue DECIMAL(12,2) NOT NULL)""")
+    cur.execute("""CREATE TABLE IF NOT EXISTS daily_product_rollup (
+                       day DATE NOT NULL,
+                       product_id INT NOT NULL,
+                       qty INT NOT NULL,
+                       revenue DECIMAL(12,2) NOT NULL,
+                       PRIMARY KEY (day, product_id))""")
+
+def _password_hash_width(cur):
+    # versioned scrypt strings (dalandangan_passwords) run ~90 chars, past the old sha256 column
+    cur.execute("""SELECT character_maximum_length FROM information_schema.columns
+                   WHERE table_schema=DATABASE() AND table_name='users' AND column_name='password_hash'""")
+    row = cur.fetchone()
+    if row is None or (row[0] or 0) < 255:
+        cur.execute("ALTER TABLE users MODIFY password_hash VARCHAR(255) NOT NULL")
+
+def _client_ops(cur):
+    # idempotency keys for writes replayed from dalandangan_offline
+    cur.execute("""CREATE TABLE IF NOT EXISTS client_ops (
+                       op_key CHAR(36) PRIMARY KEY,
+                       order_id INT NULL,
+                       applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP)""")
+
+def _client_ops_applied_index(cur):
+    # the hourly prune_client_ops deletes by age
+    ensure_index(cur, "client_ops", "idx_client_ops_applied", ["applied_at"])
+
+def _product_prep_minutes(cur):
+    # per-product oven time for dalandangan_kitchen; NULL means KITCHEN_CONFIG's default
+    if not has_column(cur, "products", "prep_minutes"):
+        cur.execute("ALTER TABLE products ADD COLUMN prep_minutes SMALLINT NULL")
+
+def _order_store(cur):
+    # orders are per branch (dalandangan_db.SHARD_CONFIG); existing rows belong to the first store
+    if not has_column(cur, "orders", "store_id"):
+        cur.execute("ALTER TABLE orders ADD COLUMN store_id INT NOT NULL DEFAULT 1 AFTER id")
+    ensure_index(cur, "orders", "idx_orders_store_created", ["store_id", "created_at"])
+    ensure_index(cur, "orders", "idx_orders_store_status_created", ["store_id", "status", "created_at"])
+    ensure_index(cur, "orders", "idx_orders_store_updated", ["store_id", "updated_at"])
+
+def _riders(cur):
+    # dalandangan_dispatch: riders per store, and multi-drop runs tying deliveries together
+    cur.execute("""CREATE TABLE IF NOT EXISTS riders (
+                       id INT AUTO_INCREMENT PRIMARY KEY,
+                       store_id INT NOT NULL,
+                       name VARCHAR(100) NOT NULL,
+                       phone VARCHAR(30) NULL,
+                       active TINYINT(1) NOT NULL DEFAULT 1,
+                       KEY idx_riders_store_active (store_id, active))""")
+    cur.execute("""CREATE TABLE IF NOT EXISTS delivery_runs (
+                       id INT AUTO_INCREMENT PRIMARY KEY,
+                       store_id INT NOT NULL,
+                       rider_id INT NOT NULL,
+                       drops SMALLINT NOT NULL,
+                       created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                       KEY idx_delivery_runs_rider (rider_id, created_at))""")
+    for column in ("rider_id", "run_id"):
+        if not has_column(cur, "deliveries", column):
+            cur.execute(f"ALTER TABLE deliveries ADD COLUMN {column} INT NULL")
+    ensure_index(cur, "deliveries", "idx_deliveries_rider_status", ["rider_id", "status"])
+
+def _delivered_at_index(cur):
+    # day receipts pick orders by the day they were delivered
+    ensure_index(cur, "deliveries", "idx_deliveries_delivered", ["delivered_at"])
+
+# (name, function) pairs; append new steps, never reorder or rename applied ones
+MIGRATIONS = [
+    ("001_order_lookup_indexes", _order_lookup_indexes),
+    ("002_order_status_paging_index", _order_status_paging_index),
+    ("003_order_updated_at", _order_updated_at),
+    ("004_order_events", _order_events),
+    ("005_sales_rollups", _sales_rollups),
+    ("006_password_hash_width", _password_hash_width),
+    ("007_client_ops", _client_ops),
+    ("008_product_prep_minutes", _product_prep_minutes),
+    ("009_order_store", _order_store),
+    ("010_riders", _riders),
+    ("011_delivered_at_index", _delivered_at_index),
+    ("012_client_ops_applied_index", _client_ops_applied_index),
+]
+
+def applied_migrations(cur):
+    cur.execute("""CREATE TABLE IF NOT EXISTS schema_migrations (
+                       name VARCHAR(100) PRIMARY KEY,
+                       applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP)""")
+    cur.execute("SELECT name FROM schema_migrations")
+    return {r[0] for r in cur.fetchall()}
+
+def migrate(shard=None):
+    """Apply pending migrations in order on one shard (this store's by default); returns the names that ran."""
+    ran = []
+    with pooled_connection(shard) as conn:
+        cur = conn.cursor()
+        done = applied_migrations(cur)
+        for name, step in MIGRATIONS:
+            if name in done:
+                continue
+            # DDL commits implicitly in MySQL, so each step must be safe to re-run
+            step(cur)
+            cur.execute("INSERT INTO schema_migrations (name) VALUES (%s)", (name,))
+            ran.append(name)
+        cur.close()
+    return ran
+
+
+# --------- EXPLAIN Check ----------
+# query name -> (sql, sample params)
+_NOW = datetime.now()
+HOT_QUERIES = {
+    "customer_orders": order_page_sql(user_id=1, store_id=1),
+    "kitchen_orders": (KITCHEN_ORDERS_SQL, (1,)),
+    "cashier_orders": order_page_sql(store_id=1),
+    "cashier_orders_by_status": order_page_sql(status="Pending", store_id=1),
+    "all_store_orders": order_page_sql(),
+    "receipt_order": (RECEIPT_ORDER_SQL, (1,)),
+    "board_changes": (CHANGED_ORDERS_SQL, (1, _NOW, _NOW, 0, 500)),
+    "dispatch_ready": (READY_ORDERS_SQL, (1,)),
+    "dispatch_riders": (RIDERS_SQL, (1,)),
+}
+
+def explain(sql, params=()):
+    with pooled_connection() as conn:
+        cur = conn.cursor(dictionary=True)
+        cur.execute("EXPLAIN " + sql, params)
+        rows = cur.fetchall()
+        cur.close()
+    return [{k.lower(): v for k, v in r.items()} for r in rows]
+
+def plan_problems(plan):
+    """Flag full scans and per-row subqueries in an EXPLAIN result.
+
+    On a near-empty dev database MySQL may still pick a scan; run this against
+    realistic data volumes before trusting a warning.
+    """
+    problems = []
+    for step in plan:
+        table = step.get('table')
+        if (step.get('select_type') or '').upper() == 'DEPENDENT SUBQUERY':
+            problems.append(f"{table}: correlated subquery runs once per outer row")
+        if (step.get('type') or '').upper() == 'ALL':
+            problems.append(f"{table}: full table scan (~{step.get('rows')} rows)")
+    return problems
+
+def param_problems(queries=None):
+    """{query name: problem} for sample params that don't match the SQL's %s placeholders."""
+    return {name: f"{sql.count('%s')} placeholders but {len(params)} sample params"
+            for name, (sql, params) in (queries or HOT_QUERIES).items() if sql.count('%s') != len(params)}
+
+def explain_check(queries=None):
+    """Return {query name: [problems]} for the hot queries; empty lists mean healthy plans."""
+    queries = queries or HOT_QUERIES
+    mismatched = param_problems(queries)
+    report = {}
+    for name, (sql, params) in queries.items():
+        report[name] = [mismatched[name]] if name in mismatched else plan_problems(explain(sql, params))
+    return report
+
+
+if __name__ == "__main__":
+    for shard in shard_names():
+        for name in migrate(shard):
+            print(f"{shard}: applied {name}")
+    failed = False
+    for name, problems in explain_check().items():
+        print(f"{name}: {'ok' if not problems else ''}")
+        for p in problems:
+            print(f"  - {p}")
+        failed = failed or bool(problems)
+    sys.exit(1 if failed else 0)
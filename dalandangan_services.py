@@ -0,0 +1,201 @@
+"""Headless business logic shared by the Tk app and the HTTP API.
+
+Nothing here touches tkinter; every method takes plain values and returns
+plain dicts, and failures a user can act on raise ServiceError.
+"""
+import logging
+
+import mysql.connector
+
+from dalandangan_cart import Cart, ItemsUnavailable, PriceChanged
+from dalandangan_db import HOME_SHARD, execute, fetch_one
+from dalandangan_dispatch import DispatchPlanner, add_rider, dispatch_run, ready_orders, riders, set_rider_active
+from dalandangan_menu import catalog
+from dalandangan_orders import (ORDER_STATUSES, InvalidTransition, dispatch_order, kitchen_orders, mark_delivered,
+                                mark_paid, order_page, order_page_all_stores, place_order, set_status)
+from dalandangan_passwords import burn_verify, hash_password, needs_rehash, verify_password
+from dalandangan_receipts import render_receipt
+
+
+class ServiceError(Exception):
+    """A request the service refuses; `status` is the matching HTTP code.
+
+    `detail` carries data the caller can act on (e.g. current prices).
+    """
+
+    def __init__(self, message, status=400, detail=None):
+        super().__init__(message)
+        self.status = status
+        self.detail = detail
+
+
+log = logging.getLogger("dalandangan.services")
+
+
+# --------- Auth ----------
+LOGIN_SQL = "SELECT id, username, full_name, email, role, password_hash FROM users WHERE username=%s"
+
+# users are chain-wide: read and written on the home shard's primary, so an
+# account works at any branch right after it is registered
+
+class AuthService:
+    def login(self, username, password):
+        user = fetch_one(LOGIN_SQL, (username,), prepared=True, shard=HOME_SHARD, primary=True)
+        if not user:
+            burn_verify(password)
+            raise ServiceError("Invalid credentials", 401)
+        stored = user.pop('password_hash')
+        if not verify_password(password, stored):
+            raise ServiceError("Invalid credentials", 401)
+        if needs_rehash(stored):
+            self._rehash(user['id'], password, stored)
+        return user
+
+    def _rehash(self, user_id, password, stored):
+        # upgrade legacy/old-cost hashes while we have the plaintext; the
+        # compare-and-set skips it if the password changed meanwhile
+        try:
+            execute("UPDATE users SET password_hash=%s WHERE id=%s AND password_hash=%s",
+                    (hash_password(password), user_id, stored), shard=HOME_SHARD)
+        except mysql.connector.Error as e:
+            log.warning("could not upgrade password hash for user %s: %s", user_id, e)
+
+    def register(self, username, password, full_name="", email=""):
+        if not username or not password:
+            raise ServiceError("Fill required fields")
+        try:
+            return execute("INSERT INTO users (username,password_hash,full_name,email,role) VALUES (%s,%s,%s,%s,'customer')",
+                           (username, hash_password(password), full_name, email), shard=HOME_SHARD)
+        except mysql.connector.IntegrityError:
+            raise ServiceError("Username already exists.", 409)
+
+
+# --------- Menu ----------
+class MenuService:
+    def products(self):
+        return catalog.products()
+
+    def product(self, product_id):
+        for p in catalog.products():
+            if p['id'] == product_id:
+                return p
+        raise ServiceError(f"Product #{product_id} is not on the menu", 404)
+
+
+# --------- Orders ----------
+class OrderService:
+    def __init__(self, menu=None):
+        self.menu = menu or MenuService()
+
+    def build_cart(self, lines):
+        """[{'product_id', 'qty'}] -> the Cart used by place_order."""
+        if not isinstance(lines, list):
+            raise ServiceError("items must be a list of {product_id, qty}")
+        cart = Cart()
+        for line in lines:
+            try:
+                pid, qty = int(line['product_id']), int(line['qty'])
+            except (KeyError, TypeError, ValueError):
+                raise ServiceError("Each item needs a product_id and an integer qty")
+            if qty <= 0:
+                raise ServiceError("Quantity must be a positive integer.")
+            cart.add(cart[pid]['product'] if pid in cart else self.menu.product(pid), qty)
+        return cart
+
+    def place(self, user_id, cart, address, contact, method="Cash", expected_total=None, op_key=None):
+        if not cart:
+            raise ServiceError("Your cart is empty.")
+        if not (address or "").strip() or not (contact or "").strip():
+            raise ServiceError("Please fill address and contact number.")
+        if method not in ("Cash", "Online"):
+            raise ServiceError("Payment method must be Cash or Online")
+        try:
+            oid, total = place_order(user_id, cart, address, contact, method, op_key=op_key,
+                                     expected_total=expected_total)
+        except PriceChanged as e:
+            raise ServiceError(str(e), 409, {'prices': e.prices, 'total': e.total})
+        except ItemsUnavailable as e:
+            raise ServiceError(str(e), 409, {'unavailable': e.names})
+        return {'order_id': oid, 'total': total}
+
+    def page(self, after=None, limit=50, all_stores=False, **filters):
+        rows, cursor = (order_page_all_stores if all_stores else order_page)(after=after, limit=limit, **filters)
+        return {'orders': rows, 'next': cursor}
+
+    def kitchen(self):
+        return kitchen_orders()
+
+    @staticmethod
+    def _step(fn, *args, op_key=None):
+        # losing a race to another terminal is a conflict, not a server error
+        try:
+            fn(*args, op_key=op_key)
+        except InvalidTransition as e:
+            raise ServiceError(str(e), 404 if e.current is None else 409)
+        except ValueError as e:
+            raise ServiceError(str(e))
+
+    # op_key: idempotency key the caller also queues the write under if it fails offline
+    def set_status(self, oid, status, op_key=None):
+        if status not in ORDER_STATUSES:
+            raise ServiceError(f"Unknown status {status!r}")
+        self._step(set_status, oid, status, op_key=op_key)
+
+    def start_preparing(self, oid, op_key=None):
+        self.set_status(oid, 'Preparing', op_key)
+
+    def mark_ready(self, oid, op_key=None):
+        self.set_status(oid, 'Ready for Delivery', op_key)
+
+    def dispatch(self, oid, delivery_person, op_key=None):
+        if not (delivery_person or "").strip():
+            raise ServiceError("Enter delivery person name")
+        self._step(dispatch_order, oid, delivery_person.strip(), op_key=op_key)
+
+    def delivered(self, oid, op_key=None):
+        self._step(mark_delivered, oid, op_key=op_key)
+
+    def pay(self, oid, op_key=None):
+        if mark_paid(oid, op_key=op_key):
+            return
+        # nothing changed; only now is it worth a read to say why
+        if not fetch_one("SELECT status FROM payments WHERE order_id=%s", (oid,), prepared=True, primary=True):
+            raise ServiceError("No payment record found for this order.", 404)
+        raise ServiceError("Already marked as Paid.", 409)
+
+    def receipt(self, oid):
+        return render_receipt(oid)
+
+
+# --------- Dispatch ----------
+class DispatchService:
+    def __init__(self, planner=None):
+        self.planner = planner or DispatchPlanner()
+
+    def board(self):
+        """Suggested runs for the orders waiting at the counter, plus the riders on shift."""
+        on_shift = riders()
+        return {'runs': self.planner.suggest(ready_orders(), on_shift), 'riders': on_shift}
+
+    def dispatch_run(self, rider_id, order_ids, op_key=None):
+        try:
+            rider_id, order_ids = int(rider_id), [int(i) for i in order_ids or []]
+        except (TypeError, ValueError):
+            raise ServiceError("A run needs a rider_id and a list of order ids")
+        try:
+            return {'run_id': dispatch_run(rider_id, order_ids, op_key=op_key)}
+        except InvalidTransition as e:
+            raise ServiceError(str(e), 404 if e.current is None else 409, {'order_id': e.oid})
+        except ValueError as e:
+            raise ServiceError(str(e))
+
+    def riders(self):
+        return riders()
+
+    def add_rider(self, name, phone=""):
+        if not (name or "").strip():
+            raise ServiceError("Enter the rider's name")
+        return add_rider(name.strip(), (phone or "").strip() or None)
+
+    def set_rider_active(self, rider_id, active):
+        set_rider_active(rider_id, active)
@@ -0,0 +1,386 @@
+import tkinter as tk
+from datetime import date
+from tkinter import ttk, messagebox
+
+# --------- Paged Order Tree ----------
+class PagedTree:
+    """Keyset-paged Treeview that fetches the next page as the view nears the bottom.
+
+    `fetch_page(after=..., limit=..., **filters)` must return (rows, next_cursor)
+    and runs on the DbWorker; `render_row(row)` maps a row to Treeview values.
+    Rows are inserted with the order id as iid so `tree.focus()` keeps working.
+    `timing` names the ui series each page fetch (query plus insert) lands in.
+    """
+
+    def __init__(self, worker, tree, scrollbar, fetch_page, render_row, page_size=50, timing=None):
+        self.worker = worker
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.fetch_page = fetch_page
+        self.render_row = render_row
+        self.page_size = page_size
+        self.timing = timing
+        self.filters = {}
+        self._cursor = None
+        self._exhausted = False
+        self._loading = False
+        self._gen = 0
+        self._keys = {}  # iid -> (created_at, id), used to slot patched rows in order
+        tree.configure(yscrollcommand=self._on_scroll)
+        scrollbar.configure(command=tree.yview)
+
+    def reload(self, **filters):
+        """Drop loaded rows and start again from the newest order."""
+        if filters:
+            self.filters = {k: v for k, v in filters.items() if v}
+        self._gen += 1
+        self._cursor = None
+        self._exhausted = False
+        self._loading = False
+        self._keys = {}
+        self.tree.delete(*self.tree.get_children())
+        self.load_more()
+
+    def load_more(self):
+        if self._loading or self._exhausted:
+            return
+        self._loading = True
+        gen = self._gen
+        self.worker.submit(self.fetch_page, after=self._cursor, limit=self.page_size, **self.filters,
+                           on_done=lambda res: self._append(gen, res),
+                           on_error=lambda exc: self._failed(gen, exc), timing=self.timing)
+
+    def _append(self, gen, result):
+        if gen != self._gen:
+            return
+        self._loading = False
+        rows, self._cursor = result
+        self._exhausted = self._cursor is None
+        for r in rows:
+            iid = str(r['id'])
+            if not self.tree.exists(iid):
+                self.tree.insert("", "end", iid=iid, values=self.render_row(r))
+                self._keys[iid] = (r['created_at'], r['id'])
+        # keep going until the visible area is filled or history runs out
+        self.tree.update_idletasks()
+        if self.tree.yview()[1] >= 1.0:
+            self.load_more()
+
+    def matches(self, r):
+        f = self.filters
+        if f.get('status') and r['status'] != f['status']:
+            return False
+        if f.get('date_from') and r['created_at'].date() < f['date_from']:
+            return False
+        if f.get('date_to') and r['created_at'].date() > f['date_to']:
+            return False
+        return True
+
+    def patch(self, rows):
+        """Apply changed orders in place instead of reloading every page."""
+        for r in rows:
+            iid = str(r['id'])
+            if not self.matches(r):
+                if self.tree.exists(iid):
+                    self.tree.delete(iid); self._keys.pop(iid, None)
+                continue
+            if self.tree.exists(iid):
+                self.tree.item(iid, values=self.render_row(r))
+                continue
+            key = (r['created_at'], r['id'])
+            if self._cursor is not None and key < self._cursor:
+                continue  # older than what's loaded; it arrives with its page
+            self.tree.insert("", self._index_for(key), iid=iid, values=self.render_row(r))
+            self._keys[iid] = key
+
+    def _index_for(self, key):
+        # children are newest first, so find the first one older than key
+        children = self.tree.get_children()
+        lo, hi = 0, len(children)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._keys.get(children[mid], key) > key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _failed(self, gen, exc):
+        if gen == self._gen:
+            self._loading = False
+        messagebox.showerror("Database Error", str(exc))
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if float(last) > 0.9:
+            self.load_more()
+
+
+# --------- Incremental Board Refresh ----------
+def patch_tree(tree, rows, render_row, keep, tags=None):
+    """Insert, update or remove single iids for changed rows; rows failing keep() are dropped.
+
+    `tags(row)`, if given, sets each kept row's tags too.
+    """
+    for r in rows:
+        iid = str(r['id'])
+        extra = {'tags': tags(r)} if tags else {}
+        if not keep(r):
+            if tree.exists(iid):
+                tree.delete(iid)
+        elif tree.exists(iid):
+            tree.item(iid, values=render_row(r), **extra)
+        else:
+            tree.insert("", "end", iid=iid, values=render_row(r), **extra)
+
+def order_tree(tree, rows):
+    """Make the tree hold exactly `rows` in this order: departed iids go, the rest are moved, not rebuilt."""
+    wanted = [str(r['id']) for r in rows]
+    keep = set(wanted)
+    for iid in tree.get_children():
+        if iid not in keep:
+            tree.delete(iid)
+    for k, iid in enumerate(wanted):
+        if tree.index(iid) != k:
+            tree.move(iid, "", k)
+
+
+class ChangePoller:
+    """Asks the DB for orders changed since the last poll every few seconds.
+
+    `clock()` returns the DB's current timestamp and `fetch_changes(since)`
+    returns (rows, new_since); both run on the DbWorker. The loop stops by
+    itself once `widget` is destroyed.
+    """
+
+    def __init__(self, widget, worker, clock, fetch_changes, on_changes, interval_ms=3000):
+        self.widget = widget
+        self.worker = worker
+        self.clock = clock
+        self.fetch_changes = fetch_changes
+        self.on_changes = on_changes
+        self.interval_ms = interval_ms
+        self.since = None
+        self._job = None
+        self._busy = False
+        self._again = False  # poll_now() arrived while a poll was in flight
+        self._gen = 0
+
+    def restart(self, then=None):
+        """Take a fresh watermark, then run `then` (normally the full board load)."""
+        self._cancel()
+        self._gen += 1
+        self._busy = False
+        gen = self._gen
+        self.worker.submit(self.clock, on_done=lambda now: self._started(gen, now, then))
+
+    def stop(self):
+        """Stop polling (e.g. the board was hidden); restart() resumes it."""
+        self._cancel()
+        self._gen += 1
+        self._busy = False
+        self._again = False
+        self.since = None
+
+    def poll_now(self):
+        if self.since is None:
+            return
+        if self._busy:
+            self._again = True
+            return
+        self._cancel()
+        self._tick()
+
+    def _started(self, gen, now, then):
+        if gen != self._gen:
+            return
+        self.since = now
+        if then is not None:
+            then()
+        self._schedule()
+
+    def _schedule(self):
+        if self.widget.winfo_exists():
+            self._job = self.widget.after(self.interval_ms, self._tick)
+
+    def _cancel(self):
+        if self._job is not None:
+            self.widget.after_cancel(self._job)
+            self._job = None
+
+    def _tick(self):
+        self._job = None
+        if self._busy or not self.widget.winfo_exists():
+            return
+        self._busy = True
+        gen = self._gen
+        self.worker.submit(self.fetch_changes, self.since,
+                           on_done=lambda res: self._got(gen, res),
+                           on_error=lambda exc: self._got(gen, None))
+
+    def _got(self, gen, result):
+        if gen != self._gen:
+            return
+        self._busy = False
+        if result is not None:  # a failed poll is simply retried on the next tick
+            rows, self.since = result
+            if rows:
+                self.on_changes(rows)
+        if self._again:
+            self._again = False
+            self._tick()
+        else:
+            self._schedule()
+
+
+# --------- Order Filter Bar ----------
+class OrderFilterBar(ttk.Frame):
+    """Status and date-range filters; calls on_apply(status=..., date_from=..., date_to=...)."""
+
+    def __init__(self, parent, statuses, on_apply, with_dates=True):
+        super().__init__(parent)
+        self.on_apply = on_apply
+        self.status = tk.StringVar(value="All")
+        self.date_from = tk.StringVar()
+        self.date_to = tk.StringVar()
+        ttk.Label(self, text="Status").pack(side="left", padx=4)
+        ttk.Combobox(self, values=["All"] + list(statuses), textvariable=self.status,
+                     width=18, state="readonly").pack(side="left", padx=4)
+        if with_dates:
+            ttk.Label(self, text="From (YYYY-MM-DD)").pack(side="left", padx=4)
+            ttk.Entry(self, textvariable=self.date_from, width=12).pack(side="left", padx=4)
+            ttk.Label(self, text="To").pack(side="left", padx=4)
+            ttk.Entry(self, textvariable=self.date_to, width=12).pack(side="left", padx=4)
+        ttk.Button(self, text="Filter", bootstyle="info", command=self.apply).pack(side="left", padx=6)
+
+    def values(self):
+        status = self.status.get()
+        try:
+            d_from = date.fromisoformat(self.date_from.get().strip()) if self.date_from.get().strip() else None
+            d_to = date.fromisoformat(self.date_to.get().strip()) if self.date_to.get().strip() else None
+        except ValueError:
+            messagebox.showerror("Invalid Date", "Dates must look like 2025-01-31.")
+            return None
+        return {'status': None if status == "All" else status, 'date_from': d_from, 'date_to': d_to}
+
+    def apply(self):
+        vals = self.values()
+        if vals is not None:
+            self.on_apply(**vals)
+
+    def reset(self):
+        """Back to "All" and no dates, without triggering on_apply."""
+        self.status.set("All"); self.date_from.set(""); self.date_to.set("")
+
+
+# --------- Retained Screens ----------
+class ScreenManager:
+    """Builds each screen once and swaps them by packing/unpacking their frames.
+
+    `register(name, build)`: build(frame) fills the frame and returns an
+    optional (on_show, on_hide) pair; on_show runs every time the screen
+    becomes visible (bind the current user, start polling) and on_hide when
+    it is left (stop timers). `on_switch` runs before every change.
+    """
+
+    def __init__(self, root, on_switch=None):
+        self.root = root
+        self.on_switch = on_switch
+        self._builders = {}
+        self._screens = {}  # name -> (frame, on_show, on_hide)
+        self.current = None
+
+    def register(self, name, build):
+        self._builders[name] = build
+
+    def show(self, name):
+        if self.on_switch is not None:
+            self.on_switch()
+        if self.current is not None:
+            frame, _, on_hide = self._screens[self.current]
+            if on_hide is not None:
+                on_hide()
+            frame.pack_forget()
+        if name not in self._screens:
+            frame = ttk.Frame(self.root)
+            hooks = self._builders[name](frame) or (None, None)
+            self._screens[name] = (frame, *hooks)
+        frame, on_show, _ = self._screens[name]
+        frame.pack(fill="both", expand=True)
+        self.current = name
+        if on_show is not None:
+            on_show()
+
+
+# --------- Virtual Card Grid ----------
+class VirtualGrid:
+    """Fixed-size cards laid out in a Canvas, built only for rows in view.
+
+    Only the visible rows plus `overscan` rows above and below have widgets;
+    cards scrolled out of view are hidden and rebound to whatever scrolls in,
+    so widget count stays constant however long the catalog is.
+    `make_card(canvas)` builds an empty card, `bind_card(card, item)` fills it.
+    """
+
+    def __init__(self, canvas, scrollbar, make_card, bind_card, columns=3, cell=(300, 340), overscan=1):
+        self.canvas = canvas
+        self.scrollbar = scrollbar
+        self.make_card = make_card
+        self.bind_card = bind_card
+        self.columns = columns
+        self.cell_w, self.cell_h = cell
+        self.overscan = overscan
+        self.items = []
+        self._shown = {}  # item index -> (card, canvas window id)
+        self._spare = []
+        canvas.configure(yscrollcommand=self._on_yscroll, yscrollincrement=self.cell_h // 4)
+        scrollbar.configure(command=self._yview)
+        canvas.bind("<Configure>", lambda e: self.refresh())
+
+    def set_items(self, items):
+        self.items = list(items)
+        rows = -(-len(self.items) // self.columns)
+        self.canvas.configure(scrollregion=(0, 0, self.columns * self.cell_w, rows * self.cell_h))
+        for idx in list(self._shown):
+            self._park(idx)
+        self.canvas.yview_moveto(0)
+        self.refresh()
+
+    def _yview(self, *args):
+        self.canvas.yview(*args)
+        self.refresh()
+
+    def _on_yscroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self.refresh()
+
+    def _park(self, idx):
+        card, win = self._shown.pop(idx)
+        self.canvas.itemconfigure(win, state="hidden")
+        self._spare.append((card, win))
+
+    def refresh(self):
+        if not self.items:
+            return
+        top = self.canvas.canvasy(0)
+        height = max(self.canvas.winfo_height(), self.cell_h)
+        first_row = max(0, int(top // self.cell_h) - self.overscan)
+        last_row = int((top + height) // self.cell_h) + self.overscan
+        wanted = range(first_row * self.columns, min(len(self.items), (last_row + 1) * self.columns))
+        for idx in [i for i in self._shown if i not in wanted]:
+            self._park(idx)
+        for idx in wanted:
+            if idx in self._shown:
+                continue
+            x = (idx % self.columns) * self.cell_w
+            y = (idx // self.columns) * self.cell_h
+            if self._spare:
+                card, win = self._spare.pop()
+                self.canvas.coords(win, x, y)
+                self.canvas.itemconfigure(win, state="normal")
+            else:
+                card = self.make_card(self.canvas)
+                win = self.canvas.create_window(x, y, window=card, anchor="nw",
+                                                width=self.cell_w - 28, height=self.cell_h - 28)
+            self.bind_card(card, self.items[idx])
+            self._shown[idx] = (card, win)
@@ -0,0 +1,83 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import messagebox
+
+from dalandangan_metrics import metrics
+
+# --------- Background DB Worker ----------
+class DbWorker:
+    """Runs blocking calls on a thread pool and hands results back on the Tk thread.
+
+    Tk widgets may only be touched from the main loop, so finished futures are
+    queued and drained by an `after()` poll.  `cancel_all()` bumps a generation
+    counter: anything submitted before it is cancelled if still queued and its
+    callbacks are dropped if it was already running.
+
+    `timing="ui.name"` records the whole round trip, from submit until the
+    on_done/on_error callback has returned, as a ui series.
+    """
+
+    def __init__(self, root, max_workers=4, poll_ms=30):
+        self.root = root
+        self.poll_ms = poll_ms
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db-worker")
+        self._done = queue.SimpleQueue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._polling = False
+
+    def submit(self, fn, *args, on_done=None, on_error=None, timing=None, **kwargs):
+        gen = self._generation
+        started = time.perf_counter()
+        fut = self._executor.submit(fn, *args, **kwargs)
+        with self._lock:
+            self._pending.add(fut)
+        fut.add_done_callback(lambda f: self._done.put((gen, f, on_done, on_error, timing, started)))
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_ms, self._poll)
+        return fut
+
+    def cancel_all(self):
+        self._generation += 1
+        with self._lock:
+            pending, self._pending = self._pending, set()
+        for fut in pending:
+            fut.cancel()
+
+    def shutdown(self):
+        self.cancel_all()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _poll(self):
+        while True:
+            try:
+                gen, fut, on_done, on_error, timing, started = self._done.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._pending.discard(fut)
+            if gen != self._generation or fut.cancelled():
+                continue
+            exc = fut.exception()
+            try:
+                if exc is not None:
+                    (on_error or self._report)(exc)
+                elif on_done is not None:
+                    on_done(fut.result())
+            except Exception as cb_exc:
+                self._report(cb_exc)
+            if timing:
+                metrics.record("ui", timing, (time.perf_counter() - started) * 1000, error=exc is not None)
+        with self._lock:
+            busy = bool(self._pending)
+        if busy or not self._done.empty():
+            self.root.after(self.poll_ms, self._poll)
+        else:
+            self._polling = False
+
+    def _report(self, exc):
+        messagebox.showerror("Database Error", str(exc))
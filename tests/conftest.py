@@ -0,0 +1,60 @@
+import os
+import sys
+from contextlib import contextmanager
+
+import pytest
+
+# the dalandangan_* modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeCursor:
+    """Stands in for a TxCursor: `respond(sql, params)` returns rows (a list) or a rowcount (an int).
+
+    Every statement is kept in `calls` as (collapsed sql, params).
+    """
+
+    def __init__(self, respond=None):
+        self.respond = respond or (lambda sql, params: 1)
+        self.calls = []
+        self.rows, self.rowcount, self.lastrowid = [], 0, 0
+        self.outcome = None  # 'committed' or 'rolled back', set by fake_tx
+
+    def execute(self, sql, params=()):
+        sql = " ".join(sql.split())
+        self.calls.append((sql, tuple(params)))
+        reply = self.respond(sql, tuple(params))
+        if isinstance(reply, list):
+            self.rows, self.rowcount = reply, len(reply)
+        else:
+            self.rows, self.rowcount = [], reply or 0
+        self.lastrowid += 1
+        return self
+
+    execute_prepared = execute
+
+    def fetchall(self):
+        return self.rows
+
+    def ran(self, fragment):
+        return [params for sql, params in self.calls if fragment in sql]
+
+
+@pytest.fixture
+def fake_tx(monkeypatch):
+    """fake_tx(module, respond) swaps module.transaction for one that yields a FakeCursor."""
+    def install(module, respond=None):
+        cur = FakeCursor(respond)
+
+        @contextmanager
+        def transaction(name="transaction", shard=None):
+            try:
+                yield cur
+            except Exception:
+                cur.outcome = "rolled back"
+                raise
+            cur.outcome = "committed"
+
+        monkeypatch.setattr(module, "transaction", transaction)
+        return cur
+    return install
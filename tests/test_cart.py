@@ -0,0 +1,91 @@
+from decimal import Decimal
+
+import pytest
+
+from dalandangan_cart import Cart, ItemsUnavailable, PriceChanged, from_cents, reprice, to_cents
+
+
+def product(pid, price, name=None):
+    return {'id': pid, 'name': name or f"Pizza {pid}", 'price': Decimal(price)}
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows, self.params = rows, None
+
+    def execute(self, sql, params):
+        self.params = params
+
+    def fetchall(self):
+        return self.rows
+
+
+def test_cents_round_half_up():
+    assert to_cents("0.105") == 11
+    assert to_cents(Decimal("249.99")) == 24999
+    assert to_cents(0.1) == 10  # str() of the float, not its binary value
+    assert from_cents(24999) == Decimal("249.99")
+
+
+def test_total_tracks_every_change():
+    cart = Cart()
+    cart.add(product(1, "0.10"), 3)
+    cart.add(product(2, "249.99"), 1)
+    assert cart.total == Decimal("250.29")
+    cart.add(product(1, "0.10"), 1)
+    cart.set_qty(2, 2)
+    assert cart.total == Decimal("500.38")
+    assert cart.subtotal(1) == Decimal("0.40")
+    cart.remove(2)
+    cart.remove(99)
+    assert cart.total == Decimal("0.40")
+    cart.clear()
+    assert cart.total_cents == 0 and not cart
+
+
+def test_update_prices_adjusts_total():
+    cart = Cart()
+    cart.add(product(1, "100.00"), 2)
+    cart.update_prices({1: Decimal("120.50"), 7: Decimal("1.00")})
+    assert cart[1]['product']['price'] == Decimal("120.50")
+    assert cart.total == Decimal("241.00")
+    assert 7 not in cart
+
+
+def test_reprice_uses_current_prices():
+    cart = Cart()
+    cart.add(product(1, "100.00"), 2)
+    cart.add(product(2, "50.00"), 1)
+    cur = FakeCursor([(1, Decimal("110.00"), 1), (2, Decimal("50.00"), 1)])
+    lines, total = reprice(cur, cart)
+    assert cur.params == [1, 2]
+    assert lines == [(1, 2, Decimal("110.00")), (2, 1, Decimal("50.00"))]
+    assert total == Decimal("270.00")
+
+
+def test_reprice_refuses_missing_or_switched_off_items():
+    cart = Cart()
+    cart.add(product(1, "100.00", "Hawaiian"), 1)
+    cart.add(product(2, "50.00", "Garlic Bread"), 1)
+    cart.add(product(3, "80.00", "Bicol Express"), 1)
+    with pytest.raises(ItemsUnavailable) as exc:
+        reprice(FakeCursor([(1, Decimal("100.00"), 1), (2, Decimal("50.00"), 0)]), cart)
+    assert exc.value.names == ["Garlic Bread", "Bicol Express"]
+
+
+def test_price_changed_carries_new_prices():
+    exc = PriceChanged({1: Decimal("120.00")}, Decimal("240.00"))
+    assert isinstance(exc, ValueError)
+    assert exc.prices == {1: Decimal("120.00")}
+    assert "240.00" in str(exc)
+
+
+def test_copy_is_independent():
+    cart = Cart()
+    cart.add(product(1, "100.00"), 2)
+    snapshot = cart.copy()
+    cart.add(product(2, "50.00"), 1)
+    cart.set_qty(1, 5)
+    assert isinstance(snapshot, Cart)
+    assert list(snapshot) == [1] and snapshot[1]['qty'] == 2
+    assert snapshot.total == Decimal("200.00")
@@ -0,0 +1,114 @@
+import pytest
+
+pytest.importorskip("mysql.connector")
+
+import dalandangan_db as db
+
+
+class FakeConn:
+    def __init__(self, **config):
+        self.config = config
+        self.autocommit = False
+        self.in_transaction = False
+        self.closed = False
+        self.rollbacks = 0
+        self.ping_error = None
+
+    def rollback(self):
+        self.rollbacks += 1; self.in_transaction = False
+
+    def ping(self, reconnect=False):
+        if self.ping_error:
+            raise self.ping_error
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def opened(monkeypatch):
+    """Every connection the pool opens, in order."""
+    conns = []
+    def connect(**config):
+        conns.append(FakeConn(**config))
+        return conns[-1]
+    monkeypatch.setattr(db.mysql.connector, "connect", connect)
+    return conns
+
+def make_pool(**settings):
+    return db.ConnectionPool({'host': 'db', 'database': 'test'}, **settings)
+
+
+def test_released_connection_is_reused(opened):
+    pool = make_pool()
+    conn = pool.acquire()
+    assert conn.autocommit and conn.config['connection_timeout'] == 10
+    pool.release(conn)
+    assert pool.acquire() is conn
+    assert len(opened) == 1
+    assert pool.snapshot()['checkouts'] == 2
+
+
+def test_configured_connect_timeout_wins(opened):
+    pool = db.ConnectionPool({'host': 'db', 'connection_timeout': 3}, connect_timeout=10)
+    assert pool.acquire().config['connection_timeout'] == 3
+
+
+def test_open_transaction_is_rolled_back_on_release(opened):
+    pool = make_pool()
+    conn = pool.acquire(); conn.in_transaction = True
+    pool.release(conn)
+    assert conn.rollbacks == 1 and pool.acquire() is conn
+
+
+def test_exhausted_pool_times_out(opened):
+    pool = make_pool(size=2, timeout=0.05)
+    held = [pool.acquire(), pool.acquire()]
+    with pytest.raises(db.PoolError):
+        pool.acquire()
+    assert pool.snapshot()['timeouts'] == 1
+    pool.release(held[0])
+    assert pool.acquire() is held[0]
+
+
+def test_broken_connection_is_discarded(opened):
+    pool = make_pool(size=1)
+    conn = pool.acquire()
+    pool.release(conn, broken=True)
+    assert conn.closed
+    assert pool.acquire() is not conn
+    assert pool.snapshot()['discarded'] == 1
+
+
+def test_failed_connect_gives_the_slot_back(opened, monkeypatch):
+    pool = make_pool(size=1, timeout=0.05)
+    def refuse(**config):
+        raise db.mysql.connector.errors.InterfaceError("unreachable")
+    monkeypatch.setattr(db.mysql.connector, "connect", refuse)
+    with pytest.raises(db.mysql.connector.errors.InterfaceError):
+        pool.acquire()
+    monkeypatch.undo()
+    monkeypatch.setattr(db.mysql.connector, "connect", lambda **config: FakeConn(**config))
+    assert pool.acquire() is not None  # the one slot was not leaked
+
+
+def test_stale_and_dead_connections_are_replaced(opened):
+    pool = make_pool(recycle=-1)
+    old = pool.acquire(); pool.release(old)
+    assert pool.acquire() is not old and old.closed
+
+    pool = make_pool(ping_after=-1)
+    dead = pool.acquire(); pool.release(dead)
+    dead.ping_error = db.mysql.connector.errors.OperationalError("gone away")
+    assert pool.acquire() is not dead
+    assert pool.snapshot()['health_failures'] == 1
+
+
+def test_closed_pool_refuses(opened):
+    pool = make_pool()
+    conn = pool.acquire()
+    pool.close_all()
+    with pytest.raises(db.PoolError):
+        pool.acquire()
+    pool.release(conn)
+    assert conn.closed
@@ -0,0 +1,111 @@
+from datetime import datetime
+
+import pytest
+
+import dalandangan_dispatch as dispatch
+from dalandangan_dispatch import DispatchPlanner
+
+NOW = datetime(2026, 3, 7, 12, 0)
+
+
+def at(hh, mm):
+    return datetime(2026, 3, 7, hh, mm)
+
+def order(oid, address, ready):
+    return {'id': oid, 'delivery_address': address, 'created_at': at(11, 0), 'updated_at': ready}
+
+def rider(rid, open_drops=0, out_since=None, last_back=None):
+    return {'id': rid, 'name': f"Rider {rid}", 'open_drops': open_drops, 'out_since': out_since, 'last_back': last_back}
+
+
+def test_area():
+    p = DispatchPlanner({'areas': {'Poblacion': ['poblacion', 'town proper']}})
+    assert p.area("12 Rizal St., Town Proper, Iriga") == "Poblacion"
+    assert p.area("Purok 3, Brgy. San Roque, Naga") == "Purok 3"
+    assert p.area("45 Magsaysay Ave, Concepcion Pequeña, Naga City") == "Concepcion Pequeña"
+    assert p.area("Naga") == "Naga"
+    assert p.area(None) == "Unknown"
+
+
+def test_runs_by_area_oldest_first():
+    p = DispatchPlanner({'max_drops': 2})
+    runs = p.runs([order(1, "Brgy. San Roque, Naga", at(11, 0)), order(2, "Brgy. San Roque, Naga", at(11, 5)),
+                   order(3, "Brgy. San Roque, Naga", at(11, 10)), order(4, "Brgy. Concepcion, Naga", at(10, 50))])
+    assert [(r['area'], [o['id'] for o in r['orders']]) for r in runs] == \
+        [("Brgy. Concepcion", [4]), ("Brgy. San Roque", [1, 2]), ("Brgy. San Roque", [3])]
+
+
+def test_part_filled_run_takes_a_neighbouring_run():
+    p = DispatchPlanner({'max_drops': 2, 'neighbours': {'Brgy. San Roque': ['Brgy. Concepcion']}})
+    runs = p.runs([order(1, "Brgy. San Roque, Naga", at(11, 0)), order(2, "Brgy. San Roque, Naga", at(11, 5)),
+                   order(3, "Brgy. San Roque, Naga", at(11, 10)), order(4, "Brgy. Concepcion, Naga", at(10, 50))])
+    assert [(r['area'], [o['id'] for o in r['orders']]) for r in runs] == \
+        [("Brgy. San Roque + Brgy. Concepcion", [3, 4]), ("Brgy. San Roque", [1, 2])]
+
+
+def test_back_at():
+    p = DispatchPlanner()
+    assert p.back_at(rider(1), NOW) == NOW
+    assert p.back_at(rider(1, 2, out_since=at(11, 50)), NOW) == at(12, 20)
+    assert p.back_at(rider(1, 1, out_since=at(10, 0)), NOW) == NOW  # overdue counts as back now
+
+
+def test_suggest_idle_riders_first_then_soonest_back():
+    p = DispatchPlanner({'max_drops': 1})
+    orders = [order(k, "Brgy. San Roque, Naga", at(11, k)) for k in range(1, 6)]
+    riders = [rider(1, last_back=at(11, 30)), rider(2),
+              rider(3, 2, out_since=at(11, 50)), rider(4, 1, out_since=at(11, 55))]
+    runs = p.suggest(orders, riders, NOW)
+    assert [r['rider']['id'] if r['rider'] else None for r in runs] == [2, 1, 4, 3, None]
+    assert [o['id'] for o in runs[0]['orders']] == [1]
+    assert (runs[0]['leaves'], runs[0]['back']) == (NOW, at(12, 20))
+    assert (runs[2]['leaves'], runs[2]['back']) == (at(12, 15), at(12, 35))
+    assert (runs[4]['leaves'], runs[4]['back']) == (None, None)
+
+
+# --------- dispatch_run (needs the MySQL driver for the DB layer) ----------
+def run_db(fake_tx, status, rider=("Ana",)):
+    """A fake transaction where the rider lookup returns `rider` and the orders have `status` (id -> status)."""
+    db = pytest.importorskip("dalandangan_db")
+    def respond(sql, params):
+        if sql.startswith("SELECT name FROM riders"):
+            return [rider] if rider else []
+        if sql.startswith("SELECT id, status FROM orders"):
+            return [(oid, status[oid]) for oid in params[1:] if oid in status]
+        return 1
+    return fake_tx(db, respond)
+
+
+def test_dispatch_run_moves_every_order_together(fake_tx):
+    cur = run_db(fake_tx, {1: 'Ready for Delivery', 2: 'Ready for Delivery'})
+    run_id = dispatch.dispatch_run(5, ["1", 2, 1], op_key="k1")
+    assert cur.outcome == "committed"
+    assert cur.ran("client_ops") == [("k1", None)]
+    assert cur.ran("UPDATE orders SET status='Out for Delivery'") == [(1, 1, 2)]
+    assert cur.ran("INSERT INTO delivery_runs") == [(1, 5, 2)]
+    assert cur.ran("INSERT INTO deliveries") == [(1, "Ana", 5, run_id, 2, "Ana", 5, run_id)]
+    assert [p[0] for p in cur.ran("order_events")] == [1, 2]
+
+
+def test_dispatch_run_writes_nothing_if_one_order_moved(fake_tx):
+    cur = run_db(fake_tx, {1: 'Ready for Delivery', 2: 'Out for Delivery'})
+    orders = pytest.importorskip("dalandangan_orders")
+    with pytest.raises(orders.InvalidTransition) as exc:
+        dispatch.dispatch_run(5, [1, 2])
+    assert (exc.value.oid, exc.value.current) == (2, 'Out for Delivery')
+    assert cur.outcome == "rolled back"
+    assert cur.ran("UPDATE orders") == [] and cur.ran("INSERT INTO") == []
+
+
+def test_dispatch_run_needs_a_rider_on_shift(fake_tx):
+    cur = run_db(fake_tx, {1: 'Ready for Delivery'}, rider=None)
+    with pytest.raises(ValueError, match="not on shift"):
+        dispatch.dispatch_run(5, [1])
+    assert cur.outcome == "rolled back" and cur.ran("UPDATE orders") == []
+
+
+def test_dispatch_run_size_limits():
+    with pytest.raises(ValueError):
+        dispatch.dispatch_run(5, [])
+    with pytest.raises(ValueError):
+        dispatch.dispatch_run(5, range(1, dispatch.DISPATCH_CONFIG['max_drops'] + 2))
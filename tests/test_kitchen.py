@@ -0,0 +1,74 @@
+from datetime import datetime
+
+import pytest
+
+from dalandangan_kitchen import KitchenScheduler, attach_items
+
+NOW = datetime(2026, 3, 7, 12, 0)
+
+
+def at(hh, mm):
+    return datetime(2026, 3, 7, hh, mm)
+
+def ticket(oid, created, *items, status='Pending', updated=None):
+    return {'id': oid, 'status': status, 'created_at': created, 'updated_at': updated or created,
+            'items': [{'product_id': pid, 'name': name, 'qty': qty, 'prep_minutes': prep}
+                      for pid, name, qty, prep in items]}
+
+PEPPERONI = (1, "Pepperoni", 1, 12)
+HAWAIIAN = (2, "Hawaiian", 1, 20)
+
+
+def test_most_urgent_first_one_pizza_per_load():
+    s = KitchenScheduler({'oven_slots': 1})
+    s.load([ticket(1, at(11, 50), PEPPERONI), ticket(2, at(11, 40), HAWAIIAN), ticket(3, at(11, 55), PEPPERONI)])
+    plan = s.plan(NOW)
+    assert [ld['lines'][0]['orders'] for ld in plan['loads']] == [[2], [1], [3]]
+    assert [(plan['orders'][o]['seq'], plan['orders'][o]['eta']) for o in (2, 1, 3)] == \
+        [(1, at(12, 20)), (2, at(12, 32)), (3, at(12, 44))]
+    assert plan['orders'][2]['late'] and plan['orders'][1]['late'] and plan['orders'][3]['late']
+    assert [t['id'] for t, _ in s.queue(NOW)[0]] == [2, 1, 3]
+
+
+def test_identical_pizzas_share_a_load_longer_ones_wait():
+    s = KitchenScheduler()
+    s.load([ticket(1, at(11, 40), PEPPERONI), ticket(2, at(11, 58), HAWAIIAN), ticket(3, at(11, 50), PEPPERONI)])
+    first, second = s.plan(NOW)['loads']
+    assert first['lines'] == [{'name': "Pepperoni", 'qty': 2, 'orders': [1, 3]}]
+    assert (first['start'], first['ready']) == (NOW, at(12, 12))
+    assert second['lines'][0]['orders'] == [2]
+    assert (second['start'], second['ready']) == (at(12, 12), at(12, 32))
+
+
+def test_preparing_order_holds_its_oven():
+    tickets = [ticket(9, at(11, 30), PEPPERONI, status='Preparing', updated=at(11, 55)),
+               ticket(1, at(11, 50), PEPPERONI)]
+    one = KitchenScheduler({'ovens': 1}); one.load(tickets)
+    plan = one.plan(NOW)
+    assert plan['orders'][9] == {'seq': 0, 'eta': at(12, 7), 'due': at(12, 0), 'late': True}
+    assert plan['loads'][0]['start'] == at(12, 7)
+    assert [t['id'] for t, _ in one.queue(NOW)[0]] == [9, 1]
+
+    two = KitchenScheduler({'ovens': 2}); two.load(tickets)
+    load = two.plan(NOW)['loads'][0]
+    assert (load['oven'], load['start']) == (2, NOW)
+
+
+def test_apply_drops_orders_that_left_the_kitchen():
+    s = KitchenScheduler()
+    s.load([ticket(1, at(11, 50), PEPPERONI), ticket(2, at(11, 50), HAWAIIAN)])
+    s.apply([{'id': 1, 'status': 'Ready for Delivery'}, ticket(3, at(11, 59), PEPPERONI)])
+    assert sorted(s.tickets) == [2, 3]
+    assert sorted(s.plan(NOW)['orders']) == [2, 3]
+
+
+def test_attach_items_only_reads_items_for_kitchen_orders(monkeypatch):
+    db = pytest.importorskip("dalandangan_db")  # needs the MySQL driver
+    asked = []
+    def fetch_all(sql, params):
+        asked.append(params)
+        return [{'order_id': 1, 'product_id': 1, 'name': "Pepperoni", 'qty': 2, 'prep_minutes': 12}]
+    monkeypatch.setattr(db, "fetch_all", fetch_all)
+    rows = attach_items([{'id': 1, 'status': 'Pending'}, {'id': 2, 'status': 'Completed'}])
+    assert asked == [(12, 1)]
+    assert [len(r['items']) for r in rows] == [1, 0]
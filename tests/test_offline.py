@@ -0,0 +1,73 @@
+import time
+
+import pytest
+
+pytest.importorskip("mysql.connector")  # replayed writes go through the DB layer
+
+import dalandangan_offline as offline
+from dalandangan_events import CLIENT_OPS_KEEP_DAYS
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = offline.OfflineStore(str(tmp_path / "offline.sqlite3"))
+    yield s
+    s.close()
+
+@pytest.fixture
+def writes(monkeypatch):
+    """Replace the real writes with a recorder; `applied` is what client_ops already holds."""
+    calls, applied = [], set()
+    def write(payload, key):
+        calls.append((payload['oid'], key)); applied.add(key)
+    monkeypatch.setitem(offline.WRITES, 'set_status', write)
+    monkeypatch.setattr(offline, 'applied_op', lambda key: {'op_key': key} if key in applied else None)
+    return calls, applied
+
+
+def test_queued_writes_expire_before_their_keys_are_pruned():
+    assert offline.MAX_QUEUED_DAYS < CLIENT_OPS_KEEP_DAYS
+
+
+def test_replay_applies_in_order_and_skips_keys_already_applied(store, writes):
+    calls, applied = writes
+    first = store.enqueue('set_status', {'oid': 1, 'status': 'Preparing'})
+    done = store.enqueue('set_status', {'oid': 2, 'status': 'Preparing'})
+    applied.add(done)  # committed just before the link dropped
+    third = store.enqueue('set_status', {'oid': 3, 'status': 'Preparing'})
+    assert offline.OfflineReplayer(store).replay_once() == 3
+    assert calls == [(1, first), (3, third)]
+    assert store.counts() == {'pending': 0, 'failed': 0}
+
+
+def test_replay_reuses_the_online_attempts_key(store, writes):
+    calls, applied = writes
+    key = offline.new_op_key()
+    assert store.enqueue('set_status', {'oid': 1, 'status': 'Preparing'}, key) == key
+    applied.add(key)
+    offline.OfflineReplayer(store).replay_once()
+    assert calls == []
+
+
+def test_rejected_write_is_parked_not_retried(store, writes, monkeypatch):
+    def refuse(payload, key):
+        raise ValueError("Order #1 is Completed")
+    monkeypatch.setitem(offline.WRITES, 'set_status', refuse)
+    store.enqueue('set_status', {'oid': 1, 'status': 'Preparing'})
+    assert offline.OfflineReplayer(store).replay_once() == 0
+    assert store.counts() == {'pending': 0, 'failed': 1}
+
+
+def test_expired_write_is_not_replayed(store, writes, monkeypatch):
+    calls, _ = writes
+    store.enqueue('set_status', {'oid': 1, 'status': 'Preparing'})
+    later = time.time() + (offline.MAX_QUEUED_DAYS + 1) * 86400
+    monkeypatch.setattr(offline.time, 'time', lambda: later)
+    offline.OfflineReplayer(store).replay_once()
+    assert calls == []
+    assert store.counts() == {'pending': 0, 'failed': 1}
+
+
+def test_unknown_kind_is_refused(store):
+    with pytest.raises(ValueError):
+        store.enqueue('drop_tables', {})
@@ -0,0 +1,130 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("mysql.connector")  # dalandangan_orders runs on the DB layer
+
+import dalandangan_orders as orders
+
+
+def test_mark_paid_noop_leaves_no_claim(fake_tx):
+    cur = fake_tx(orders, lambda sql, params: 0 if sql.startswith("UPDATE payments") else 1)
+    assert orders.mark_paid(7, op_key="k1") is False
+    assert cur.ran("client_ops") == [] and cur.ran("order_events") == []
+
+
+def test_mark_paid_claims_with_the_write(fake_tx):
+    cur = fake_tx(orders)
+    assert orders.mark_paid(7, op_key="k1") is True
+    assert [sql.split()[0:3] for sql, _ in cur.calls] == [
+        ["UPDATE", "payments", "p"], ["INSERT", "INTO", "client_ops"], ["INSERT", "INTO", "order_events"]]
+    assert cur.ran("client_ops") == [("k1", 7)]
+    assert cur.outcome == "committed"
+
+
+# --------- transition() ----------
+def status_db(fake_tx, changed=1, current=None):
+    """The guarded UPDATE matches `changed` rows; a re-read finds the order at `current`."""
+    def respond(sql, params):
+        if sql.startswith("UPDATE orders"):
+            return changed
+        if sql.startswith("SELECT status FROM orders"):
+            return [(current,)] if current else []
+        return 1
+    return fake_tx(orders, respond)
+
+
+def test_step_is_a_guarded_update(fake_tx):
+    cur = status_db(fake_tx)
+    orders.set_status(7, 'Preparing', op_key="k1")
+    assert cur.ran("UPDATE orders SET status=%s WHERE id=%s AND status=%s") == [('Preparing', 7, 'Pending')]
+    assert cur.ran("client_ops") == [("k1", 7)]
+    assert cur.ran("order_events") == [(7, 'status', 'Preparing')]
+    assert cur.outcome == "committed"
+
+
+def test_losing_the_race_writes_nothing(fake_tx):
+    cur = status_db(fake_tx, changed=0, current='Preparing')
+    with pytest.raises(orders.InvalidTransition) as exc:
+        orders.set_status(7, 'Preparing', op_key="k1")
+    assert (exc.value.oid, exc.value.current, exc.value.wanted) == (7, 'Preparing', 'Preparing')
+    assert cur.outcome == "rolled back"  # the claim goes with it
+    assert cur.ran("order_events") == []
+
+
+def test_missing_order(fake_tx):
+    status_db(fake_tx, changed=0)
+    with pytest.raises(orders.InvalidTransition, match="not found"):
+        orders.mark_delivered(7)
+
+
+def test_dispatch_adds_one_delivery_row(fake_tx):
+    cur = status_db(fake_tx)
+    orders.dispatch_order(7, "Ana")
+    assert cur.ran("UPDATE orders SET status=%s") == [('Out for Delivery', 7, 'Ready for Delivery')]
+    assert cur.ran("INSERT INTO deliveries") == [(7, "Ana")]
+
+
+def test_dispatch_needs_someone_to_take_it(fake_tx):
+    cur = status_db(fake_tx)
+    with pytest.raises(ValueError):
+        orders.dispatch_order(7, "")
+    assert cur.calls == []
+
+
+def test_delivery_completes_order_and_delivery_together(fake_tx):
+    cur = status_db(fake_tx)
+    orders.mark_delivered(7)
+    assert cur.ran("SET o.status='Completed', d.delivered_at=NOW()") == [(7,)]
+    assert cur.ran("order_events") == [(7, 'delivered', 'Completed')]
+
+
+@pytest.mark.parametrize("status", ['Out for Delivery', 'Completed', 'Pending', 'Cancelled'])
+def test_set_status_refuses_steps_it_does_not_own(fake_tx, status):
+    cur = status_db(fake_tx)
+    with pytest.raises(ValueError):
+        orders.set_status(7, status)
+    assert cur.calls == []
+
+
+# --------- changes_since() ----------
+@pytest.fixture
+def changed_rows(monkeypatch):
+    """Serve CHANGED_ORDERS_SQL from `rows`, honouring its (updated_at, id) keyset and LIMIT."""
+    rows, queries = [], []
+    def fetch_all(sql, params, **kw):
+        store, ts, same_ts, after_id, limit = params
+        queries.append(params)
+        hits = sorted((r for r in rows if r['updated_at'] > ts or (r['updated_at'] == same_ts and r['id'] > after_id)),
+                      key=lambda r: (r['updated_at'], r['id']))
+        return hits[:limit]
+    monkeypatch.setattr(orders, "fetch_all", fetch_all)
+    monkeypatch.setattr(orders, "replica_lag_allowance", lambda: 0)
+    return rows, queries
+
+
+def test_burst_bigger_than_a_page_is_read_in_full(changed_rows):
+    rows, queries = changed_rows
+    since = datetime(2026, 3, 7, 12, 0)
+    # a bulk update: 25 orders stamped within the same few microseconds
+    rows += [{'id': i, 'updated_at': since + timedelta(microseconds=i % 3)} for i in range(1, 26)]
+    got, mark = orders.changes_since(since, limit=10)
+    assert sorted(r['id'] for r in got) == list(range(1, 26))
+    assert mark == since + timedelta(microseconds=2)
+    assert len(queries) == 3
+    assert queries[0][1:4] == (since - orders.CHANGE_LOOKBACK, since - orders.CHANGE_LOOKBACK, 0)
+    # each page starts after the last row of the previous one
+    first_page = sorted(rows, key=lambda r: (r['updated_at'], r['id']))[:10]
+    assert queries[1][1:4] == (first_page[-1]['updated_at'], first_page[-1]['updated_at'], first_page[-1]['id'])
+
+
+def test_quiet_board_is_one_query_and_keeps_its_watermark(changed_rows):
+    rows, queries = changed_rows
+    since = datetime(2026, 3, 7, 12, 0)
+    got, mark = orders.changes_since(since)
+    assert (got, mark, len(queries)) == ([], since, 1)
+
+
+def test_changes_since_rejects_an_empty_page(changed_rows):
+    with pytest.raises(ValueError):
+        orders.changes_since(datetime(2026, 3, 7, 12, 0), limit=0)
@@ -0,0 +1,43 @@
+import hashlib
+
+import pytest
+
+import dalandangan_passwords as pw
+
+
+@pytest.fixture(autouse=True)
+def cheap_cost(monkeypatch):
+    # the real cost is tuned to take a noticeable time per hash
+    monkeypatch.setitem(pw.PASSWORD_CONFIG, 'ln', 4)
+
+
+def test_versioned_hash_round_trip():
+    stored = pw.hash_password("s3cret")
+    assert stored.startswith("$scrypt$ln=4,r=8,p=1$")
+    assert pw.verify_password("s3cret", stored)
+    assert not pw.verify_password("wrong", stored)
+    assert not pw.needs_rehash(stored)
+
+
+def test_salted():
+    assert pw.hash_password("s3cret") != pw.hash_password("s3cret")
+
+
+def test_old_cost_verifies_and_needs_rehash(monkeypatch):
+    stored = pw.hash_password("s3cret")
+    monkeypatch.setitem(pw.PASSWORD_CONFIG, 'ln', 5)
+    assert pw.verify_password("s3cret", stored)  # cost is read from the hash itself
+    assert pw.needs_rehash(stored)
+
+
+def test_legacy_sha256_verifies_and_needs_rehash():
+    stored = hashlib.sha256(b"s3cret").hexdigest()
+    assert pw.verify_password("s3cret", stored)
+    assert not pw.verify_password("wrong", stored)
+    assert pw.needs_rehash(stored)
+
+
+@pytest.mark.parametrize("stored", [None, "", "plaintext", "$scrypt$garbage", "$bcrypt$x$y$z"])
+def test_unknown_or_malformed_hashes(stored):
+    assert not pw.verify_password("s3cret", stored)
+    assert pw.needs_rehash(stored)
@@ -0,0 +1,20 @@
+import os
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("mysql.connector")
+pytest.importorskip("reportlab")
+
+from dalandangan_receipts import receipt_path
+
+
+def test_delivered_orders_are_filed_under_the_delivery_day(tmp_path):
+    o = {'id': 7, 'created_at': datetime(2026, 3, 7, 23, 50), 'delivered_at': datetime(2026, 3, 8, 0, 25)}
+    assert receipt_path(o, str(tmp_path)) == os.path.join(str(tmp_path), "2026-03-08", "receipt_order_7.pdf")
+
+
+def test_orders_still_out_are_filed_under_the_order_day(tmp_path):
+    o = {'id': 8, 'created_at': datetime(2026, 3, 7, 23, 50), 'delivered_at': None}
+    assert receipt_path(o, str(tmp_path)).endswith(os.path.join("2026-03-07", "receipt_order_8.pdf"))
+    assert receipt_path({'id': 9}, str(tmp_path)).endswith(os.path.join("undated", "receipt_order_9.pdf"))
@@ -0,0 +1,15 @@
+import pytest
+
+pytest.importorskip("mysql.connector")  # the schema module runs migrations through the pool
+
+from dalandangan_schema import HOT_QUERIES, param_problems
+
+
+def test_hot_query_params_match_placeholders():
+    assert param_problems() == {}
+    for name, (sql, params) in HOT_QUERIES.items():
+        assert sql.count("%s") == len(params), name
+
+
+def test_param_problems_names_the_query():
+    assert param_problems({'q': ("SELECT %s, %s", (1,))}) == {'q': "2 placeholders but 1 sample params"}